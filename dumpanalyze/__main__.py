@@ -29,13 +29,45 @@ import os
 import errno
 import argparse
 
+from dumpanalyze.abortloops import AbortLoopDetector
+from dumpanalyze.archive import ArchiveWriter
+from dumpanalyze.churn import ChurnIndex
+from dumpanalyze.dumpdiff import DumpDiff
+from dumpanalyze.dumpindex import DumpIndex
 from dumpanalyze.dumpparser import DumpParser
+from dumpanalyze.exitcoverage import ExitCoverage
+from dumpanalyze.mcodemap import McodeMap
+from dumpanalyze.mcodeusage import McodeUsage
+from dumpanalyze.perfscript import PerfScriptReader
+from dumpanalyze.sampler import DumpSampler
+from dumpanalyze.server import DumpServer
+from dumpanalyze.similarity import TraceClusters
+from dumpanalyze.sourcerollup import SourceRollup
+from dumpanalyze.timeline import Timeline
 from dumpanalyze.traceforest import TraceForest
+from dumpanalyze.writer import AsyncWriter
 
 from dumpanalyze.view.traces import ViewTraces
+from dumpanalyze.view.irstats import ViewIRStats
+from dumpanalyze.view.bcstats import ViewBCStats
+from dumpanalyze.view.hottraces import ViewHotTraces
+from dumpanalyze.view.mcodeusage import ViewMcodeUsage
+from dumpanalyze.view.snapshots import ViewSnapshots
+from dumpanalyze.view.anomalies import ViewAnomalies
+from dumpanalyze.view.churn import ViewChurn
+from dumpanalyze.view.clusters import ViewTraceClusters
+from dumpanalyze.view.dumpdiff import ViewDumpDiff
+from dumpanalyze.view.exitregisters import ViewExitRegisters
+from dumpanalyze.view.timeline import ViewTimeline
 from dumpanalyze.view.tracebush import ViewTraceBush
+from dumpanalyze.view.htmlreport import ViewHtmlReport
 from dumpanalyze.view.abortreasonslist import ViewAbortReasonsList
 from dumpanalyze.view.abortreasonsdetails import ViewAbortReasonsDetails
+from dumpanalyze.view.abortbytecodes import ViewAbortBytecodes
+from dumpanalyze.view.abortloops import ViewAbortLoops
+from dumpanalyze.view.annotatedsource import ViewAnnotatedSource
+from dumpanalyze.view.sourcerollup import ViewSourceRollup
+from dumpanalyze.view.uncoveredexits import ViewUncoveredExits
 
 if sys.version_info[0] < 3:
     sys.exit("This toolkit requires Python 3.0+")
@@ -53,10 +85,167 @@ def parse_command_line(argv):
         type=str,
         help="Path to output directory",
     )
+    argparser.add_argument(
+        "--image-format",
+        type=str,
+        choices=ViewTraceBush.IMAGE_FORMATS,
+        default="png",
+        help="Format of rendered trace bush images",
+    )
+    argparser.add_argument(
+        "--perf-script",
+        type=str,
+        help="Path to the output of 'perf script' to attribute samples "
+             "to compiled traces",
+    )
+    argparser.add_argument(
+        "--maxmcode",
+        type=int,
+        help="Size of the machine code area in KBytes (the 'maxmcode' JIT "
+             "parameter) to forecast flushes against",
+    )
+    argparser.add_argument(
+        "--timeline-bucket",
+        type=int,
+        default=10000,
+        help="Number of dump lines per bucket of the event timeline",
+    )
+    argparser.add_argument(
+        "--source-dir",
+        type=str,
+        help="Path to directory with Lua sources to annotate with traces, "
+             "aborts and exits",
+    )
+    argparser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Only print an approximate summary of the dump estimated from "
+             "sampled parts of it (no views are rendered)",
+    )
+    argparser.add_argument(
+        "--summary-samples",
+        type=int,
+        default=64,
+        help="Number of parts of the dump sampled in the summary mode",
+    )
+    argparser.add_argument(
+        "--stats-only",
+        action="store_true",
+        help="Do not keep the text of traces and skip text views of bushes "
+             "(reduces memory usage)",
+    )
+    argparser.add_argument(
+        "--tolerant",
+        action="store_true",
+        help="Skip broken traces instead of stopping on the first "
+             "inconsistency in the dump",
+    )
+    argparser.add_argument(
+        "--memory-limit",
+        type=int,
+        help="Memory limit in megabytes for compiled traces: once they "
+             "exceed it, they are spilled to a temporary file on disk "
+             "(aborts, exits and statistics are kept in memory)",
+    )
+    argparser.add_argument(
+        "--decode-exits",
+        action="store_true",
+        help="Decode register dumps of trace exits and summarize register "
+             "values of the most frequent exits",
+    )
+    argparser.add_argument(
+        "--output",
+        type=str,
+        choices=["files", "archive", "report"],
+        default="files",
+        help="Write trace bushes as separate files, as a single archive "
+             "per generation or as an interactive HTML report laid out in "
+             "the browser (without invoking Graphviz)",
+    )
+    argparser.add_argument(
+        "--write-threads",
+        type=int,
+        default=4,
+        help="Number of background threads writing views while the dump "
+             "is being parsed (0 to write synchronously)",
+    )
+    argparser.add_argument(
+        "--cache-dir",
+        type=str,
+        help="Path to directory for caching rendered trace bush images",
+    )
+    args = argparser.parse_args(argv[1:])
+    return args
+
+
+def parse_diff_command_line(argv):
+    argparser = argparse.ArgumentParser(
+        prog="dumpanalyze diff",
+        description="Compare two dumps: totals, abort reasons, and mcode "
+                    "bytes and exits of traces matched by fingerprint",
+    )
+    argparser.add_argument(
+        "dump_a",
+        type=str,
+        help="Path to the first (baseline) dump file",
+    )
+    argparser.add_argument(
+        "dump_b",
+        type=str,
+        help="Path to the second dump file",
+    )
+    argparser.add_argument(
+        "--out",
+        type=str,
+        help="Path to the report file",
+    )
     args = argparser.parse_args(argv[1:])
     return args
 
 
+def parse_serve_command_line(argv):
+    argparser = argparse.ArgumentParser(
+        prog="dumpanalyze serve",
+        description="Browse a dump in a local web server",
+    )
+    argparser.add_argument(
+        "dump",
+        type=str,
+        help="Path to the dump file",
+    )
+    argparser.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        help="Address to listen on",
+    )
+    argparser.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="Port to listen on (0 to pick a free one)",
+    )
+    argparser.add_argument(
+        "--index",
+        type=str,
+        help="Path to the file the index of the dump is saved to and "
+             "loaded from on next runs (unless the dump changes)",
+    )
+    argparser.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        help="Number of responses kept in the cache",
+    )
+    args = argparser.parse_args(argv[1:])
+    return args
+
+
+def check_dump_file(fname):
+    if not (os.path.isfile(fname) and os.access(fname, os.R_OK)):
+        sys.exit("Bad dump file name '{}'".format(fname))
+
+
 def get_output_directory(args):
     out_dir = args.out_dir
 
@@ -86,28 +275,285 @@ def get_output_directory(args):
     return out_dir
 
 
+def get_cache_directory(args):
+    cache_dir = args.cache_dir
+
+    if cache_dir is None:
+        return None
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError:
+        sys.exit("Bad cache directory '{}'".format(cache_dir))
+
+    return cache_dir
+
+
+# Render `data` with the `view` and return the size of the resulting file.
+def render_view(view, fname, data, suffix=""):
+    view.render(fname, data)
+    return os.path.getsize(fname + suffix)
+
+
+def render_bush_files(fname, bush, img_format, v_txt, v_img):
+    size = render_view(v_img, fname, bush, "." + img_format)
+    if v_txt is not None:
+        size += render_view(v_txt, fname + ".txt", bush)
+    return size
+
+
+def render_bush_archive(fname, generation, bushes, img_format, v_txt, v_img):
+    # Members are named exactly as the files would be in the "files" mode:
+    with ArchiveWriter(fname) as archive:
+        for root_id, bush in bushes.items():
+            name = "gen-{}-bush-{}".format(generation, str(root_id))
+            if v_txt is not None:
+                archive.add(name + ".txt", v_txt.dumps(bush))
+            archive.add(
+                name + "." + img_format, v_img.dumps(bush),
+                compress=(img_format != "png"),
+            )
+
+    return os.path.getsize(fname)
+
+
+def render_report_data(view, fname, generation, bushes):
+    view.render(fname, (generation, bushes))
+    return sum(os.path.getsize(name) for name in view.data_files(fname))
+
+
+def render_bushes(args, writer, out_dir, generation, bushes, v_txt, v_img):
+    if args.output == "report":
+        fname = os.path.join(out_dir, "report", "gen-{}".format(generation))
+        writer.submit(
+            render_report_data, ViewHtmlReport("js", not args.stats_only),
+            fname, generation, bushes
+        )
+        return
+
+    if args.output == "files":
+        for root_id, bush in bushes.items():
+            fname = "gen-{}-bush-{}".format(generation, str(root_id))
+            writer.submit(
+                render_bush_files, os.path.join(out_dir, fname), bush,
+                args.image_format, v_txt, v_img
+            )
+        return
+
+    if not bushes:
+        return
+
+    fname = os.path.join(out_dir, "gen-{}-bushes.zip".format(generation))
+    writer.submit(
+        render_bush_archive, fname, generation, bushes,
+        args.image_format, v_txt, v_img
+    )
+
+
+def format_estimate(estimate, exact):
+    if exact:
+        return "{:.0f}".format(estimate.value)
+    if estimate.value == 0:
+        return "~0 (no occurrences in sample)"
+    if not estimate.error:
+        return "~{:.0f}".format(estimate.value)
+    return "{:.0f} +/- {:.0f}".format(estimate.value, estimate.error)
+
+
+def main_summary(args):
+    if args.summary_samples <= 0:
+        sys.exit("Bad number of samples {}".format(args.summary_samples))
+
+    sampler = DumpSampler(args.dump, num_samples=args.summary_samples)
+    summary = sampler.summarize()
+
+    print("Dump: {} ({:.1f} MB)".format(args.dump, summary.size / 1e6))
+    if summary.exact:
+        print("Parsed completely")
+    else:
+        print("Sampled {} parts ({:.1%} of the dump), "
+              "showing 95% confidence intervals".format(
+                  summary.num_samples, summary.fraction
+              ))
+
+    for name, title in [
+        ("traces", "Compiled traces"),
+        ("side_traces", "Side traces"),
+        ("size_mcode", "Machine code bytes"),
+        ("aborts", "Aborts"),
+        ("exits", "Exits"),
+        ("flushes", "Flushes"),
+    ]:
+        print("{:<20}{}".format(
+            title + ":", format_estimate(summary.estimate(name), summary.exact)
+        ))
+
+    if summary.reasons:
+        print("Top abort reasons:")
+    for category, estimate in summary.reasons[:10]:
+        print("    {:<20}{}".format(
+            format_estimate(estimate, summary.exact), category
+        ))
+
+
+def main_diff(argv):
+    args = parse_diff_command_line(argv)
+
+    check_dump_file(args.dump_a)
+    check_dump_file(args.dump_b)
+
+    out = args.out
+    if out is None:
+        out = "{}-vs-{}.txt".format(
+            os.path.basename(args.dump_a), os.path.basename(args.dump_b)
+        )
+
+    print("Parsing dumps")
+    diff = DumpDiff.from_dumps(args.dump_a, args.dump_b)
+
+    print("Rendering comparison of dumps")
+    ViewDumpDiff("txt").render(out, diff)
+
+    print("Done")
+
+
+def main_serve(argv):
+    args = parse_serve_command_line(argv)
+
+    check_dump_file(args.dump)
+
+    if args.cache_size <= 0:
+        sys.exit("Bad cache size {}".format(args.cache_size))
+
+    index = None
+    if args.index is not None:
+        index = DumpIndex.load(args.index, args.dump)
+        if index is not None:
+            print("Loaded index of the dump from {}".format(args.index))
+
+    if index is None:
+        print("Indexing dump")
+        index = DumpIndex(args.dump)
+        index.build()
+        if args.index is not None:
+            index.save(args.index)
+            print("Saved index of the dump to {}".format(args.index))
+
+    print("Indexed {} generations".format(index.num_generations))
+
+    def on_start(address):
+        print("Serving on http://{}:{}/ (press Ctrl+C to stop)".format(
+            *address
+        ), flush=True)
+
+    server = DumpServer(index, cache_size=args.cache_size)
+    server.serve(args.host, args.port, on_start=on_start)
+
+    print("Response cache: {} hits, {} misses".format(
+        server.cache.hits, server.cache.misses
+    ))
+    print("Done")
+
+
 def main(argv=None):
     argv = argv or sys.argv
+
+    if argv[1:2] == ["diff"]:
+        return main_diff(argv[1:])
+
+    if argv[1:2] == ["serve"]:
+        return main_serve(argv[1:])
+
     args = parse_command_line(argv)
 
     if args.dump is None:
         sys.exit("Dump file name is not specified")
-    elif not(os.path.isfile(args.dump) and os.access(args.dump, os.R_OK)):
-        sys.exit("Bad dump file name '{}'".format(args.dump))
+    check_dump_file(args.dump)
+
+    if args.summary:
+        return main_summary(args)
+
+    if args.perf_script is not None and not (
+        os.path.isfile(args.perf_script) and
+        os.access(args.perf_script, os.R_OK)
+    ):
+        sys.exit("Bad perf script file name '{}'".format(args.perf_script))
+
+    if args.source_dir is not None and not os.path.isdir(args.source_dir):
+        sys.exit("Bad source directory '{}'".format(args.source_dir))
+
+    if args.maxmcode is not None and args.maxmcode <= 0:
+        sys.exit("Bad maxmcode {}".format(args.maxmcode))
+
+    if args.timeline_bucket <= 0:
+        sys.exit("Bad timeline bucket size {}".format(args.timeline_bucket))
+
+    if args.memory_limit is not None and args.memory_limit <= 0:
+        sys.exit("Bad memory limit {}".format(args.memory_limit))
+
+    if args.write_threads < 0:
+        sys.exit("Bad number of write threads {}".format(args.write_threads))
 
     out_dir = get_output_directory(args)
+    cache_dir = get_cache_directory(args)
+    if args.output == "report":
+        os.makedirs(os.path.join(out_dir, "report"), exist_ok=True)
 
     print("Initializing")
 
     # Setup parser:
-    parser = DumpParser(args.dump)
+    memory_limit = None
+    if args.memory_limit is not None:
+        memory_limit = args.memory_limit * 1024 * 1024
+    parser = DumpParser(
+        args.dump,
+        keep_text=not args.stats_only,
+        decode_exits=args.decode_exits,
+        memory_limit=memory_limit,
+        tolerant=args.tolerant,
+    )
 
     # Setup all available views:
     v_traces = ViewTraces("csv")
+    v_ir_stats = ViewIRStats("csv")
+    v_bc_stats = ViewBCStats("csv")
+    v_snapshots = ViewSnapshots("csv")
     v_ar_list = ViewAbortReasonsList("csv")
     v_ar_details = ViewAbortReasonsDetails("txt")
-    v_bush_txt = ViewTraceBush("txt")
-    v_bush_png = ViewTraceBush("png")
+    v_ar_bytecodes = ViewAbortBytecodes("csv")
+    v_uncovered = ViewUncoveredExits("csv")
+    v_exit_regs = ViewExitRegisters("csv") if args.decode_exits else None
+    v_bush_txt = None if args.stats_only else ViewTraceBush("txt")
+    v_bush_img = ViewTraceBush(args.image_format, cache_dir=cache_dir)
+
+    # Events of all generations along the dump:
+    timeline = Timeline(args.timeline_bucket)
+
+    # Usage of the machine code area per generation:
+    mcode_usage = McodeUsage(
+        None if args.maxmcode is None else args.maxmcode * 1024
+    )
+
+    # Traces, aborts and exits by source locations:
+    source_rollup = SourceRollup()
+
+    # Locations aborting recording over and over again:
+    abort_loops = AbortLoopDetector()
+
+    # Traces compiled over and over again in different generations:
+    churn_index = ChurnIndex()
+
+    # Families of structurally similar traces of all generations:
+    trace_clusters = TraceClusters()
+
+    # Summaries of generations listed in the HTML report:
+    report_generations = []
+
+    # Machine code addresses of all generations for joining perf samples:
+    mcode_map = McodeMap() if args.perf_script is not None else None
+
+    # Views are rendered in background while the next generation is parsed:
+    writer = AsyncWriter(args.write_threads)
 
     generation = 1
     while True:
@@ -123,33 +569,164 @@ def main(argv=None):
         bushes = forest.bushes
 
         print("Read {} trace bushes".format(len(bushes)))
+        if args.tolerant:
+            print("Skipped {} anomalies so far".format(len(parser.anomalies)))
+
+        # Also marks uncovered exits in bushes to be highlighted:
+        coverage = ExitCoverage(forest, parser.exits, abort_reasons)
+
+        timeline.add_generation(traces, abort_reasons, parser.exits)
+        if status == parser.PARSED_GENERATION:
+            timeline.add_flush(parser.line)
+        mcode_usage.add_generation(
+            generation, traces, forest, abort_reasons,
+            status == parser.PARSED_GENERATION
+        )
+        source_rollup.add_generation(traces, abort_reasons, parser.exits)
+        abort_loops.add_aborts(abort_reasons)
+        churn_index.add_traces(generation, traces)
+        trace_clusters.add_traces(generation, traces)
+        if mcode_map is not None:
+            mcode_map.add_traces(generation, traces)
+        report_generations.append({
+            "generation": generation,
+            "traces": len(traces),
+            "bushes": len(bushes),
+            "aborts": len(abort_reasons),
+            "flushed": status == parser.PARSED_GENERATION,
+        })
 
         print("Rendering aggregated list of compiled traces")
-        v_traces.render(os.path.join(
+        writer.submit(render_view, v_traces, os.path.join(
             out_dir, "gen-{}-traces.csv".format(generation)
         ), traces)
 
+        print("Rendering IR statistics of compiled traces")
+        writer.submit(render_view, v_ir_stats, os.path.join(
+            out_dir, "gen-{}-ir-stats.csv".format(generation)
+        ), traces)
+
+        print("Rendering bytecode statistics of compiled traces")
+        writer.submit(render_view, v_bc_stats, os.path.join(
+            out_dir, "gen-{}-bc-stats.csv".format(generation)
+        ), traces)
+
+        print("Rendering snapshot weights of trace bushes")
+        writer.submit(render_view, v_snapshots, os.path.join(
+            out_dir, "gen-{}-snapshots.csv".format(generation)
+        ), bushes)
+
         print("Rendering aggregated list of abort reasons")
-        v_ar_list.render(os.path.join(
+        writer.submit(render_view, v_ar_list, os.path.join(
             out_dir, "gen-{}-abort-reasons.csv".format(generation)
         ), abort_reasons)
 
         print("Rendering detailed list of abort reasons")
-        v_ar_details.render(os.path.join(
+        writer.submit(render_view, v_ar_details, os.path.join(
             out_dir, "gen-{}-abort-reasons.txt".format(generation)
         ), abort_reasons)
 
+        print("Rendering bytecodes preceding aborts")
+        writer.submit(render_view, v_ar_bytecodes, os.path.join(
+            out_dir, "gen-{}-abort-bytecodes.csv".format(generation)
+        ), abort_reasons)
+
+        print("Rendering hot exits without side traces")
+        writer.submit(render_view, v_uncovered, os.path.join(
+            out_dir, "gen-{}-uncovered-exits.csv".format(generation)
+        ), coverage)
+
+        if v_exit_regs is not None:
+            print("Rendering register values of trace exits")
+            writer.submit(render_view, v_exit_regs, os.path.join(
+                out_dir, "gen-{}-exit-registers.csv".format(generation)
+            ), parser.exits.decoded)
+
         print("Rendering views of bushes")
-        for root_id, bush in bushes.items():
-            fname = "gen-{}-bush-{}".format(generation, str(root_id))
-            v_bush_txt.render(os.path.join(out_dir, fname + ".txt"), bush)
-            v_bush_png.render(os.path.join(out_dir, fname), bush)
+        render_bushes(
+            args, writer, out_dir, generation, bushes, v_bush_txt, v_bush_img
+        )
 
         if status == parser.PARSED_DUMP:
             break
 
         generation += 1
 
+    if args.output == "report":
+        print("Rendering HTML report")
+        writer.submit(render_view, ViewHtmlReport("html"), os.path.join(
+            out_dir, "report", "index.html"
+        ), report_generations)
+
+    print("Rendering timeline of events")
+    for fmt in ["csv", "svg"]:
+        writer.submit(render_view, ViewTimeline(fmt), os.path.join(
+            out_dir, "timeline." + fmt
+        ), timeline)
+
+    print("Rendering usage of the machine code area")
+    writer.submit(render_view, ViewMcodeUsage("csv"), os.path.join(
+        out_dir, "mcode-usage.csv"
+    ), mcode_usage)
+
+    print("Rendering rollup of source locations")
+    writer.submit(render_view, ViewSourceRollup("csv"), os.path.join(
+        out_dir, "source-locations.csv"
+    ), source_rollup)
+    writer.submit(render_view, ViewSourceRollup("csv", by_file=True),
+                  os.path.join(out_dir, "source-files.csv"), source_rollup)
+
+    if args.source_dir is not None:
+        print("Rendering annotated sources")
+        writer.submit(
+            render_view, ViewAnnotatedSource("txt", args.source_dir),
+            os.path.join(out_dir, "annotated-source.txt"), source_rollup
+        )
+
+    print("Rendering hot abort loops")
+    writer.submit(render_view, ViewAbortLoops("csv"), os.path.join(
+        out_dir, "abort-loops.csv"
+    ), abort_loops)
+
+    if args.tolerant:
+        print("Rendering anomalies in the dump")
+        writer.submit(render_view, ViewAnomalies("csv"), os.path.join(
+            out_dir, "anomalies.csv"
+        ), parser.anomalies)
+
+    print("Rendering recompilation churn of traces")
+    writer.submit(render_view, ViewChurn("csv"), os.path.join(
+        out_dir, "churn.csv"
+    ), churn_index)
+
+    print("Rendering clusters of similar traces")
+    writer.submit(render_view, ViewTraceClusters("csv"), os.path.join(
+        out_dir, "trace-clusters.csv"
+    ), trace_clusters)
+
+    if mcode_map is not None:
+        print("Attributing perf samples to compiled traces")
+        samples = mcode_map.attribute(PerfScriptReader(args.perf_script))
+        writer.submit(render_view, ViewHotTraces("csv"), os.path.join(
+            out_dir, "hot-traces.csv"
+        ), samples)
+
+    print("Waiting for views to be written")
+    writer.close()
+    print("Written {} bytes in {} jobs, {:.2f} MB/s".format(
+        writer.num_bytes, writer.num_jobs, writer.throughput / 1e6
+    ))
+
+    if not args.stats_only:
+        print("Trace body store: {} lookups, {:.1%} hits".format(
+            parser.body_store.num_lookups, parser.body_store.hit_rate
+        ))
+
+    if cache_dir is not None:
+        print("Render cache: {} hits, {} misses".format(
+            v_bush_img.cache_hits, v_bush_img.cache_misses
+        ))
+
     print("Done")
 
 
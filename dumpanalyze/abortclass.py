@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+#
+# Classifier of abort reasons into normalized categories.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import re
+
+
+class AbortClassifier:
+
+    # Messages of trace errors as in lj_traceerr.h (with function arguments
+    # formatted by jit.dump as names, "builtin#N" or "file:line"):
+    TEMPLATES = [
+        "error thrown or hook called during recording",
+        "trace too short",
+        "trace too long",
+        "trace too deep",
+        "too many snapshots",
+        "blacklisted",
+        "retry recording",
+        "NYI: bytecode %d",
+        "leaving loop in root trace",
+        "inner loop in root trace",
+        "loop unroll limit reached",
+        "bad argument type",
+        "JIT compilation disabled for function %s",
+        "call unroll limit reached",
+        "down-recursion, restarting",
+        "NYI: FastFunc %s",
+        "NYI: unsupported variant of FastFunc %s",
+        "NYI: return to lower frame",
+        "store with nil or NaN key",
+        "missing metamethod",
+        "looping index lookup",
+        "NYI: mixed sparse/dense table",
+        "symbol not in cache",
+        "NYI: unsupported C type conversion",
+        "NYI: unsupported C function type",
+        "NYI: C function %p",
+        "guard would always fail",
+        "too many PHIs",
+        "persistent type instability",
+        "failed to allocate mcode memory",
+        "machine code too long",
+        "hit mcode limit (retrying)",
+        "too many spill slots",
+        "inconsistent register allocation",
+        "NYI: cannot assemble IR instruction %d",
+        "NYI: PHI shuffling too complex",
+        "NYI: register coalescing too complex",
+    ]
+
+    PARAM_PATTERNS = {
+        "%d": r"(-?\d+)",
+        "%s": r"(.+)",
+        "%p": r"(0x[0-9a-fA-F]+|\S+)",
+    }
+
+    # Reasons not matching any template are normalized by replacing
+    # addresses and numbers:
+    re_generic = re.compile(r"0x[0-9a-fA-F]+|\d+")
+
+    # Maximal number of cached results (reasons are usually repeated a lot,
+    # but values like addresses could make the number of distinct ones
+    # unbounded)
+    CACHE_SIZE = 65536
+
+    def __init__(self):
+        # All templates are matched at once by a single regular expression
+        # with a named group per template:
+        alternatives = []
+        self._groups = {}
+        group = 1
+        for num, template in enumerate(self.TEMPLATES):
+            pattern = re.escape(template)
+            num_params = 0
+            for param, param_re in self.PARAM_PATTERNS.items():
+                escaped = re.escape(param)
+                num_params += pattern.count(escaped)
+                pattern = pattern.replace(escaped, param_re)
+            name = "t{}".format(num)
+            alternatives.append("(?P<{}>{})".format(name, pattern))
+            self._groups[name] = (template, group, num_params)
+            group += num_params + 1
+
+        self._re_templates = re.compile(
+            r"^(?:{})$".format("|".join(alternatives))
+        )
+        self._cache = {}
+
+    # Return a tuple of (category, tuple of parameters) for the raw `reason`,
+    # e.g. ("NYI: FastFunc %s", ("print",)) for "NYI: FastFunc print".
+    def classify(self, reason):
+        result = self._cache.get(reason)
+        if result is not None:
+            return result
+
+        match = self._re_templates.match(reason)
+        if match:
+            category, group, num_params = self._groups[match.lastgroup]
+            params = match.groups()[group:group + num_params]
+        else:
+            params = tuple(self.re_generic.findall(reason))
+            category = self.re_generic.sub(self._generic_param, reason)
+
+        result = (category, params)
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._cache.clear()
+        self._cache[reason] = result
+        return result
+
+    @staticmethod
+    def _generic_param(match):
+        return "%p" if match.group(0).startswith("0x") else "%d"
+
+
+_classifier = AbortClassifier()
+
+
+def classify(reason):
+    return _classifier.classify(reason)
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+#
+# Detector of locations aborting trace recording over and over again.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import collections
+
+
+class AbortLoop:
+
+    # Maximal number of distinct triggers, reasons and abort sites tracked
+    # per location
+    MAX_DISTINCT = 8
+    OTHER = "..."
+
+    def __init__(self, file, line, tight_gap):
+        self._file = file
+        self._line = line
+        self._tight_gap = tight_gap
+        self._num_attempts = 0
+        self._num_tight = 0
+        self._first_pos = 0
+        self._last_pos = 0
+        self._min_gap = None
+        self._triggers = collections.Counter()
+        self._reasons = collections.Counter()
+        self._sites = collections.Counter()
+
+    @property
+    def file(self):
+        return self._file
+
+    @property
+    def line(self):
+        return self._line
+
+    @property
+    def num_attempts(self):
+        return self._num_attempts
+
+    # Number of attempts made within `tight_gap` lines of the previous one
+    @property
+    def num_tight(self):
+        return self._num_tight
+
+    @property
+    def first_pos(self):
+        return self._first_pos
+
+    @property
+    def last_pos(self):
+        return self._last_pos
+
+    @property
+    def min_gap(self):
+        return self._min_gap
+
+    @property
+    def mean_gap(self):
+        if self._num_attempts < 2:
+            return None
+        return (self._last_pos - self._first_pos) / (self._num_attempts - 1)
+
+    # Side exits ("trace/exit") or "" for root traces which triggered
+    # recording, most frequent first
+    @property
+    def triggers(self):
+        return self._triggers.most_common()
+
+    @property
+    def reasons(self):
+        return self._reasons.most_common()
+
+    # Locations ("file:line") where the recording was aborted, most frequent
+    # first
+    @property
+    def sites(self):
+        return self._sites.most_common()
+
+    def add(self, abort_reason):
+        pos = abort_reason.pos
+        if self._num_attempts:
+            gap = pos - self._last_pos
+            if self._min_gap is None or gap < self._min_gap:
+                self._min_gap = gap
+            if gap <= self._tight_gap:
+                self._num_tight += 1
+        else:
+            self._first_pos = pos
+
+        self._num_attempts += 1
+        self._last_pos = pos
+        self._count(self._triggers, abort_reason.parent)
+        self._count(self._reasons, abort_reason.reason)
+        self._count(self._sites, "{}:{}".format(
+            abort_reason.file, abort_reason.line
+        ))
+
+    def _count(self, counter, key):
+        if key not in counter and len(counter) >= self.MAX_DISTINCT:
+            key = self.OTHER
+        counter[key] += 1
+
+
+class AbortLoopDetector:
+
+    # Up to `capacity` locations are tracked at a time. When there are more,
+    # the least recently aborted location is evicted: locations aborting
+    # in tight loops are recent by definition, so they are retained.
+    def __init__(self, capacity=100000, tight_gap=1000):
+        self._capacity = capacity
+        self._tight_gap = tight_gap
+        self._locations = collections.OrderedDict()
+        self._num_evicted = 0
+
+    @property
+    def locations(self):
+        return self._locations.values()
+
+    @property
+    def num_evicted(self):
+        return self._num_evicted
+
+    # Aborts are grouped by the start of the aborted trace: this is where
+    # recording is retried, wherever in the trace it is aborted.
+    def add(self, abort_reason):
+        key = (abort_reason.start_file, abort_reason.start_line)
+        location = self._locations.get(key)
+
+        if location is None:
+            if len(self._locations) >= self._capacity:
+                self._locations.popitem(last=False)
+                self._num_evicted += 1
+            location = AbortLoop(key[0], key[1], self._tight_gap)
+            self._locations[key] = location
+        else:
+            self._locations.move_to_end(key)
+
+        location.add(abort_reason)
+
+    def add_aborts(self, abort_reasons):
+        for abort_reason in abort_reasons:
+            self.add(abort_reason)
@@ -26,16 +26,34 @@
 
 import re
 
+from dumpanalyze.abortclass import classify
+
 
 class AbortReason:
-    re_abort_reason = re.compile(r" abort (.+?):(\d+) -- (.+)$")
+    re_abort_reason = re.compile(r"(\d+) abort (.+?):(\d+) -- (.+)$")
 
-    def __init__(self, line):
+    # `parent` is the "trace/exit" the aborted side trace was started from
+    # (empty for root traces). `last_bc` is the code of the last bytecode
+    # recorded before the abort (see opcodes.BC_OPCODES). `start_file` and
+    # `start_line` locate the start of the aborted trace, which may differ
+    # from the abort site (the location in the abort record).
+    def __init__(self, line, pos=0, parent="", last_bc=None,
+                 start_file=None, start_line=None):
         match = self.re_abort_reason.search(line)
 
-        self._file = match.group(1)
-        self._line = int(match.group(2))
-        self._reason = match.group(3)
+        self._trace_id = int(match.group(1))
+        self._file = match.group(2)
+        self._line = int(match.group(3))
+        self._reason = match.group(4)
+        self._pos = pos
+        self._parent = parent
+        self._last_bc = last_bc
+        self._start_file = self._file if start_file is None else start_file
+        self._start_line = self._line if start_line is None else start_line
+
+    @property
+    def trace_id(self):
+        return self._trace_id
 
     @property
     def file(self):
@@ -45,6 +63,37 @@ class AbortReason:
     def line(self):
         return self._line
 
+    @property
+    def start_file(self):
+        return self._start_file
+
+    @property
+    def start_line(self):
+        return self._start_line
+
     @property
     def reason(self):
         return self._reason
+
+    # Line number of the abort record in the dump
+    @property
+    def pos(self):
+        return self._pos
+
+    @property
+    def parent(self):
+        return self._parent
+
+    @property
+    def last_bc(self):
+        return self._last_bc
+
+    # Normalized reason, e.g. "NYI: FastFunc %s" for "NYI: FastFunc print"
+    @property
+    def category(self):
+        return classify(self._reason)[0]
+
+    # Values substituted into the category to get the raw reason
+    @property
+    def params(self):
+        return classify(self._reason)[1]
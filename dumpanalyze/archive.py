@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# Indexed archive for storing multiple rendered views in a single file.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import zipfile
+
+
+# Archives are plain ZIP files: the central directory serves as an index
+# of members, so a single member can be read without scanning the rest.
+class ArchiveWriter:
+
+    def __init__(self, fname):
+        self._zip = zipfile.ZipFile(fname, "w")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Add `data` (either bytes or str) as a member called `name`. Already
+    # compressed data (e.g. PNG images) should be stored with `compress=False`.
+    def add(self, name, data, compress=True):
+        compress_type = zipfile.ZIP_DEFLATED if compress \
+            else zipfile.ZIP_STORED
+        self._zip.writestr(name, data, compress_type=compress_type)
+
+    def close(self):
+        self._zip.close()
+
+
+class ArchiveReader:
+
+    def __init__(self, fname):
+        self._zip = zipfile.ZipFile(fname, "r")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def names(self):
+        return self._zip.namelist()
+
+    def read(self, name):
+        return self._zip.read(name)
+
+    def read_text(self, name):
+        return self._zip.read(name).decode("utf-8")
+
+    def close(self):
+        self._zip.close()
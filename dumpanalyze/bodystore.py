@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+#
+# Store of deduplicated trace bodies.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+
+class BodyStore:
+
+    # Identical bodies (bytecode, IR or machine code sections) of different
+    # traces are stored once and shared by all of them. Bodies are keyed
+    # with their content (tuples of lines are hashed by value).
+    def __init__(self):
+        self._bodies = {}
+        self._num_lookups = 0
+        self._num_hits = 0
+
+    @property
+    def size(self):
+        return len(self._bodies)
+
+    @property
+    def num_lookups(self):
+        return self._num_lookups
+
+    @property
+    def num_hits(self):
+        return self._num_hits
+
+    @property
+    def hit_rate(self):
+        if not self._num_lookups:
+            return 0.0
+        return self._num_hits / self._num_lookups
+
+    # Return the shared copy of the `lines` as a tuple.
+    def intern(self, lines):
+        body = tuple(lines)
+        self._num_lookups += 1
+
+        shared = self._bodies.setdefault(body, body)
+        if shared is not body:
+            self._num_hits += 1
+        return shared
+
+    # Forget all stored bodies, keeping statistics.
+    def clear(self):
+        self._bodies.clear()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+# Index of traces recompiled across generations.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+
+class ChurnEntry:
+
+    def __init__(self, fingerprint, generation):
+        self._fingerprint = fingerprint
+        self._num_compiled = 0
+        self._num_generations = 0
+        self._first_generation = generation
+        self._last_generation = None
+        self._size_mcode = 0
+
+    @property
+    def file(self):
+        return self._fingerprint[0]
+
+    @property
+    def line(self):
+        return self._fingerprint[1]
+
+    @property
+    def digest(self):
+        return self._fingerprint[2]
+
+    @property
+    def num_compiled(self):
+        return self._num_compiled
+
+    @property
+    def num_generations(self):
+        return self._num_generations
+
+    @property
+    def first_generation(self):
+        return self._first_generation
+
+    @property
+    def last_generation(self):
+        return self._last_generation
+
+    @property
+    def size_mcode(self):
+        return self._size_mcode
+
+    def add(self, generation, trace):
+        self._num_compiled += 1
+        self._size_mcode += trace.size_mcode
+        if generation != self._last_generation:
+            self._num_generations += 1
+            self._last_generation = generation
+
+
+# Traces are tracked by their fingerprints over the whole dump, so memory
+# usage is proportional to the number of distinct traces only.
+class ChurnIndex:
+
+    def __init__(self):
+        self._entries = {}
+
+    @property
+    def entries(self):
+        return self._entries.values()
+
+    def add(self, generation, trace):
+        fingerprint = trace.fingerprint
+        entry = self._entries.get(fingerprint)
+        if entry is None:
+            entry = ChurnEntry(fingerprint, generation)
+            self._entries[fingerprint] = entry
+        entry.add(generation, trace)
+
+    def add_traces(self, generation, traces):
+        for trace in traces:
+            self.add(generation, trace)
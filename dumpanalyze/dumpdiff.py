@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+#
+# Comparison of two dumps.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import collections
+import concurrent.futures
+
+from dumpanalyze.dumpparser import DumpParser
+
+
+# Aggregated data of a whole dump. Only counters are kept, so the memory
+# usage does not depend on the size of the dump (beyond a single generation
+# being parsed).
+class DumpSummary:
+
+    def __init__(self, fname):
+        self._fname = fname
+        self._num_generations = 0
+        self._num_traces = 0
+        self._num_side_traces = 0
+        self._num_exit_stubs = 0
+        self._num_exits = 0
+        self._size_mcode = 0
+        self._abort_reasons = collections.Counter()
+        # Fingerprint -> [number of compilations, mcode bytes, exits]:
+        self._traces = {}
+
+    @property
+    def fname(self):
+        return self._fname
+
+    @property
+    def num_generations(self):
+        return self._num_generations
+
+    @property
+    def num_flushes(self):
+        return max(self._num_generations - 1, 0)
+
+    @property
+    def num_traces(self):
+        return self._num_traces
+
+    @property
+    def num_side_traces(self):
+        return self._num_side_traces
+
+    @property
+    def num_exit_stubs(self):
+        return self._num_exit_stubs
+
+    # Number of exit events (not exit stubs) taken from compiled traces
+    @property
+    def num_exits(self):
+        return self._num_exits
+
+    @property
+    def size_mcode(self):
+        return self._size_mcode
+
+    @property
+    def num_aborts(self):
+        return sum(self._abort_reasons.values())
+
+    @property
+    def abort_reasons(self):
+        return self._abort_reasons
+
+    @property
+    def traces(self):
+        return self._traces
+
+    def add_generation(self, traces, abort_reasons, exits):
+        self._num_generations += 1
+
+        # Exits refer to traces by IDs, which are unique within a generation:
+        fingerprints = {}
+        for trace in traces:
+            self._num_traces += 1
+            self._num_side_traces += not trace.is_root
+            self._num_exit_stubs += trace.num_exit_stubs
+            self._size_mcode += trace.size_mcode
+
+            entry = self._traces.get(trace.fingerprint)
+            if entry is None:
+                entry = [0, 0, 0]
+                self._traces[trace.fingerprint] = entry
+            entry[0] += 1
+            entry[1] += trace.size_mcode
+            fingerprints[trace.id] = trace.fingerprint
+
+        for trace_id in exits.trace_ids:
+            self._num_exits += 1
+            fingerprint = fingerprints.get(trace_id)
+            if fingerprint is not None:
+                self._traces[fingerprint][2] += 1
+
+        for ar in abort_reasons:
+            self._abort_reasons[ar.reason] += 1
+
+
+def summarize(fname):
+    summary = DumpSummary(fname)
+    parser = DumpParser(fname, keep_text=False)
+
+    while True:
+        status = parser.parse()
+        summary.add_generation(
+            parser.traces, parser.abort_reasons, parser.exits
+        )
+        if status == parser.PARSED_DUMP:
+            return summary
+
+
+class DumpDiff:
+
+    def __init__(self, summary_a, summary_b):
+        self._a = summary_a
+        self._b = summary_b
+
+    # Parse both dumps in parallel (each one in a separate process).
+    @classmethod
+    def from_dumps(cls, fname_a, fname_b):
+        with concurrent.futures.ProcessPoolExecutor(2) as pool:
+            summary_a, summary_b = pool.map(summarize, [fname_a, fname_b])
+        return cls(summary_a, summary_b)
+
+    @property
+    def a(self):
+        return self._a
+
+    @property
+    def b(self):
+        return self._b
+
+    # List of (name, value in A, value in B) for global counters
+    @property
+    def totals(self):
+        return [
+            (name, getattr(self._a, attr), getattr(self._b, attr))
+            for name, attr in [
+                ("Compiled traces", "num_traces"),
+                ("Side traces", "num_side_traces"),
+                ("Exit stubs", "num_exit_stubs"),
+                ("Exits", "num_exits"),
+                ("Mcode bytes", "size_mcode"),
+                ("Aborts", "num_aborts"),
+                ("Flushes", "num_flushes"),
+            ]
+        ]
+
+    # List of (reason, count in A, count in B), biggest changes first
+    @property
+    def abort_reasons(self):
+        reasons = set(self._a.abort_reasons) | set(self._b.abort_reasons)
+        result = [
+            (reason, self._a.abort_reasons[reason],
+             self._b.abort_reasons[reason])
+            for reason in reasons
+        ]
+        result.sort(key=lambda x: (-abs(x[2] - x[1]), x[0]))
+        return result
+
+    # List of (fingerprint, [count, mcode bytes, exits] in A, ... in B) for
+    # traces found in either dump, biggest changes of mcode bytes first.
+    # Traces missing in one of the dumps have [0, 0, 0] there.
+    @property
+    def traces(self):
+        missing = [0, 0, 0]
+        fingerprints = set(self._a.traces) | set(self._b.traces)
+        result = [
+            (fp, self._a.traces.get(fp, missing),
+             self._b.traces.get(fp, missing))
+            for fp in fingerprints
+        ]
+        result.sort(key=lambda x: (-abs(x[2][1] - x[1][1]), x[0]))
+        return result
+
+    @property
+    def num_matched(self):
+        return len(set(self._a.traces) & set(self._b.traces))
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+#
+# Generator of synthetic dumps for benchmarking.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import argparse
+import random
+import sys
+
+GPR_NAMES = [
+    "rax", "rcx", "rdx", "rbx", "rsp", "rbp", "rsi", "rdi",
+    "r8", "r9", "r10", "r11", "r12", "r13", "r14", "r15",
+]
+FPR_NAMES = ["xmm{}".format(i) for i in range(16)]
+
+BC_OPS = [
+    "KSHORT", "KNUM", "MOV", "ADD", "ADDVN", "SUB", "MUL", "ISGE", "ISLT",
+    "ISF", "IST", "GGET", "TGETS", "TGETV", "TSETV", "UGET", "CALL", "JMP",
+    "FORL", "LOOP", "RET0", "RET1",
+]
+IR_OPS = [
+    # (opcode, type, is_guard)
+    ("SLOAD", "int", False), ("SLOAD", "flt", True), ("ADD", "int", False),
+    ("ADD", "flt", False), ("SUB", "flt", False), ("MUL", "flt", False),
+    ("CONV", "flt", False), ("LT", "int", True), ("LE", "int", True),
+    ("EQ", "int", True), ("NE", "int", True), ("FLOAD", "tab", False),
+    ("HREFK", "p32", True), ("HLOAD", "fun", True), ("ULOAD", "nil", True),
+    ("ALOAD", "num", False), ("AREF", "p32", False), ("ASTORE", "num", False),
+    ("CALLN", "int", False), ("CALLXS", "p32", False), ("TNEW", "tab", False),
+]
+REGISTERS = ["rax", "rbx", "rcx", "rdx", "rsi", "rdi", "rbp", "xmm6", "xmm7"]
+MC_OPS = [
+    "mov eax, dword [r10+0x8]", "cmp ebp, 0x3c", "add ebp, 0x1",
+    "movsd xmm7, qword [r10]", "addsd xmm7, xmm6", "cvtsi2sd xmm6, ebp",
+    "mov dword [rsp+0x10], ebp", "mov ebp, dword [rsp+0x10]",
+    "call 0x439dcc", "xorps xmm6, xmm6", "lea rdx, [r10+0x40]",
+]
+ABORT_REASONS = [
+    "NYI: FastFunc print", "NYI: bytecode 51", "NYI: bytecode 71",
+    "loop unroll limit reached", "inner loop in root trace",
+    "leaving loop in root trace", "call unroll limit reached",
+    "NYI: unsupported variant of FastFunc string.format",
+    "NYI: C function 0x7f5c3b2a79e0", "blacklisted",
+]
+
+
+class DumpGenerator:
+
+    # Machine code is allocated downwards from this address
+    MCODE_TOP = 0x0bcd0000
+
+    # Size of the machine code area (the default value of the "maxmcode" JIT
+    # parameter). Once it is full, the trace being compiled is aborted with
+    # "failed to allocate mcode memory", all traces are flushed and the
+    # trace is compiled again, as LuaJIT does.
+    MCODE_AREA = 512 * 1024
+
+    def __init__(self, num_traces=1000, side_depth=3, ir_size=30,
+                 mcode_size=300, abort_rate=0.2, exit_rate=0.5,
+                 flush_every=0, num_files=20, seed=1,
+                 mcode_area=MCODE_AREA):
+        if not 0 < mcode_area <= self.MCODE_TOP:
+            raise ValueError("Bad mcode area size {}".format(mcode_area))
+        self._num_traces = num_traces
+        self._side_depth = side_depth
+        self._ir_size = ir_size
+        self._mcode_size = mcode_size
+        self._abort_rate = abort_rate
+        self._exit_rate = exit_rate
+        self._flush_every = flush_every
+        self._num_files = num_files
+        self._mcode_area = mcode_area
+        self._random = random.Random(seed)
+
+    # Write the whole dump to the `out` stream.
+    def write(self, out):
+        rnd = self._random
+        self._init_generation()
+
+        for num in range(self._num_traces):
+            if self._flush_every and num and num % self._flush_every == 0:
+                self._write_flush(out)
+                self._init_generation()
+
+            while rnd.random() < self._abort_rate:
+                self._write_trace(out, aborted=True)
+            while not self._write_trace(out, aborted=False):
+                self._init_generation()
+
+            while self._traces and rnd.random() < self._exit_rate:
+                self._write_exit(out)
+
+    def _init_generation(self):
+        # Per-trace tuples of (id, depth, list of side exits):
+        self._traces = []
+        self._mcode_top = self.MCODE_TOP
+
+    # Write a trace record. Returns False if the trace has not been compiled
+    # because the mcode area is full (and traces have been flushed).
+    def _write_trace(self, out, aborted):
+        rnd = self._random
+        trace_id = len(self._traces) + 1
+
+        parent = None
+        if self._traces and rnd.random() < 0.6:
+            candidate = rnd.choice(self._traces)
+            if candidate[1] < self._side_depth and candidate[2]:
+                parent = candidate
+
+        fname = "app/module{}.lua".format(rnd.randrange(self._num_files))
+        line = rnd.randrange(1, 500)
+        if parent is None:
+            out.write("---- TRACE {} start {}:{}\n".format(
+                trace_id, fname, line
+            ))
+        else:
+            out.write("---- TRACE {} start {}/{} {}:{}\n".format(
+                trace_id, parent[0], rnd.choice(parent[2]), fname, line
+            ))
+
+        pc = rnd.randrange(1, 100)
+        for __ in range(max(1, self._ir_size // 3)):
+            out.write("{:04d}    {:<8} {}  {}\n".format(
+                pc, rnd.choice(BC_OPS), rnd.randrange(10), rnd.randrange(100)
+            ))
+            pc += 1
+
+        out.write("---- TRACE {} IR\n".format(trace_id))
+        is_loop = parent is None and rnd.random() < 0.5
+        num_snap = self._write_ir(out, is_loop)
+
+        if aborted:
+            out.write("---- TRACE {} abort {}:{} -- {}\n\n".format(
+                trace_id, fname, line, rnd.choice(ABORT_REASONS)
+            ))
+            return True
+
+        side_exits = self._write_mcode(out, trace_id, num_snap, is_loop)
+        if side_exits is None:
+            self._write_mcode_failure(out, trace_id, fname, line)
+            return False
+
+        if is_loop:
+            link = "loop"
+        elif parent is None:
+            link = rnd.choice(["return", "interpreter"])
+        else:
+            link = str(rnd.randrange(1, trace_id))
+        out.write("---- TRACE {} stop -> {}\n\n".format(trace_id, link))
+
+        depth = 0 if parent is None else parent[1] + 1
+        self._traces.append((trace_id, depth, side_exits))
+        return True
+
+    def _write_ir(self, out, is_loop):
+        rnd = self._random
+        num_snap = 0
+        loop_at = self._ir_size // 2 if is_loop else -1
+
+        for ref in range(1, self._ir_size + 1):
+            if ref == loop_at:
+                out.write(
+                    "{:04d} ------------ LOOP ------------\n".format(ref)
+                )
+                continue
+
+            op, irt, guard = rnd.choice(IR_OPS)
+            if guard or rnd.random() < 0.1:
+                slots = " ".join(
+                    "----" if rnd.random() < 0.5
+                    else "{:04d}".format(max(1, rnd.randrange(ref)))
+                    for __ in range(rnd.randrange(1, 8))
+                )
+                out.write("....              SNAP   #{:<3} [ {} ]\n".format(
+                    num_snap, slots
+                ))
+                num_snap += 1
+
+            reg = ""
+            if rnd.random() < 0.1:
+                reg = "[{:x}]".format(rnd.randrange(8, 0x400, 8))
+            elif rnd.random() < 0.8:
+                reg = rnd.choice(REGISTERS)
+
+            phi = "+" if is_loop and ref > loop_at and rnd.random() < 0.1 \
+                else " "
+            out.write("{:04d} {:<6}{}{} {} {:<6} {:04d}  {:04d}\n".format(
+                ref, reg, ">" if guard else " ", phi, irt, op,
+                rnd.randrange(1, ref + 1), rnd.randrange(1, ref + 1)
+            ))
+
+        return num_snap
+
+    # Write machine code of the trace and return the list of its side exits,
+    # or None (writing nothing) if it does not fit the mcode area.
+    def _write_mcode(self, out, trace_id, num_snap, is_loop):
+        rnd = self._random
+        lines = []
+        side_exits = []
+        addr = 0
+
+        size = rnd.randrange(self._mcode_size // 2, self._mcode_size * 3 // 2)
+        while addr < size:
+            if num_snap and rnd.random() < 0.15:
+                exit_no = rnd.randrange(num_snap)
+                lines.append((addr, "jnz 0xbcc0018", "\t->{}".format(exit_no)))
+                if exit_no not in side_exits:
+                    side_exits.append(exit_no)
+            else:
+                lines.append((addr, rnd.choice(MC_OPS), ""))
+            addr += rnd.randrange(3, 11)
+
+        # Traces are allocated downwards from the top of the area, which is
+        # reset on each flush. A trace bigger than the whole area is still
+        # written not to flush forever.
+        start = self._mcode_top - addr
+        if start < self.MCODE_TOP - self._mcode_area and self._traces:
+            return None
+        self._mcode_top = start
+
+        out.write("---- TRACE {} mcode {}\n".format(trace_id, addr))
+        loop_at = len(lines) // 2 if is_loop else -1
+        for num, (offset, instr, suffix) in enumerate(lines):
+            if num == loop_at:
+                out.write("-> LOOP:\n")
+            out.write("{:08x}  {:<24}{}\n".format(
+                start + offset, instr, suffix
+            ))
+
+        return side_exits
+
+    def _write_exit(self, out):
+        rnd = self._random
+        trace_id, __, side_exits = rnd.choice(self._traces)
+        if not side_exits:
+            return
+
+        out.write("---- TRACE {} exit {}\n".format(
+            trace_id, rnd.choice(side_exits)
+        ))
+        out.write("General-purpose registers\n")
+        for name in GPR_NAMES:
+            out.write("{:<3} = 0x{:016x}\n".format(
+                name, rnd.randrange(1 << 48)
+            ))
+        out.write("Floating-point registers\n")
+        for name in FPR_NAMES:
+            out.write("{:<5} = {:>17}\n".format(
+                name, "{:+}".format(rnd.randrange(-1000, 1000))
+            ))
+        out.write("\n")
+
+    def _write_flush(self, out):
+        trace_id = len(self._traces) + 1
+        out.write("---- TRACE {} start app/module0.lua:1\n".format(trace_id))
+        out.write("---- TRACE {} IR\n".format(trace_id))
+        self._write_mcode_failure(out, trace_id, "app/module0.lua", 1)
+
+    def _write_mcode_failure(self, out, trace_id, fname, line):
+        out.write("---- TRACE {} abort {}:{} -- "
+                  "failed to allocate mcode memory\n\n".format(
+                      trace_id, fname, line
+                  ))
+        out.write("---- TRACE flush\n\n")
+
+
+def parse_command_line(argv):
+    argparser = argparse.ArgumentParser(
+        description="Generate a synthetic LuaJIT plain text dump"
+    )
+    argparser.add_argument("--out", type=str, help="Path to the dump file")
+    argparser.add_argument("--traces", type=int, default=1000,
+                           help="Number of compiled traces")
+    argparser.add_argument("--side-depth", type=int, default=3,
+                           help="Maximal depth of side traces")
+    argparser.add_argument("--ir-size", type=int, default=30,
+                           help="Average number of IR instructions")
+    argparser.add_argument("--mcode-size", type=int, default=300,
+                           help="Average size of machine code in bytes")
+    argparser.add_argument("--abort-rate", type=float, default=0.2,
+                           help="Probability of aborting a recording")
+    argparser.add_argument("--exit-rate", type=float, default=0.5,
+                           help="Probability of a side exit record")
+    argparser.add_argument("--flush-every", type=int, default=0,
+                           help="Flush traces every N compiled traces")
+    argparser.add_argument("--maxmcode", type=int,
+                           default=DumpGenerator.MCODE_AREA // 1024,
+                           help="Size of the machine code area in KB, "
+                                "traces are flushed once it is full")
+    argparser.add_argument("--seed", type=int, default=1,
+                           help="Seed for the random number generator")
+    return argparser.parse_args(argv[1:])
+
+
+def main(argv=None):
+    argv = argv or sys.argv
+    args = parse_command_line(argv)
+
+    if args.maxmcode <= 0:
+        sys.exit("Bad maxmcode {}".format(args.maxmcode))
+
+    generator = DumpGenerator(
+        num_traces=args.traces,
+        side_depth=args.side_depth,
+        ir_size=args.ir_size,
+        mcode_size=args.mcode_size,
+        abort_rate=args.abort_rate,
+        exit_rate=args.exit_rate,
+        flush_every=args.flush_every,
+        seed=args.seed,
+        mcode_area=args.maxmcode * 1024,
+    )
+
+    if args.out is None:
+        generator.write(sys.stdout)
+    else:
+        with open(args.out, "w") as out:
+            generator.write(out)
+
+
+if __name__ == "__main__":
+    main()
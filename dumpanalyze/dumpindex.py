@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+#
+# Index of a dump for browsing it without keeping the text of traces.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import collections
+import os
+import pickle
+import re
+
+from dumpanalyze.dumpparser import DumpParser
+from dumpanalyze.exitcoverage import ExitCoverage
+from dumpanalyze.traceforest import TraceForest
+from dumpanalyze.view.htmlreport import ViewHtmlReport
+
+
+# A binary line iterator over the dump remembering byte offsets of trace
+# start records, so that the text of a trace can be read back by seeking.
+class _OffsetReader:
+
+    def __init__(self, fname):
+        self._dump_f = open(fname, "rb")
+        self._lines = iter(self._dump_f)
+        self._offset = 0
+        self._line = 0
+        self._starts = {}
+
+    # Byte offsets of trace start records by line numbers
+    @property
+    def starts(self):
+        return self._starts
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        raw = next(self._lines)
+        self._line += 1
+        if raw.startswith(b"---- TRACE ") and b" start " in raw:
+            self._starts[self._line] = self._offset
+        self._offset += len(raw)
+        # Errors are ignored the same way the parser does for text files:
+        return raw.decode("utf-8", errors="ignore")
+
+    def close(self):
+        self._dump_f.close()
+
+
+class DumpIndex:
+
+    # Columns of rows of traces, bushes and abort reasons per generation
+    TRACE_COLUMNS = [
+        "id", "parent", "link_type", "file", "line", "num_bc", "num_ir",
+        "num_sn", "size_mcode", "bush",
+    ]
+    BUSH_COLUMNS = [
+        "root", "file", "line", "num_traces", "size_mcode", "num_uncovered",
+    ]
+    ABORT_COLUMNS = ["category", "count", "num_variants", "num_locations"]
+
+    # Headers delimiting sections of a trace in the dump
+    re_section = re.compile(r"^---- TRACE (\d+) (IR|mcode|stop)")
+
+    # Bumped whenever the layout of saved indices changes
+    VERSION = 1
+
+    # The index holds statistics of traces, bushes and abort reasons of each
+    # generation along with byte offsets of compiled traces in the dump. The
+    # text of traces is never kept in memory.
+    def __init__(self, fname):
+        self._fname = fname
+        self._signature = self._dump_signature(fname)
+        self._generations = []
+
+    @property
+    def fname(self):
+        return self._fname
+
+    # Summaries of generations, as listed in the HTML report
+    @property
+    def generations(self):
+        return [entry["summary"] for entry in self._generations]
+
+    @property
+    def num_generations(self):
+        return len(self._generations)
+
+    def traces(self, generation):
+        return self._generation(generation)["traces"]
+
+    def bushes(self, generation):
+        return self._generation(generation)["bushes"]
+
+    def aborts(self, generation):
+        return self._generation(generation)["aborts"]
+
+    # Data of the bush for the HTML report page (or None), the text of each
+    # trace being in a chunk of its own named after the trace ID.
+    def bush_data(self, generation, root_id):
+        return self._generation(generation)["graphs"].get(root_id)
+
+    @staticmethod
+    def _dump_signature(fname):
+        stat = os.stat(fname)
+        return (stat.st_size, stat.st_mtime)
+
+    def _generation(self, generation):
+        if not 1 <= generation <= len(self._generations):
+            raise KeyError("Unknown generation {}".format(generation))
+        return self._generations[generation - 1]
+
+    def build(self):
+        reader = _OffsetReader(self._fname)
+        parser = DumpParser(reader, keep_text=False, tolerant=True)
+
+        self._generations = []
+        while True:
+            status = parser.parse()
+            self._add_generation(
+                len(self._generations) + 1, parser, reader.starts,
+                status == parser.PARSED_GENERATION
+            )
+            reader.starts.clear()
+            if status == parser.PARSED_DUMP:
+                break
+
+    def _add_generation(self, generation, parser, starts, flushed):
+        traces = parser.traces
+        forest = TraceForest(traces)
+        ExitCoverage(forest, parser.exits, parser.abort_reasons)
+
+        bush_rows = []
+        trace_rows = []
+        graphs = {}
+        for root_id, bush in sorted(forest.bushes.items()):
+            bush_traces = bush.load_traces()
+            root = bush_traces[0]
+            bush_rows.append((
+                root_id, root.file, root.line, len(bush_traces),
+                sum(trace.size_mcode for trace in bush_traces),
+                len(bush.uncovered_exits),
+            ))
+            for trace in bush_traces:
+                trace_rows.append((
+                    trace.id, trace.parent, trace.link_type, trace.file,
+                    trace.line, trace.num_bc, trace.num_ir, trace.num_sn,
+                    trace.size_mcode, root_id,
+                ))
+            graphs[root_id] = ViewHtmlReport.bush_data(
+                root_id, bush, bush_traces
+            )
+            for trace_row in graphs[root_id]["traces"]:
+                trace_row[-1] = trace_row[0]
+        trace_rows.sort()
+
+        variants = collections.defaultdict(set)
+        locations = collections.defaultdict(set)
+        counts = collections.Counter()
+        for ar in parser.abort_reasons:
+            counts[ar.category] += 1
+            variants[ar.category].add(ar.reason)
+            locations[ar.category].add((ar.file, ar.line))
+        abort_rows = [
+            (category, count, len(variants[category]),
+             len(locations[category]))
+            for category, count in sorted(
+                counts.items(), key=lambda x: (-x[1], x[0])
+            )
+        ]
+
+        self._generations.append({
+            "summary": {
+                "generation": generation,
+                "traces": len(traces),
+                "bushes": len(bush_rows),
+                "aborts": len(parser.abort_reasons),
+                "flushed": flushed,
+            },
+            "traces": trace_rows,
+            "bushes": bush_rows,
+            "aborts": abort_rows,
+            "graphs": graphs,
+            "offsets": {trace.id: starts[trace.pos] for trace in traces},
+        })
+
+    # Save the index to `fname` to skip parsing the dump next time.
+    def save(self, fname):
+        with open(fname, "wb") as out:
+            pickle.dump((self.VERSION, self._signature, self._generations),
+                        out, protocol=pickle.HIGHEST_PROTOCOL)
+
+    # Load the index of the dump `dump_fname` saved to `fname`. Returns None
+    # if there is no saved index or the dump has changed since then.
+    @classmethod
+    def load(cls, fname, dump_fname):
+        index = cls(dump_fname)
+        try:
+            with open(fname, "rb") as saved:
+                version, signature, generations = pickle.load(saved)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+        if version != cls.VERSION or signature != index._signature:
+            return None
+        index._generations = generations
+        return index
+
+    # Return the text of bytecode, IR and machine code of the trace read
+    # from the dump, or None if there is no such compiled trace.
+    def trace_sections(self, generation, trace_id):
+        offset = self._generation(generation)["offsets"].get(trace_id)
+        if offset is None:
+            return None
+
+        sections = {"bc": [], "IR": [], "mcode": []}
+        with open(self._fname, "rb") as dump_f:
+            dump_f.seek(offset)
+            dump_f.readline()  # Trace start record
+            section = sections["bc"]
+            for raw in dump_f:
+                line = raw.decode("utf-8", errors="ignore")
+                match = self.re_section.match(line)
+                if match and int(match.group(1)) == trace_id:
+                    if match.group(2) == "stop":
+                        break
+                    section = sections[match.group(2)]
+                elif line.startswith("---- TRACE "):
+                    # Should not happen in a consistent dump
+                    break
+                elif line != "\n":
+                    section.append(line)
+
+        return ["".join(sections[name]) for name in ["bc", "IR", "mcode"]]
@@ -27,8 +27,15 @@
 import sys
 import re
 
+from dumpanalyze.bodystore import BodyStore
 from dumpanalyze.trace import Trace
 from dumpanalyze.abortreason import AbortReason
+from dumpanalyze.traceexit import TraceExit, TraceExitLog
+from dumpanalyze.tracestore import TraceStore
+
+
+class DumpError(Exception):
+    pass
 
 
 class DumpParser:
@@ -51,14 +58,59 @@ class DumpParser:
         PARSER_IR, PARSER_MCODE, PARSER_STOP, PARSER_ABORT
     ]
 
+    # States of a trace which is not complete yet:
+    UNFINISHED_STATES = [
+        PARSER_START, PARSER_IR, PARSER_MCODE
+    ]
+
+    # States which are processed while resynchronizing after an anomaly:
+    RESYNC_STATES = [
+        PARSER_START, PARSER_EXIT, PARSER_FLUSH
+    ]
+
+    # Errors caused by malformed lines, tolerated in the tolerant mode:
+    MALFORMED_LINE_ERRORS = (
+        ValueError, IndexError, AttributeError, OverflowError
+    )
+
     # Regular expression to detect a new logical portion of
     # trace-related data or a global trace flush:
     re_trace_header = re.compile(r"^---- TRACE (?:(\d+ )?(\S+))")
 
-    def __init__(self, dump):
+    # `dump` is either a file name or a text stream (e.g. a part of a dump).
+    # If `keep_text` is False, traces do not retain the raw text of their
+    # bytecode, IR and machine code, collecting statistics only.
+    # If `decode_exits` is True, register dumps of trace exits are decoded.
+    # If `memory_limit` (in bytes) is set, completed traces are spilled to
+    # disk once they exceed it (see TraceStore). The limit does not cover
+    # aborts, exits and other data collected along the dump.
+    # If `tolerant` is True, inconsistent or malformed data does not stop
+    # parsing: the broken trace is dropped, parsing resumes from the next
+    # trace start and the anomaly is recorded.
+    def __init__(self, dump, keep_text=True, decode_exits=False,
+                 memory_limit=None, tolerant=False):
         # Errors are ignored because non-UTF-8 string values
         # may appear in the dumps.
-        self._dump_f = open(dump, "r", errors="ignore")
+        if isinstance(dump, str):
+            self._dump_f = open(dump, "r", errors="ignore")
+        else:
+            self._dump_f = dump
+        self._keep_text = keep_text
+        self._decode_exits = decode_exits
+        self._memory_limit = memory_limit
+        self._tolerant = tolerant
+
+        # List of (line number, description) of all anomalies in the dump:
+        self._anomalies = []
+
+        # Identical sections of traces are stored only once. The store is
+        # cleared on each generation to let the memory of previous
+        # generations be released.
+        self._body_store = BodyStore()
+
+        # Number of the last read line, counted from the beginning
+        # of the dump (not of the current generation):
+        self._line = 0
 
         self._init_parser()
 
@@ -73,23 +125,59 @@ class DumpParser:
     def abort_reasons(self):
         return self._abort_reasons
 
+    @property
+    def exits(self):
+        return self._exits
+
+    @property
+    def body_store(self):
+        return self._body_store
+
+    @property
+    def line(self):
+        return self._line
+
+    @property
+    def anomalies(self):
+        return self._anomalies
+
     def parse(self):
         self._init_parser()
 
         for line in self._dump_f:
             self._line += 1
-            self._parse_line(line)
+            try:
+                self._parse_line(line)
+            except DumpError as e:
+                self._handle_anomaly(str(e))
+            except self.MALFORMED_LINE_ERRORS as e:
+                self._handle_anomaly("Malformed line: {}".format(e))
             if self._state == self.PARSER_FLUSH:
                 return self.PARSED_GENERATION
 
+        if self._tolerant and self._trace is not None and \
+                self._state in self.UNFINISHED_STATES:
+            self._anomalies.append((self._line, (
+                "Unexpected end of dump, dropping trace {}"
+                .format(self._trace.id)
+            )))
+
         return self.PARSED_DUMP
 
     def _init_parser(self):
-        self._line = 0
         self._state = self.PARSER_INIT
         self._trace = None
-        self._traces = []
+        self._exit = None
+        self._resync = False
+        if self._memory_limit is None:
+            self._traces = []
+        else:
+            self._traces = TraceStore(
+                self._memory_limit, on_spill=self._body_store.clear
+            )
         self._abort_reasons = []
+        self._exits = TraceExitLog()
+        self._body_store.clear()
 
     def _parse_line(self, line):
         if line == "\n":
@@ -97,28 +185,93 @@ class DumpParser:
 
         match = self.re_trace_header.match(line)
         if match:
+            state = match.group(2)
+            if self._resync and state not in self.RESYNC_STATES:
+                # Data of the skipped record is skipped as well:
+                self._state = self.PARSER_INIT
+                self._exit = None
+                return
             trace_id = int(match.group(1) or 0)
-            self._parse_header_line(line, match.group(2), trace_id)
+            self._parse_header_line(line, state, trace_id)
+        elif self._state == self.PARSER_EXIT:
+            # Register dumps are skipped unless they are decoded
+            if self._exit is not None:
+                self._exit.process_data(line)
+        elif self._resync:
+            return
+        elif self._trace is None:
+            raise DumpError("Unexpected data outside of a trace")
         else:
             self._trace.process_data(self._state, line)
 
     def _parse_header_line(self, line, state, trace_id):
         self._state = state
+        # Any header completes the previous exit record:
+        self._exit = None
 
-        if state in self.ASSERTABLE_STATES and trace_id != self._trace.id:
-            sys.exit(
-                "Line {}, in state={}: Expected trace ID {}, got {}"
-                .format(self._line, self._state, self._trace.id, trace_id)
-            )
+        if state in self.ASSERTABLE_STATES:
+            if self._trace is None:
+                raise DumpError(
+                    "Unexpected header of trace {} outside of a trace"
+                    .format(trace_id)
+                )
+            if trace_id != self._trace.id:
+                raise DumpError(
+                    "Expected trace ID {}, got {}"
+                    .format(self._trace.id, trace_id)
+                )
 
         if state == self.PARSER_ABORT:
-            self._abort_reasons.append(AbortReason(line))
+            bc_ops = self._trace.bc_ops
+            self._abort_reasons.append(AbortReason(
+                line, pos=self._line, parent=self._trace.parent,
+                last_bc=bc_ops[-1] if bc_ops else None,
+                start_file=self._trace.file, start_line=self._trace.line,
+            ))
+            return
+
+        if state == self.PARSER_EXIT:
+            if self._decode_exits:
+                self._exit = TraceExit(line, pos=self._line, decode=True)
+                self._exits.append(
+                    self._exit.trace_id, self._exit.exit, self._line,
+                    self._exit
+                )
+            else:
+                trace_id, exit_no = TraceExit.parse_header(line)
+                self._exits.append(trace_id, exit_no, self._line)
+            return
+
+        if state == self.PARSER_FLUSH:
             return
 
         if state == self.PARSER_START:
-            self._trace = Trace(trace_id)
+            self._resync = False
+            self._trace = Trace(
+                trace_id,
+                keep_text=self._keep_text,
+                body_store=self._body_store,
+                pos=self._line,
+            )
 
         self._trace.process_header(state, line)
 
         if state == self.PARSER_STOP:
             self._traces.append(self._trace)
+
+    # In the strict mode, stop on the first anomaly. Otherwise record it,
+    # drop the current trace and skip everything up to the next trace start.
+    def _handle_anomaly(self, message):
+        if not self._tolerant:
+            sys.exit("Line {}, in state={}: {}".format(
+                self._line, self._state, message
+            ))
+
+        self._anomalies.append((self._line, message))
+        # An exit record broken in the middle is dropped as well:
+        if self._exit is not None:
+            self._exits.pop()
+        self._state = self.PARSER_INIT
+        self._trace = None
+        self._exit = None
+        self._resync = True
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# Hot side exits not covered by compiled side traces.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import collections
+
+
+class UncoveredExit:
+
+    STATUS_ABORTED = "aborted"
+    STATUS_NOT_COMPILED = "not compiled"
+
+    def __init__(self, trace_id, exit, num_exits, reasons):
+        self._trace_id = trace_id
+        self._exit = exit
+        self._num_exits = num_exits
+        self._reasons = reasons
+
+    @property
+    def trace_id(self):
+        return self._trace_id
+
+    @property
+    def exit(self):
+        return self._exit
+
+    # Number of times the exit was taken
+    @property
+    def num_exits(self):
+        return self._num_exits
+
+    # Number of aborted attempts to compile a side trace from the exit
+    @property
+    def num_aborts(self):
+        return sum(self._reasons.values())
+
+    # Counter of abort reason categories of side trace attempts
+    @property
+    def reasons(self):
+        return self._reasons
+
+    @property
+    def status(self):
+        if self._reasons:
+            return self.STATUS_ABORTED
+        return self.STATUS_NOT_COMPILED
+
+
+# Exits without side traces are found by joining exit events and aborted
+# side trace attempts of a generation with the forest's (trace, exit) ->
+# side trace index, so the cost is linear in the number of events.
+class ExitCoverage:
+
+    # Number of exits after which LuaJIT tries to compile a side trace
+    # (the default value of the "hotexit" JIT parameter)
+    HOT_EXIT = 10
+
+    def __init__(self, forest, exits, abort_reasons, hot_exit=HOT_EXIT):
+        side_traces = forest.side_traces
+
+        counts = collections.Counter()
+        for key, count in exits.counts().items():
+            if key not in side_traces:
+                counts[key] = count
+
+        reasons = collections.defaultdict(collections.Counter)
+        for ar in abort_reasons:
+            if not ar.parent:
+                continue
+            trace_id, exit_no = ar.parent.split("/")
+            key = (int(trace_id), int(exit_no))
+            if key not in side_traces:
+                reasons[key][ar.category] += 1
+
+        uncovered = []
+        for key in set(counts) | set(reasons):
+            if counts[key] < hot_exit and key not in reasons:
+                continue
+            entry = UncoveredExit(
+                key[0], key[1], counts[key], reasons[key]
+            )
+            uncovered.append(entry)
+
+            bush = forest.bush_of(entry.trace_id)
+            if bush is not None:
+                bush.add_uncovered_exit(entry)
+
+        uncovered.sort(key=lambda x: (
+            -x.num_exits, -x.num_aborts, x.trace_id, x.exit
+        ))
+        self._uncovered = uncovered
+
+    # Uncovered hot exits, the most frequently taken first
+    @property
+    def uncovered(self):
+        return self._uncovered
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#
+# Map of machine code addresses to compiled traces.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import array
+import bisect
+import collections
+
+
+class McodeMap:
+
+    # Traces of different generations may occupy the same addresses because
+    # the machine code area is reused after each flush. Addresses are looked
+    # up starting from the latest generation.
+    def __init__(self):
+        self._generations = {}
+        self._order = []
+
+    @property
+    def size(self):
+        return sum(len(entries.ids) for entries in self._generations.values())
+
+    def add(self, generation, trace):
+        if not trace.mcode_addr:
+            return
+        entries = self._generations.get(generation)
+        if entries is None:
+            entries = _McodeEntries()
+            self._generations[generation] = entries
+            self._order = sorted(self._generations, reverse=True)
+        entries.add(trace)
+
+    def add_traces(self, generation, traces):
+        for trace in traces:
+            self.add(generation, trace)
+
+    # Return a tuple of (generation, trace ID, side exit) for the `addr`, or
+    # None if the address does not belong to any trace. The side exit is the
+    # one of the last guard preceding the address (or None if the address
+    # precedes all guards of the trace).
+    def lookup(self, addr):
+        for generation in self._order:
+            found = self._generations[generation].lookup(addr)
+            if found is not None:
+                return (generation,) + found
+        return None
+
+    # Attribute an iterable of addresses (e.g. perf samples) to traces.
+    # Return a Counter keyed with results of `lookup`: addresses which do
+    # not belong to any trace are counted under None.
+    def attribute(self, addrs):
+        # Samples are usually concentrated in a few hot spots, so each
+        # distinct address is looked up only once:
+        counts = collections.Counter(addrs)
+        result = collections.Counter()
+        for addr, count in counts.items():
+            result[self.lookup(addr)] += count
+        return result
+
+
+class _McodeEntries:
+
+    def __init__(self):
+        self._dirty = False
+        self.starts = array.array("Q")
+        self.ends = array.array("Q")
+        self.ids = array.array("I")
+        self.exits = []  # Pairs of (guard addresses, side exits)
+
+    def add(self, trace):
+        start = trace.mcode_addr
+        if self.starts and start < self.starts[-1]:
+            self._dirty = True
+        self.starts.append(start)
+        self.ends.append(start + trace.size_mcode)
+        self.ids.append(trace.id)
+        self.exits.append((trace.exit_addrs, trace.exit_nums))
+
+    def lookup(self, addr):
+        if self._dirty:
+            self._sort()
+
+        index = bisect.bisect_right(self.starts, addr) - 1
+        if index < 0 or addr >= self.ends[index]:
+            return None
+
+        exit_addrs, exit_nums = self.exits[index]
+        exit_index = bisect.bisect_right(exit_addrs, addr) - 1
+        exit_num = exit_nums[exit_index] if exit_index >= 0 else None
+        return self.ids[index], exit_num
+
+    def _sort(self):
+        order = sorted(range(len(self.starts)), key=self.starts.__getitem__)
+        self.starts = array.array("Q", (self.starts[i] for i in order))
+        self.ends = array.array("Q", (self.ends[i] for i in order))
+        self.ids = array.array("I", (self.ids[i] for i in order))
+        self.exits = [self.exits[i] for i in order]
+        self._dirty = False
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+#
+# Usage of the machine code area per generation.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import array
+
+
+class McodeGeneration:
+
+    # Number of the biggest bushes tracked per generation
+    TOP_BUSHES = 5
+
+    def __init__(self, generation, growth_interval):
+        self._generation = generation
+        self._growth_interval = growth_interval
+        self._num_traces = 0
+        self._size_mcode = 0
+        self._addr_min = None
+        self._addr_max = None
+        self._bushes = {}
+        self._mcode_full = False
+        self._flushed = False
+        # Cumulative mcode size after each `growth_interval` traces:
+        self._growth = array.array("Q")
+
+    @property
+    def generation(self):
+        return self._generation
+
+    @property
+    def num_traces(self):
+        return self._num_traces
+
+    # Cumulative size of the machine code of all traces
+    @property
+    def size_mcode(self):
+        return self._size_mcode
+
+    # Distance between the lowest and the highest mcode address, which
+    # also accounts for gaps between traces
+    @property
+    def span_mcode(self):
+        if self._addr_min is None:
+            return 0
+        return self._addr_max - self._addr_min
+
+    # List of (root trace ID, mcode size) of the biggest bushes
+    @property
+    def top_bushes(self):
+        return sorted(
+            self._bushes.items(), key=lambda x: (-x[1], x[0])
+        )[:self.TOP_BUSHES]
+
+    @property
+    def growth(self):
+        return self._growth
+
+    # Mean number of mcode bytes per `growth_interval` traces over the
+    # complete intervals sampled (None if the generation is shorter than
+    # a single interval)
+    @property
+    def growth_rate(self):
+        if not self._growth:
+            return None
+        return self._growth[-1] / len(self._growth)
+
+    # Mean number of mcode bytes per trace over the last growth interval
+    # (over the whole generation if it is shorter)
+    @property
+    def recent_trace_size(self):
+        if len(self._growth) < 2:
+            if not self._num_traces:
+                return 0.0
+            return self._size_mcode / self._num_traces
+        return (self._growth[-1] - self._growth[-2]) / self._growth_interval
+
+    # True if the generation ended with a flush...
+    @property
+    def flushed(self):
+        return self._flushed
+
+    # ...and if there were aborts due to the exhausted mcode area.
+    @property
+    def mcode_full(self):
+        return self._mcode_full
+
+    def add(self, trace, root_id):
+        self._num_traces += 1
+        self._size_mcode += trace.size_mcode
+        self._bushes[root_id] = self._bushes.get(root_id, 0) + \
+            trace.size_mcode
+
+        if trace.mcode_addr:
+            start = trace.mcode_addr
+            end = start + trace.size_mcode
+            if self._addr_min is None or start < self._addr_min:
+                self._addr_min = start
+            if self._addr_max is None or end > self._addr_max:
+                self._addr_max = end
+
+        if self._num_traces % self._growth_interval == 0:
+            self._growth.append(self._size_mcode)
+
+    def finish(self, flushed, mcode_full):
+        self._flushed = flushed
+        self._mcode_full = mcode_full
+
+
+class McodeUsage:
+
+    # Abort reasons caused by the exhausted mcode area:
+    MCODE_FULL_REASONS = frozenset([
+        "failed to allocate mcode memory",
+        "hit mcode limit (retrying)",
+    ])
+
+    # Growth of the mcode area is sampled each `growth_interval` traces.
+    # `maxmcode` (in bytes, as the JIT parameter of the same name) is used
+    # to forecast how close generations come to a flush.
+    def __init__(self, maxmcode=None, growth_interval=100):
+        self._maxmcode = maxmcode
+        self._growth_interval = growth_interval
+        self._generations = []
+
+    @property
+    def maxmcode(self):
+        return self._maxmcode
+
+    @property
+    def growth_interval(self):
+        return self._growth_interval
+
+    @property
+    def generations(self):
+        return self._generations
+
+    def add_generation(self, generation, traces, forest, abort_reasons,
+                       flushed):
+        entry = McodeGeneration(generation, self._growth_interval)
+        for trace in traces:
+            entry.add(trace, forest.bush_of(trace.id).root_id)
+
+        mcode_full = any(
+            ar.category in self.MCODE_FULL_REASONS for ar in abort_reasons
+        )
+        entry.finish(flushed, mcode_full)
+        self._generations.append(entry)
+
+    # Return the share of `maxmcode` used by the generation (or None).
+    def usage(self, entry):
+        if not self._maxmcode:
+            return None
+        return entry.size_mcode / self._maxmcode
+
+    # Return the estimated number of traces which still fit into `maxmcode`
+    # at the recent growth rate (None if unknown or already flushed).
+    def traces_to_flush(self, entry):
+        if not self._maxmcode or entry.flushed:
+            return None
+        trace_size = entry.recent_trace_size
+        if not trace_size:
+            return None
+        headroom = max(self._maxmcode - entry.size_mcode, 0)
+        return int(headroom / trace_size)
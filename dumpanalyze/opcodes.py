@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# Tables for encoding names found in dumps as small integers.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import threading
+
+
+# A bidirectional mapping of names to small integer codes. Codes of known
+# names are stable, unknown names get new codes on first lookup, so dumps
+# produced by patched VMs are still handled.
+class CodeTable:
+
+    def __init__(self, names):
+        self._names = list(names)
+        self._codes = {name: code for code, name in enumerate(self._names)}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def code(self, name):
+        code = self._codes.get(name)
+        if code is not None:
+            return code
+
+        with self._lock:
+            code = self._codes.get(name)
+            if code is None:
+                code = len(self._names)
+                self._names.append(name)
+                self._codes[name] = code
+            return code
+
+    def name(self, code):
+        return self._names[code]
+
+
+# Bytecode opcodes as listed in lj_bc.h (opcodes specific to the VM the dump
+# was produced by are added on first lookup)
+BC_OPCODES = CodeTable([
+    "ISLT", "ISGE", "ISLE", "ISGT", "ISEQV", "ISNEV", "ISEQS", "ISNES",
+    "ISEQN", "ISNEN", "ISEQP", "ISNEP", "ISTC", "ISFC", "IST", "ISF",
+    "ISTYPE", "ISNUM", "MOV", "NOT", "UNM", "LEN", "ADDVN", "SUBVN", "MULVN",
+    "DIVVN", "MODVN", "ADDNV", "SUBNV", "MULNV", "DIVNV", "MODNV", "ADDVV",
+    "SUBVV", "MULVV", "DIVVV", "MODVV", "POW", "CAT", "KSTR", "KCDATA",
+    "KSHORT", "KNUM", "KPRI", "KNIL", "UGET", "USETV", "USETS", "USETN",
+    "USETP", "UCLO", "FNEW", "TNEW", "TDUP", "GGET", "GSET", "TGETV", "TGETS",
+    "TGETB", "TGETR", "TSETV", "TSETS", "TSETB", "TSETM", "TSETR", "CALLM",
+    "CALL", "CALLMT", "CALLT", "ITERC", "ITERN", "VARG", "ISNEXT", "RETM",
+    "RET", "RET0", "RET1", "FORI", "JFORI", "FORL", "IFORL", "JFORL", "ITERL",
+    "IITERL", "JITERL", "LOOP", "ILOOP", "JLOOP", "JMP", "FUNCF", "IFUNCF",
+    "JFUNCF", "FUNCV", "IFUNCV", "JFUNCV", "FUNCC", "FUNCCW",
+])
+
+# IR opcodes as listed in lj_ir.h
+IR_OPCODES = CodeTable([
+    "LT", "GE", "LE", "GT", "ULT", "UGE", "ULE", "UGT", "EQ", "NE", "ABC",
+    "RETF", "NOP", "BASE", "PVAL", "GCSTEP", "HIOP", "LOOP", "USE", "PHI",
+    "RENAME", "PROF", "KPRI", "KINT", "KGC", "KPTR", "KKPTR", "KNULL", "KNUM",
+    "KINT64", "KSLOT", "BNOT", "BSWAP", "BAND", "BOR", "BXOR", "BSHL",
+    "BSHR", "BSAR", "BROL", "BROR", "ADD", "SUB", "MUL", "DIV", "MOD", "POW",
+    "NEG", "ABS", "ATAN2", "LDEXP", "MIN", "MAX", "FPMATH", "ADDOV", "SUBOV",
+    "MULOV", "AREF", "HREFK", "HREF", "NEWREF", "UREFO", "UREFC", "FREF",
+    "STRREF", "LREF", "ALOAD", "HLOAD", "ULOAD", "FLOAD", "XLOAD", "SLOAD",
+    "VLOAD", "ASTORE", "HSTORE", "USTORE", "FSTORE", "XSTORE", "SNEW",
+    "XSNEW", "TNEW", "TDUP", "CNEW", "CNEWI", "BUFHDR", "BUFPUT", "BUFSTR",
+    "TBAR", "OBAR", "XBAR", "CONV", "TOBIT", "TOSTR", "STRTO", "CALLN",
+    "CALLA", "CALLL", "CALLS", "CALLXS", "CARG",
+])
+
+# IR types as printed by jit.dump
+IR_TYPES = CodeTable([
+    "nil", "fal", "tru", "lud", "str", "p32", "thr", "pro", "fun", "p64",
+    "cdt", "tab", "udt", "flt", "num", "i8", "u8", "i16", "u16", "int",
+    "u32", "i64", "u64", "sfp",
+])
+
+# Registers allocated for IR instructions on x64
+REGISTERS = CodeTable(
+    ["rax", "rcx", "rdx", "rbx", "rsp", "rbp", "rsi", "rdi",
+     "r8", "r9", "r10", "r11", "r12", "r13", "r14", "r15"] +
+    ["xmm{}".format(i) for i in range(16)]
+)
+
+IR_CALLS = frozenset(
+    IR_OPCODES.code(op)
+    for op in ["CALLN", "CALLA", "CALLL", "CALLS", "CALLXS"]
+)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+#
+# Reader of samples from the text output of 'perf script'.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import re
+
+
+class PerfScriptReader:
+    # A sample line with an instruction pointer, e.g.:
+    # luajit 1234 [002] 5.678:  250000 cycles:  7f5c3bfde608 [unknown] (dso)
+    re_sample = re.compile(r":\s+([0-9a-f]+)\s+[^:]*\(.*\)\s*$")
+    # A sample line without an instruction pointer, followed by a callchain:
+    re_sample_header = re.compile(r":\s*$")
+    # A callchain frame or a bare instruction pointer (`perf script -F ip`):
+    re_address = re.compile(r"^(?:\s+([0-9a-f]+)(?:\s|$)|([0-9a-f]+)\s*$)")
+
+    def __init__(self, fname):
+        self._fname = fname
+
+    # Yield instruction pointers of all samples as integers.
+    def __iter__(self):
+        in_callchain = False
+        want_frame = False
+
+        with open(self._fname, "r", errors="ignore") as fh:
+            for line in fh:
+                if line == "\n":
+                    in_callchain = False
+                    want_frame = False
+                    continue
+
+                match = self.re_address.match(line)
+                if match and (want_frame or not in_callchain):
+                    # Only the innermost frame of a callchain is a sample
+                    yield int(match.group(1) or match.group(2), 16)
+                    want_frame = False
+                    continue
+
+                match = self.re_sample.search(line)
+                if match:
+                    yield int(match.group(1), 16)
+                    in_callchain = True
+                elif self.re_sample_header.search(line):
+                    in_callchain = True
+                    want_frame = True
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+#
+# Approximate summary of a dump from sampled parts.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import collections
+import io
+import math
+import os
+import random
+import re
+
+from dumpanalyze.dumpparser import DumpParser
+
+
+class Estimate:
+
+    # `error` is the half-width of the 95% confidence interval (None if
+    # unknown). It is 0 for exact values, but also for sampled ones if all
+    # samples have the same density (e.g. no occurrences at all), so use
+    # SampledSummary.exact to tell exact values apart.
+    def __init__(self, value, error):
+        self._value = value
+        self._error = error
+
+    @property
+    def value(self):
+        return self._value
+
+    @property
+    def error(self):
+        return self._error
+
+
+class SampledSummary:
+
+    def __init__(self, size, num_samples, sampled_bytes, estimates, reasons):
+        self._size = size
+        self._num_samples = num_samples
+        self._sampled_bytes = sampled_bytes
+        self._estimates = estimates
+        self._reasons = reasons
+
+    # Size of the dump in bytes
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def num_samples(self):
+        return self._num_samples
+
+    # Share of the dump actually parsed
+    @property
+    def fraction(self):
+        return min(self._sampled_bytes / self._size, 1.0) if self._size else 1
+
+    @property
+    def exact(self):
+        return self.fraction == 1
+
+    # Return the estimate of one of DumpSampler.COUNTERS.
+    def estimate(self, name):
+        return self._estimates[name]
+
+    # Estimates of the number of aborts per reason category, the most
+    # frequent first
+    @property
+    def reasons(self):
+        return self._reasons
+
+
+# The dump is split into `num_samples` strata of equal size, and
+# `sample_size` bytes are parsed from a random offset within each of them.
+# Each sample starts from the first trace start (or flush) after the offset
+# and includes all traces starting within it. A sample extended to complete
+# its last trace may reach the next stratum, so the next sample starts after
+# it not to count any trace twice. Totals are extrapolated from the densities
+# of events per byte.
+class DumpSampler:
+
+    COUNTERS = [
+        "traces", "side_traces", "size_mcode", "aborts", "exits", "flushes",
+    ]
+
+    # Quantile of the normal distribution for 95% confidence intervals
+    Z_95 = 1.96
+
+    # Samples are extended up to this number of times the `sample_size` to
+    # complete the last trace.
+    MAX_EXTENSION = 4
+
+    re_sync = re.compile(rb"^---- TRACE (?:\d+ start |flush)", re.MULTILINE)
+
+    def __init__(self, fname, num_samples=64, sample_size=256 * 1024, seed=1):
+        self._fname = fname
+        self._num_samples = num_samples
+        self._sample_size = sample_size
+        self._random = random.Random(seed)
+
+    def summarize(self):
+        size = os.path.getsize(self._fname)
+
+        with open(self._fname, "rb") as dump:
+            if size <= self._num_samples * self._sample_size:
+                # Small dumps are parsed completely:
+                samples = [self._count(dump.read())]
+            else:
+                stratum = size / self._num_samples
+                samples = []
+                end = 0
+                for i in range(self._num_samples):
+                    offset = int(i * stratum) + self._random.randrange(
+                        int(stratum) - self._sample_size + 1
+                    )
+                    data, end = self._read(dump, max(offset, end))
+                    samples.append(self._count(data))
+
+        sampled_bytes = sum(sample[0] for sample in samples)
+        estimates = {
+            name: self._extrapolate(
+                size, sampled_bytes, [(b, c[name]) for b, c, __ in samples]
+            )
+            for name in self.COUNTERS
+        }
+
+        categories = collections.Counter()
+        for __, __, reasons in samples:
+            categories.update(reasons)
+        reasons = [
+            (category, self._extrapolate(
+                size, sampled_bytes,
+                [(b, r[category]) for b, __, r in samples]
+            ))
+            for category, __ in categories.most_common()
+        ]
+
+        return SampledSummary(
+            size, len(samples), sampled_bytes, estimates, reasons
+        )
+
+    # Read a sample starting from the first trace start after the `offset`.
+    # Returns the sample and the offset right after it.
+    def _read(self, dump, offset):
+        dump.seek(offset)
+        data = dump.read(self._sample_size)
+        match = self.re_sync.search(data) if offset else None
+        if offset and match is None:
+            return b"", offset + len(data)
+        start = match.start() if match else 0
+
+        # Extend the sample up to the start of the next trace:
+        extension = b""
+        limit = self._sample_size * self.MAX_EXTENSION
+        while len(extension) < limit:
+            line = dump.readline()
+            if not line or self.re_sync.match(line):
+                break
+            extension += line
+
+        return data[start:] + extension, offset + len(data) + len(extension)
+
+    # Return a tuple of (number of bytes, counters, reason categories) of
+    # the sample.
+    def _count(self, data):
+        counters = dict.fromkeys(self.COUNTERS, 0)
+        reasons = collections.Counter()
+
+        stream = io.StringIO(data.decode("utf-8", errors="ignore"))
+        parser = DumpParser(stream, keep_text=False, tolerant=True)
+        while True:
+            status = parser.parse()
+            for trace in parser.traces:
+                counters["traces"] += 1
+                counters["side_traces"] += not trace.is_root
+                counters["size_mcode"] += trace.size_mcode
+            for ar in parser.abort_reasons:
+                reasons[ar.category] += 1
+            counters["aborts"] += len(parser.abort_reasons)
+            counters["exits"] += len(parser.exits)
+            if status == parser.PARSED_DUMP:
+                break
+            counters["flushes"] += 1
+
+        return len(data), counters, reasons
+
+    # Extrapolate counts of samples given as (bytes, count) to the whole
+    # dump of `size` bytes.
+    def _extrapolate(self, size, sampled_bytes, samples):
+        if sampled_bytes >= size:
+            return Estimate(sum(count for __, count in samples), 0)
+
+        densities = [count / num_bytes for num_bytes, count in samples
+                     if num_bytes]
+        if not densities:
+            return Estimate(0, None)
+
+        mean = sum(densities) / len(densities)
+        if len(densities) < 2:
+            return Estimate(mean * size, None)
+
+        variance = sum((x - mean) ** 2 for x in densities) / \
+            (len(densities) - 1)
+        # Standard error with the finite population correction:
+        error = size * math.sqrt(
+            variance / len(densities) * (1 - sampled_bytes / size)
+        )
+        return Estimate(mean * size, self.Z_95 * error)
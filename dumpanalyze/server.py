@@ -0,0 +1,392 @@
+# -*- coding: utf-8 -*-
+#
+# Local HTTP server for browsing an indexed dump.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import asyncio
+import collections
+import http.client
+import json
+import re
+import urllib.parse
+
+from dumpanalyze.view.htmlreport import ViewHtmlReport
+
+
+class LRUCache:
+
+    def __init__(self, capacity):
+        self._capacity = capacity
+        self._entries = collections.OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Return the cached value for the `key` or None.
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+
+
+class HttpError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self._status = status
+
+    @property
+    def status(self):
+        return self._status
+
+
+class DumpServer:
+
+    DEFAULT_PER_PAGE = 50
+    MAX_PER_PAGE = 1000
+
+    # Requests with longer headers are rejected
+    MAX_REQUEST_SIZE = 64 * 1024
+
+    CONTENT_HTML = "text/html; charset=utf-8"
+    CONTENT_JS = "application/javascript; charset=utf-8"
+    CONTENT_JSON = "application/json; charset=utf-8"
+    CONTENT_TEXT = "text/plain; charset=utf-8"
+
+    # Data files of the HTML report page, generated on demand:
+    re_bushes_js = re.compile(r"^/gen-(\d+)-bushes\.js$")
+    re_text_js = re.compile(r"^/gen-(\d+)-text-(\d+)\.js$")
+
+    # Serves the HTML report page (bush graphs are laid out in the browser)
+    # and paginated JSON tables of the `index`, reading the text of traces
+    # from the dump on demand. Responses are cached in an LRU cache of
+    # `cache_size` entries.
+    def __init__(self, index, cache_size=256):
+        self._index = index
+        self._cache = LRUCache(cache_size)
+        self._tables = {
+            "/api/traces": (index.traces, index.TRACE_COLUMNS),
+            "/api/bushes": (index.bushes, index.BUSH_COLUMNS),
+            "/api/aborts": (index.aborts, index.ABORT_COLUMNS),
+        }
+
+    @property
+    def cache(self):
+        return self._cache
+
+    # Return (status, content type, body) of the response to a GET request
+    # for the `target` (path with an optional query).
+    def handle(self, target):
+        response = self.cached(target)
+        if response is None:
+            response = self.build_response(target)
+            self.store(target, response)
+        return response
+
+    # Return the cached response for the `target` or None.
+    def cached(self, target):
+        return self._cache.get(target)
+
+    # Cache the `response` for the `target` if it is successful.
+    def store(self, target, response):
+        if response[0] == 200:
+            self._cache.put(target, response)
+
+    # Build the response for the `target` bypassing the cache. This may read
+    # the dump, so the event loop runs it in an executor. It only reads the
+    # index, so it is safe to run it in several threads at once.
+    def build_response(self, target):
+        try:
+            return (200,) + self._dispatch(target)
+        except HttpError as e:
+            return (e.status, self.CONTENT_JSON, self._json(
+                {"error": str(e)}
+            ))
+        except OSError as e:
+            # E.g. the dump was moved or truncated after indexing
+            return (500, self.CONTENT_JSON, self._json(
+                {"error": "Failed to read the dump: {}".format(e)}
+            ))
+
+    def _dispatch(self, target):
+        url = urllib.parse.urlsplit(target)
+        path = url.path
+        query = urllib.parse.parse_qs(url.query)
+
+        if path in ["/", "/index.html"]:
+            return self.CONTENT_HTML, ViewHtmlReport("html").dumps(
+                self._index.generations
+            )
+        if path == "/api/generations":
+            return self.CONTENT_JSON, self._json(
+                {"generations": self._index.generations}
+            )
+        if path in self._tables:
+            rows, columns = self._tables[path]
+            generation = self._int_param(query, "generation", 1)
+            return self.CONTENT_JSON, self._json(self._page(
+                self._lookup(rows, generation), columns, query
+            ))
+        if path == "/api/bush":
+            generation = self._int_param(query, "generation", 1)
+            root_id = self._int_param(query, "root")
+            return self.CONTENT_JSON, self._json(
+                self._bush_data(generation, root_id)
+            )
+        if path == "/api/trace":
+            generation = self._int_param(query, "generation", 1)
+            trace_id = self._int_param(query, "id")
+            return self.CONTENT_TEXT, self._trace_text(generation, trace_id)
+
+        match = self.re_bushes_js.match(path)
+        if match:
+            generation = int(match.group(1))
+            graphs = [
+                self._bush_data(generation, row[0])
+                for row in self._lookup(self._index.bushes, generation)
+            ]
+            return self.CONTENT_JS, ViewHtmlReport.jsonp(
+                "gen-{}-bushes".format(generation),
+                {"generation": generation, "bushes": graphs}
+            ).encode("utf-8")
+
+        match = self.re_text_js.match(path)
+        if match:
+            generation, trace_id = int(match.group(1)), int(match.group(2))
+            return self.CONTENT_JS, ViewHtmlReport.jsonp(
+                "gen-{}-text-{}".format(generation, trace_id),
+                {trace_id: self._trace_sections(generation, trace_id)}
+            ).encode("utf-8")
+
+        raise HttpError(404, "Not found: {}".format(path))
+
+    @staticmethod
+    def _json(data):
+        return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def _int_param(query, name, default=None):
+        values = query.get(name)
+        if not values:
+            if default is None:
+                raise HttpError(400, "Missing parameter {}".format(name))
+            return default
+        try:
+            return int(values[0])
+        except ValueError:
+            raise HttpError(400, "Bad parameter {}".format(name))
+
+    @staticmethod
+    def _lookup(method, *args):
+        try:
+            return method(*args)
+        except KeyError as e:
+            raise HttpError(404, e.args[0])
+
+    def _page(self, rows, columns, query):
+        sort = query.get("sort", [columns[0]])[0]
+        if sort not in columns:
+            raise HttpError(400, "Bad sort column {}".format(sort))
+        order = query.get("order", ["asc"])[0]
+        if order not in ["asc", "desc"]:
+            raise HttpError(400, "Bad order {}".format(order))
+        page = self._int_param(query, "page", 1)
+        per_page = self._int_param(query, "per_page", self.DEFAULT_PER_PAGE)
+        if page < 1 or not 1 <= per_page <= self.MAX_PER_PAGE:
+            raise HttpError(400, "Bad page {} of size {}".format(
+                page, per_page
+            ))
+
+        key = columns.index(sort)
+        rows = sorted(rows, key=lambda x: x[key], reverse=(order == "desc"))
+        start = (page - 1) * per_page
+        return {
+            "total": len(rows),
+            "page": page,
+            "per_page": per_page,
+            "columns": columns,
+            "rows": rows[start:start + per_page],
+        }
+
+    def _bush_data(self, generation, root_id):
+        data = self._lookup(self._index.bush_data, generation, root_id)
+        if data is None:
+            raise HttpError(404, "Unknown bush {}".format(root_id))
+        return data
+
+    def _trace_sections(self, generation, trace_id):
+        sections = self._lookup(
+            self._index.trace_sections, generation, trace_id
+        )
+        if sections is None:
+            raise HttpError(404, "Unknown trace {}".format(trace_id))
+        return sections
+
+    # The text of the trace, formatted as in trace bush text views
+    def _trace_text(self, generation, trace_id):
+        bc, ir, mc = self._trace_sections(generation, trace_id)
+        row = next((
+            row for row in self._index.traces(generation)
+            if row[0] == trace_id
+        ), None)
+        if row is None:
+            raise HttpError(404, "Unknown trace {}".format(trace_id))
+        _, parent, link_type, file, line, _, _, _, size_mcode, _ = row
+        padding = " " if parent else ""
+        text = "".join([
+            "---- TRACE {} start {}{}{}:{}\n".format(
+                trace_id, parent, padding, file, line
+            ),
+            bc,
+            "---- TRACE {} IR\n".format(trace_id),
+            ir,
+            "---- TRACE {} mcode {}\n".format(trace_id, size_mcode),
+            mc,
+            "---- TRACE {} stop -> {}\n".format(trace_id, link_type),
+        ])
+        return text.encode("utf-8")
+
+    # Serve requests on `host`:`port` until interrupted. `on_start` is
+    # called with the actual address once the server is listening.
+    def serve(self, host, port, on_start=None):
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(loop.create_server(
+            lambda: _HttpProtocol(self, loop), host, port
+        ))
+        if on_start is not None:
+            on_start(server.sockets[0].getsockname()[:2])
+        try:
+            loop.run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            loop.run_until_complete(server.wait_closed())
+            loop.close()
+
+
+# A minimal HTTP/1.0 protocol: one GET (or HEAD) request per connection.
+# Responses missing in the cache are built in the default executor of the
+# `loop`, so reading the dump for one client does not block the others.
+class _HttpProtocol(asyncio.Protocol):
+
+    def __init__(self, server, loop):
+        self._server = server
+        self._loop = loop
+        self._transport = None
+        self._buffer = b""
+        self._received = False
+
+    def connection_made(self, transport):
+        self._transport = transport
+
+    def connection_lost(self, exc):
+        self._transport = None
+
+    def data_received(self, data):
+        if self._received:
+            return
+        self._buffer += data
+        if b"\r\n\r\n" not in self._buffer:
+            if len(self._buffer) > self._server.MAX_REQUEST_SIZE:
+                self._respond(431, self._server.CONTENT_TEXT, b"")
+            return
+
+        request_line = self._buffer.split(b"\r\n", 1)[0].decode("latin-1")
+        parts = request_line.split()
+        if len(parts) != 3:
+            self._respond(400, self._server.CONTENT_TEXT, b"")
+            return
+
+        method, target, _ = parts
+        if method not in ["GET", "HEAD"]:
+            self._respond(405, self._server.CONTENT_TEXT, b"")
+            return
+
+        self._received = True
+        head_only = method == "HEAD"
+        response = self._server.cached(target)
+        if response is not None:
+            self._respond(*response, head_only=head_only)
+            return
+
+        future = self._loop.run_in_executor(
+            None, self._server.build_response, target
+        )
+        future.add_done_callback(
+            lambda f: self._on_response(target, f, head_only)
+        )
+
+    def _on_response(self, target, future, head_only):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            # Not to leave the client waiting for a response forever:
+            body = json.dumps({"error": str(error)}).encode("utf-8")
+            self._respond(500, self._server.CONTENT_JSON, body)
+            return
+
+        response = future.result()
+        self._server.store(target, response)
+        self._respond(*response, head_only=head_only)
+
+    def _respond(self, status, content_type, body, head_only=False):
+        if self._transport is None:
+            # The client has gone away
+            return
+        header = (
+            "HTTP/1.0 {} {}\r\n"
+            "Content-Type: {}\r\n"
+            "Content-Length: {}\r\n"
+            "Connection: close\r\n"
+            "\r\n"
+        ).format(
+            status, http.client.responses.get(status, ""), content_type,
+            len(body)
+        )
+        self._transport.write(header.encode("latin-1"))
+        if not head_only:
+            self._transport.write(body)
+        self._transport.close()
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+#
+# Clustering of structurally similar traces.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import array
+import zlib
+
+# Traces are compared by sets of shingles, i.e. of IR opcode sequences of
+# SHINGLE_SIZE instructions. Each set is sketched with one-permutation
+# MinHash: shingles are hashed once and spread over NUM_BINS bins keeping
+# the minimal hash per bin, so the cost is linear in the size of the trace.
+SHINGLE_SIZE = 3
+NUM_BINS = 32
+
+# Hash of an empty bin
+EMPTY_BIN = 0xffffffff
+
+
+# Return the MinHash sketch of the sequence of IR opcode codes as
+# array("I") of NUM_BINS elements.
+def ir_signature(ir_ops):
+    signature = array.array("I", [EMPTY_BIN] * NUM_BINS)
+
+    shingles = set(zip(*[ir_ops[i:] for i in range(SHINGLE_SIZE)]))
+    if not shingles and ir_ops:
+        # Traces shorter than a shingle
+        shingles = {tuple(ir_ops)}
+
+    for shingle in shingles:
+        value = zlib.crc32(bytes(shingle))
+        index = value % NUM_BINS
+        if value < signature[index]:
+            signature[index] = value
+
+    # Empty bins borrow the value of the next non-empty one (in a circular
+    # manner) to keep sketches of small sets comparable:
+    filled = [value for value in signature if value != EMPTY_BIN]
+    if filled:
+        value = filled[0]
+        for i in reversed(range(NUM_BINS)):
+            if signature[i] == EMPTY_BIN:
+                signature[i] = value
+            else:
+                value = signature[i]
+
+    return signature
+
+
+# Return the estimated Jaccard similarity of two sketches.
+def similarity(sig1, sig2):
+    return sum(1 for x, y in zip(sig1, sig2) if x == y) / NUM_BINS
+
+
+# Return the kind of the trace link, so that e.g. links to different root
+# traces are not distinguished.
+def link_kind(link_type):
+    if link_type.isnumeric():
+        return "trace"
+    return link_type
+
+
+class TraceCluster:
+
+    def __init__(self, file, line, link_kind):
+        self._file = file
+        self._line = line
+        self._link_kind = link_kind
+        self._members = []
+        self._size_mcode = 0
+
+    # Start location of the first trace of the cluster
+    @property
+    def file(self):
+        return self._file
+
+    @property
+    def line(self):
+        return self._line
+
+    @property
+    def link_kind(self):
+        return self._link_kind
+
+    # List of (generation, trace ID) of all traces of the cluster
+    @property
+    def members(self):
+        return self._members
+
+    @property
+    def num_traces(self):
+        return len(self._members)
+
+    @property
+    def size_mcode(self):
+        return self._size_mcode
+
+    def add(self, generation, trace_id, size_mcode):
+        self._members.append((generation, trace_id))
+        self._size_mcode += size_mcode
+
+
+# Traces of the whole dump are grouped with locality-sensitive hashing:
+# sketches are split into bands of BAND_SIZE bins, and traces with the same
+# link kind sharing any band are candidates to be merged into a cluster if
+# their estimated similarity is at least `threshold`. Only sketches of the
+# first trace per band bucket are kept.
+class TraceClusters:
+
+    BAND_SIZE = 4
+
+    def __init__(self, threshold=0.5):
+        self._threshold = threshold
+        self._buckets = {}
+
+        # Per-trace data indexed by the order of addition:
+        self._parents = array.array("L")     # Union-find forest
+        self._generations = array.array("L")
+        self._ids = array.array("L")
+        self._sizes = array.array("L")
+        self._starts = []                    # (file, line, link kind)
+
+    @property
+    def num_traces(self):
+        return len(self._parents)
+
+    # Return the list of clusters, the biggest consumers of mcode first.
+    @property
+    def clusters(self):
+        clusters = {}
+        for index in range(len(self._parents)):
+            root = self._find(index)
+            cluster = clusters.get(root)
+            if cluster is None:
+                cluster = TraceCluster(*self._starts[root])
+                clusters[root] = cluster
+            cluster.add(
+                self._generations[index], self._ids[index],
+                self._sizes[index]
+            )
+
+        return sorted(
+            clusters.values(),
+            key=lambda x: (-x.size_mcode, -x.num_traces, x.file, x.line)
+        )
+
+    def add(self, generation, trace):
+        index = len(self._parents)
+        kind = link_kind(trace.link_type)
+        signature = trace.ir_signature
+
+        self._parents.append(index)
+        self._generations.append(generation)
+        self._ids.append(trace.id)
+        self._sizes.append(trace.size_mcode)
+        self._starts.append((trace.file, trace.line, kind))
+
+        for start in range(0, NUM_BINS, self.BAND_SIZE):
+            key = (kind, start, signature[start:start + self.BAND_SIZE]
+                   .tobytes())
+            candidate = self._buckets.get(key)
+            if candidate is None:
+                self._buckets[key] = (index, signature)
+            elif similarity(signature, candidate[1]) >= self._threshold:
+                self._union(candidate[0], index)
+
+    def add_traces(self, generation, traces):
+        for trace in traces:
+            self.add(generation, trace)
+
+    def _find(self, index):
+        parents = self._parents
+        root = index
+        while parents[root] != root:
+            root = parents[root]
+        # Compress the path:
+        while parents[index] != root:
+            parents[index], index = root, parents[index]
+        return root
+
+    # The earlier trace becomes the root to keep the cluster's location
+    # stable.
+    def _union(self, index1, index2):
+        root1 = self._find(index1)
+        root2 = self._find(index2)
+        if root1 < root2:
+            self._parents[root2] = root1
+        elif root2 < root1:
+            self._parents[root1] = root2
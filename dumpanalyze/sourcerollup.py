@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+#
+# Rollup of traces, aborts and exits by source locations.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import collections
+
+
+class SourceStats:
+
+    # Statistics of a source location (or of the whole file if `line`
+    # is None).
+    def __init__(self, file, line=None):
+        self._file = file
+        self._line = line
+        self._num_traces = 0
+        self._size_mcode = 0
+        self._num_exits = 0
+        self._reasons = collections.Counter()
+
+    @property
+    def file(self):
+        return self._file
+
+    @property
+    def line(self):
+        return self._line
+
+    # Number of traces started at the location
+    @property
+    def num_traces(self):
+        return self._num_traces
+
+    @property
+    def size_mcode(self):
+        return self._size_mcode
+
+    # Number of exits taken from traces started at the location
+    @property
+    def num_exits(self):
+        return self._num_exits
+
+    @property
+    def num_aborts(self):
+        return sum(self._reasons.values())
+
+    # Counter of abort reason categories
+    @property
+    def reasons(self):
+        return self._reasons
+
+    # Events at the location which cost time outside of compiled traces
+    @property
+    def weight(self):
+        return self.num_aborts + self._num_exits
+
+    def add_trace(self, trace):
+        self._num_traces += 1
+        self._size_mcode += trace.size_mcode
+
+    def add_abort(self, abort_reason):
+        self._reasons[abort_reason.category] += 1
+
+    def add_exit(self):
+        self._num_exits += 1
+
+
+# Statistics are accumulated over the whole dump in maps keyed by file:line
+# and by file, both updated on each event, so no separate pass is needed to
+# roll locations up into files.
+class SourceRollup:
+
+    def __init__(self):
+        self._locations = {}
+        self._files = {}
+
+    @property
+    def locations(self):
+        return self._locations.values()
+
+    @property
+    def files(self):
+        return self._files.values()
+
+    # Return statistics of the `line` of the `file` (or None).
+    def location(self, file, line):
+        return self._locations.get((file, line))
+
+    def add_generation(self, traces, abort_reasons, exits):
+        # Exits are attributed to start locations of traces of the same
+        # generation (trace IDs are reused after flushes):
+        starts = {}
+
+        for trace in traces:
+            starts[trace.id] = (trace.file, trace.line)
+            for stats in self._get(trace.file, trace.line):
+                stats.add_trace(trace)
+
+        for ar in abort_reasons:
+            for stats in self._get(ar.file, ar.line):
+                stats.add_abort(ar)
+
+        for trace_id in exits.trace_ids:
+            start = starts.get(trace_id)
+            if start is None:
+                continue
+            for stats in self._get(*start):
+                stats.add_exit()
+
+    # Return statistics of the location and of its file.
+    def _get(self, file, line):
+        location = self._locations.get((file, line))
+        if location is None:
+            location = SourceStats(file, line)
+            self._locations[(file, line)] = location
+
+        source = self._files.get(file)
+        if source is None:
+            source = SourceStats(file)
+            self._files[file] = source
+
+        return location, source
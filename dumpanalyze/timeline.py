@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+#
+# Timeline of JIT compiler events.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import array
+
+
+class Timeline:
+
+    # Counters of each bucket:
+    COMPILES = 0
+    ABORTS = 1
+    EXITS = 2
+    FLUSHES = 3
+    SIZE_MCODE = 4
+    NUM_COUNTERS = 5
+
+    # Events are counted in buckets of `bucket_size` lines of the dump, so
+    # memory usage depends only on the size of the dump, not on the number
+    # of events.
+    def __init__(self, bucket_size):
+        self._bucket_size = bucket_size
+        self._counters = array.array("Q")
+
+    @property
+    def bucket_size(self):
+        return self._bucket_size
+
+    @property
+    def num_buckets(self):
+        return len(self._counters) // self.NUM_COUNTERS
+
+    # Return the list of counters of the bucket with the given `index`.
+    def bucket(self, index):
+        start = index * self.NUM_COUNTERS
+        return self._counters[start:start + self.NUM_COUNTERS].tolist()
+
+    def add_generation(self, traces, abort_reasons, exits):
+        for trace in traces:
+            self._add(trace.pos, self.COMPILES)
+            self._add(trace.pos, self.SIZE_MCODE, trace.size_mcode)
+        for ar in abort_reasons:
+            self._add(ar.pos, self.ABORTS)
+        for pos in exits.positions:
+            self._add(pos, self.EXITS)
+
+    def add_flush(self, pos):
+        self._add(pos, self.FLUSHES)
+
+    def _add(self, pos, counter, value=1):
+        index = (pos - 1) // self._bucket_size * self.NUM_COUNTERS
+        if index >= len(self._counters):
+            self._counters.extend(
+                [0] * (index + self.NUM_COUNTERS - len(self._counters))
+            )
+        self._counters[index + counter] += value
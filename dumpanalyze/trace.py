@@ -24,9 +24,14 @@
 # IN THE SOFTWARE.
 #
 
+import array
 import collections
+import hashlib
 import re
 
+from dumpanalyze import opcodes
+from dumpanalyze import similarity
+
 
 class Trace:
     # Regular expressions to extract data from trace header lines:
@@ -34,18 +39,50 @@ class Trace:
     re_header_mcode = re.compile(r" mcode (\d+)$")
     re_header_stop = re.compile(r" stop -> (.+)$")
 
+    # Opcode of a bytecode line, e.g. "0006    KSHORT   5  60" or
+    # "0000    . FUNCC" (dots denote the call depth):
+    re_bc_op = re.compile(r"\d+[ .]+([A-Z][A-Z0-9]*)")
+
     # Regular expressions to extract data from trace data lines:
     re_data_mcode = re.compile(r"->(\d+)")
 
-    def __init__(self, trace_id):
+    # Flags of decoded IR instructions (see `ir_flags`):
+    IR_GUARD = 0x1
+    IR_PHI = 0x2
+    IR_SPILL = 0x4
+    IR_SUNK = 0x8
+
+    # Classes of machine code instructions (see `mc_classes`). Each
+    # instruction belongs to the first matching class in this order:
+    MC_GUARD = 0    # Jumps to exit stubs
+    MC_BRANCH = 1   # Other jumps
+    MC_CALL = 2
+    MC_SPILL = 3    # Stack spills and reloads ([rsp+...] operands)
+    MC_SSE = 4      # SSE (floating-point) instructions
+    MC_LOAD = 5     # Other instructions reading memory...
+    MC_STORE = 6    # ...and writing it
+    MC_OTHER = 7
+    MC_CLASSES = [
+        "GUARD", "BRANCH", "CALL", "SPILL", "SSE", "LOAD", "STORE", "OTHER",
+    ]
+
+    # If `keep_text` is False, only statistics are collected while the raw
+    # text of bytecode, IR and machine code is dropped. Otherwise the text
+    # of each section is deduplicated via `body_store` (if any) once the
+    # section is over.
+    def __init__(self, trace_id, keep_text=True, body_store=None, pos=0):
         self._id = trace_id
+        self._pos = pos
+        self._keep_text = keep_text
+        self._body_store = body_store
         self._parent_id = 0
         self._parent_side = 0
         self._parent = ""
         self._file = ""
         self._line = 0
         self._link_type = ""
-        self._side_exits = collections.defaultdict(lambda: 0)
+        self._side_exits = collections.defaultdict(int)
+        self._num_bc = 0
         self._num_ir = 0
         self._num_sn = 0
         self._size_mcode = 0
@@ -53,10 +90,47 @@ class Trace:
         self._ir = []          # List of IR dump
         self._mc = []          # List of machine code dump
 
+        # Codes of opcodes.BC_OPCODES, one array element per bytecode:
+        self._bc_ops = array.array("B")
+
+        # Decoded IR instructions, one array element per instruction:
+        self._ir_refs = array.array("H")    # IR references
+        self._ir_ops = array.array("B")     # Codes of opcodes.IR_OPCODES
+        self._ir_types = array.array("B")   # Codes of opcodes.IR_TYPES
+        self._ir_regs = array.array("h")    # See `ir_regs`
+        self._ir_flags = array.array("B")   # Combination of IR_* flags
+        self._num_guards = 0
+        self._num_phis = 0
+        self._num_spills = 0
+        self._num_calls = 0
+        self._loop_ref = 0
+        self._ir_signature = None           # See `ir_signature`
+
+        # Hash of the bytecode without PCs, finalized when the trace stops:
+        self._bc_hash = hashlib.md5()
+        self._bc_digest = ""
+
+        # Snapshots:
+        self._snap_sizes = array.array("H")  # Number of entries per snapshot
+        self._snap_slots = 0                 # Total number of listed slots
+
+        # Machine code addresses:
+        self._mcode_addr = 0                 # Address of the first instruction
+        self._exit_addrs = array.array("Q")  # Addresses of guard jumps...
+        self._exit_nums = array.array("H")   # ...and their side exits
+
+        # Number of machine code instructions per MC_* class:
+        self._mc_classes = array.array("H", [0] * len(self.MC_CLASSES))
+
     @property
     def id(self):
         return self._id
 
+    # Line number of the start record in the dump
+    @property
+    def pos(self):
+        return self._pos
+
     @property
     def parent_id(self):
         return self._parent_id
@@ -91,7 +165,7 @@ class Trace:
 
     @property
     def num_bc(self):
-        return len(self._bc)
+        return self._num_bc
 
     @property
     def num_ir(self):
@@ -117,6 +191,104 @@ class Trace:
     def mc(self):
         return self._mc
 
+    @property
+    def bc_ops(self):
+        return self._bc_ops
+
+    @property
+    def ir_refs(self):
+        return self._ir_refs
+
+    @property
+    def ir_ops(self):
+        return self._ir_ops
+
+    @property
+    def ir_types(self):
+        return self._ir_types
+
+    # Code of the register allocated for an instruction (see
+    # opcodes.REGISTERS), or the byte offset of its spill slot if the
+    # instruction has the IR_SPILL flag, or -1 if there is none of them.
+    @property
+    def ir_regs(self):
+        return self._ir_regs
+
+    @property
+    def ir_flags(self):
+        return self._ir_flags
+
+    @property
+    def num_guards(self):
+        return self._num_guards
+
+    @property
+    def num_phis(self):
+        return self._num_phis
+
+    @property
+    def num_spills(self):
+        return self._num_spills
+
+    @property
+    def num_calls(self):
+        return self._num_calls
+
+    # IR reference of the LOOP marker, or 0 for non-looping traces
+    @property
+    def loop_ref(self):
+        return self._loop_ref
+
+    # Identifies "the same" trace compiled in different generations: its
+    # start location and the hash of its bytecode with PCs stripped.
+    @property
+    def fingerprint(self):
+        return (self._file, self._line, self._bc_digest)
+
+    # MinHash sketch of IR opcode sequences of the trace (see the similarity
+    # module), available once the trace stops
+    @property
+    def ir_signature(self):
+        return self._ir_signature
+
+    # Number of entries (i.e. slots to be restored on exit) per snapshot
+    @property
+    def snap_sizes(self):
+        return self._snap_sizes
+
+    @property
+    def snap_slots(self):
+        return self._snap_slots
+
+    @property
+    def snap_entries(self):
+        return sum(self._snap_sizes)
+
+    @property
+    def max_snap_entries(self):
+        return max(self._snap_sizes) if self._snap_sizes else 0
+
+    # Number of distinct exit stubs referenced from the machine code
+    @property
+    def num_exit_stubs(self):
+        return len(self._side_exits)
+
+    @property
+    def mcode_addr(self):
+        return self._mcode_addr
+
+    @property
+    def exit_addrs(self):
+        return self._exit_addrs
+
+    @property
+    def exit_nums(self):
+        return self._exit_nums
+
+    @property
+    def mc_classes(self):
+        return self._mc_classes
+
     # Process `line` which is logically a header signalling about entering
     # a new `state` while reading the stream of data.
     def process_header(self, state, line):
@@ -148,15 +320,22 @@ class Trace:
         self._line = int(match.group(5))
 
     def _process_header_IR(self, line):
-        pass
+        self._bc = self._intern(self._bc)
 
     def _process_header_mcode(self, line):
         match = self.re_header_mcode.search(line)
         self._size_mcode = int(match.group(1))
+        self._ir = self._intern(self._ir)
 
     def _process_header_stop(self, line):
         match = self.re_header_stop.search(line)
         self._link_type = match.group(1)
+        self._bc_digest = self._bc_hash.hexdigest()
+        self._bc_hash = None
+        self._ir_signature = similarity.ir_signature(self._ir_ops)
+        self._mc = self._intern(self._mc)
+        # The trace is complete, so it should not hold the store anymore:
+        self._body_store = None
 
     def _process_header_exit(self, line):
         pass
@@ -172,24 +351,48 @@ class Trace:
     #
 
     def _process_data_start(self, line):
-        self._bc.append(line)
+        self._num_bc += 1
+        # Strip the PC, e.g. "0006    KSHORT   5  60"
+        self._bc_hash.update(line[4:].encode("utf-8"))
+        if self._keep_text:
+            self._bc.append(line)
+        match = self.re_bc_op.match(line)
+        if match:
+            self._bc_ops.append(opcodes.BC_OPCODES.code(match.group(1)))
 
     def _process_data_IR(self, line):
-        self._ir.append(line)
+        if self._keep_text:
+            self._ir.append(line)
         if "SNAP" in line:
             self._num_sn += 1
+            self._decode_snap(line)
         else:
             self._num_ir += 1
+            self._decode_ir(line)
 
     def _process_data_mcode(self, line):
-        self._mc.append(line)
+        if self._keep_text:
+            self._mc.append(line)
+
+        addr = self._decode_mcode_addr(line)
+        if addr is None:
+            return
+        if not self._mcode_addr:
+            self._mcode_addr = addr
+
         match = self.re_data_mcode.search(line)
 
         if not match or match.group(1) is None:
+            self._mc_classes[self._classify_mcode(line)] += 1
             return
 
+        self._mc_classes[self.MC_GUARD] += 1
+
         # We record only side exits actually preserved in mcode
-        self._side_exits[int(match.group(1))] += 1
+        exit_num = int(match.group(1))
+        self._side_exits[exit_num] += 1
+        self._exit_addrs.append(addr)
+        self._exit_nums.append(exit_num)
 
     def _process_data_stop(self, line):
         pass
@@ -202,3 +405,116 @@ class Trace:
 
     def _process_data_flush(self, line):
         pass
+
+    def _intern(self, lines):
+        if self._body_store is None or not self._keep_text:
+            return lines
+        return self._body_store.intern(lines)
+
+    #
+    # Decoders of data lines
+    #
+
+    # Machine code lines start with an address (e.g. "0bccff83  mov ..."),
+    # except for markers like "-> LOOP:".
+    @staticmethod
+    def _decode_mcode_addr(line):
+        try:
+            addr = int(line[:line.index(" ")], 16)
+        except ValueError:
+            return None
+        # Addresses are kept in arrays of unsigned 64-bit integers:
+        if not 0 <= addr <= 0xffffffffffffffff:
+            raise ValueError("Bad mcode address {}".format(
+                line[:line.index(" ")]
+            ))
+        return addr
+
+    # Return the MC_* class of an instruction which is not a guard, e.g.
+    # "0bccff94  cvtsd2si ebp, qword [r10+0x10]".
+    def _classify_mcode(self, line):
+        insn = line[line.index(" "):].lstrip()
+        space = insn.find(" ")
+        mnemonic = insn if space < 0 else insn[:space]
+        operands = "" if space < 0 else insn[space:]
+
+        if mnemonic.startswith("j"):
+            return self.MC_BRANCH
+        if mnemonic == "call":
+            return self.MC_CALL
+        if "[rsp" in operands:
+            return self.MC_SPILL
+        if "xmm" in operands or mnemonic.startswith("cvt"):
+            return self.MC_SSE
+        if "[" not in operands:
+            return self.MC_OTHER
+        # The destination comes first, comparisons do not write it:
+        if mnemonic not in ("cmp", "test") and \
+                "[" in operands[:operands.find(",")]:
+            return self.MC_STORE
+        return self.MC_LOAD
+
+    # Snapshots list stack slots, where "----" is a slot not restored on exit
+    # and "|" separates frames:
+    # ....              SNAP   #1   [ ---- ---- 0001 ---- ---- 0001 ]
+    def _decode_snap(self, line):
+        start = line.find("[")
+        stop = line.rfind("]")
+        if start < 0 or stop < start:
+            self._snap_sizes.append(0)
+            return
+
+        slots = 0
+        entries = 0
+        for slot in line[start + 1:stop].split():
+            if slot == "|":
+                continue
+            slots += 1
+            if slot != "----":
+                entries += 1
+
+        self._snap_slots += slots
+        self._snap_sizes.append(min(entries, 0xffff))
+
+    # IR instructions are printed by jit.dump in fixed-width columns:
+    # 0005 xmm7   + flt ADD    0004  0003
+    # 0009 [200] >  fun EQ     0008  print
+    # 0008 ------------ LOOP ------------
+    def _decode_ir(self, line):
+        if line[5:6] == "-":
+            if "LOOP" in line:
+                self._loop_ref = int(line[:4])
+            return
+
+        op = line[18:24].rstrip()
+        if not op:
+            return
+
+        reg = line[5:11].strip()
+        flags = 0
+        reg_code = -1
+        if reg.startswith("["):
+            flags |= self.IR_SPILL
+            reg_code = int(reg[1:-1], 16)
+            self._num_spills += 1
+        elif reg.startswith("{"):
+            flags |= self.IR_SUNK
+        elif reg:
+            reg_code = opcodes.REGISTERS.code(reg)
+
+        if line[11] == ">":
+            flags |= self.IR_GUARD
+            self._num_guards += 1
+        if line[12] == "+":
+            flags |= self.IR_PHI
+            self._num_phis += 1
+
+        op_code = opcodes.IR_OPCODES.code(op)
+        if op_code in opcodes.IR_CALLS:
+            self._num_calls += 1
+
+        self._ir_refs.append(int(line[:4]))
+        self._ir_ops.append(op_code)
+        self._ir_types.append(opcodes.IR_TYPES.code(line[14:17].rstrip()))
+        self._ir_regs.append(reg_code)
+        self._ir_flags.append(flags)
@@ -27,9 +27,13 @@
 
 class TraceBush:
 
-    def __init__(self, root_trace):
-        self._root_id = root_trace.id
-        self._traces = [root_trace]
+    # Traces of the bush are referenced by their indices in the `source`
+    # sequence of traces (a list or a TraceStore) and fetched on demand.
+    def __init__(self, source, root_id, root_index):
+        self._source = source
+        self._root_id = root_id
+        self._indices = [root_index]
+        self._uncovered_exits = {}
 
     @property
     def root_id(self):
@@ -37,11 +41,23 @@ class TraceBush:
 
     @property
     def size(self):
-        return len(self._traces)
+        return len(self._indices)
 
+    # Return the list of traces of the bush. Spilled traces are read back
+    # from disk on each call, so callers should keep the result rather than
+    # calling it repeatedly.
+    def load_traces(self):
+        return [self._source[index] for index in self._indices]
+
+    # Mapping of (trace ID, exit number) to hot exits of the bush's traces
+    # without a compiled side trace
     @property
-    def traces(self):
-        return self._traces
+    def uncovered_exits(self):
+        return self._uncovered_exits
+
+    def append(self, index):
+        self._indices.append(index)
 
-    def append(self, trace):
-        self._traces.append(trace)
+    def add_uncovered_exit(self, uncovered):
+        key = (uncovered.trace_id, uncovered.exit)
+        self._uncovered_exits[key] = uncovered
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#
+# Side exits taken from compiled traces.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import collections
+import re
+from array import array
+
+
+class TraceExit:
+    re_trace_exit = re.compile(r" (\d+) exit (\d+)")
+
+    # Numbers of registers dumped on exit (x86_64):
+    NUM_GPRS = 16
+    NUM_FPRS = 16
+
+    # If `decode` is True, the register dump following the exit record is
+    # decoded into fixed-width arrays, otherwise it is skipped.
+    def __init__(self, line, pos=0, decode=False):
+        self._trace_id, self._exit = self.parse_header(line)
+        self._pos = pos
+
+        self._gprs = None
+        self._fprs = None
+        if decode:
+            # Registers are dumped in the order of their hardware numbers
+            # (rax, rcx, ..., r15 and xmm0, ..., xmm15):
+            self._gprs = array("Q", bytes(8 * self.NUM_GPRS))
+            self._fprs = array("d", bytes(8 * self.NUM_FPRS))
+            self._num_gprs = 0
+            self._num_fprs = 0
+            self._regs = None
+
+    # Return a tuple of (trace ID, exit number) of the exit record `line`.
+    @classmethod
+    def parse_header(cls, line):
+        match = cls.re_trace_exit.search(line)
+        return int(match.group(1)), int(match.group(2))
+
+    @property
+    def trace_id(self):
+        return self._trace_id
+
+    @property
+    def exit(self):
+        return self._exit
+
+    # Line number of the exit record in the dump
+    @property
+    def pos(self):
+        return self._pos
+
+    # Values of general-purpose registers (None if not decoded)
+    @property
+    def gprs(self):
+        return self._gprs
+
+    # Values of floating-point registers (None if not decoded)
+    @property
+    def fprs(self):
+        return self._fprs
+
+    # Process a `line` of the register dump following the exit record.
+    def process_data(self, line):
+        if self._gprs is None:
+            return
+
+        # Values are parsed right from the line (like "rax = 0x..." or
+        # "xmm0  =   +1653") without splitting it:
+        eq = line.find("=")
+        if eq < 0:
+            if line.startswith("General"):
+                self._regs = self._gprs
+            elif line.startswith("Floating"):
+                self._regs = self._fprs
+            return
+
+        if self._regs is self._gprs and self._num_gprs < self.NUM_GPRS:
+            self._gprs[self._num_gprs] = int(line[eq + 1:], 16)
+            self._num_gprs += 1
+        elif self._regs is self._fprs and self._num_fprs < self.NUM_FPRS:
+            self._fprs[self._num_fprs] = float(line[eq + 1:])
+            self._num_fprs += 1
+
+
+# Exits are the most frequent records in dumps, so only the trace ID, the
+# exit number and the line number of each exit are kept in arrays (16 bytes
+# per exit). TraceExit objects are built only for exits with decoded
+# register dumps.
+class TraceExitLog:
+
+    def __init__(self):
+        self._trace_ids = array("I")
+        self._exits = array("I")
+        self._positions = array("Q")
+        self._decoded = []
+
+    def __len__(self):
+        return len(self._trace_ids)
+
+    @property
+    def trace_ids(self):
+        return self._trace_ids
+
+    @property
+    def exits(self):
+        return self._exits
+
+    # Line numbers of exit records in the dump
+    @property
+    def positions(self):
+        return self._positions
+
+    # Exits with decoded register dumps (empty unless decoding is requested)
+    @property
+    def decoded(self):
+        return self._decoded
+
+    # Add an exit, `decoded` being its TraceExit with decoded registers.
+    def append(self, trace_id, exit, pos, decoded=None):
+        self._trace_ids.append(trace_id)
+        self._exits.append(exit)
+        self._positions.append(pos)
+        if decoded is not None:
+            self._decoded.append(decoded)
+
+    # Remove the last exit (e.g. a broken one).
+    def pop(self):
+        pos = self._positions.pop()
+        self._trace_ids.pop()
+        self._exits.pop()
+        if self._decoded and self._decoded[-1].pos == pos:
+            self._decoded.pop()
+
+    # Return the counter of exits by (trace ID, exit number).
+    def counts(self):
+        return collections.Counter(zip(self._trace_ids, self._exits))
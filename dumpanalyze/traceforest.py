@@ -32,19 +32,42 @@ class TraceForest:
     def __init__(self, traces):
         forest = {}
         roots = {}
+        side_traces = {}
 
-        for trace in traces:
+        for index, trace in enumerate(traces):
+            # Side traces whose parents are missing (e.g. dropped by the
+            # tolerant parser) start bushes of their own:
             root_id = None
-            if trace.is_root:
+            if not trace.is_root:
+                root_id = roots.get(trace.parent_id)
+
+            if root_id is None:
                 root_id = trace.id
-                forest[root_id] = TraceBush(trace)
+                forest[root_id] = TraceBush(traces, root_id, index)
             else:
-                root_id = roots[trace.parent_id]
-                forest[root_id].append(trace)
+                forest[root_id].append(index)
             roots[trace.id] = root_id
 
+            if not trace.is_root:
+                side_traces[(trace.parent_id, trace.parent_side)] = trace.id
+
         self._bushes = forest
+        self._roots = roots
+        self._side_traces = side_traces
 
     @property
     def bushes(self):
         return self._bushes
+
+    # Mapping of (trace ID, exit number) to the ID of the side trace
+    # attached to this exit
+    @property
+    def side_traces(self):
+        return self._side_traces
+
+    # Return the bush the trace with `trace_id` belongs to (or None).
+    def bush_of(self, trace_id):
+        root_id = self._roots.get(trace_id)
+        if root_id is None:
+            return None
+        return self._bushes[root_id]
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+#
+# Storage of compiled traces with spilling to disk.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import pickle
+import tempfile
+import threading
+from array import array
+
+
+class TraceStore:
+
+    # A list-like storage of completed traces. When the traces kept in
+    # memory exceed `memory_limit` bytes, they are pickled to a temporary
+    # file and read back on access. `on_spill` is called after each spill to
+    # let other caches be released too.
+    #
+    # The size of a trace is estimated by the size of its pickle. The
+    # resident set size of the process is not used: it hardly ever drops
+    # after a spill, so the limit would stay exceeded and every trace would
+    # be spilled on arrival.
+    def __init__(self, memory_limit, on_spill=None):
+        self._memory_limit = memory_limit
+        self._on_spill = on_spill
+
+        # Traces [0, num_spilled) are on disk, the rest are in memory:
+        self._file = None
+        self._offsets = array("Q", [0])
+        self._traces = []
+        self._resident_bytes = 0
+        self._lock = threading.Lock()
+
+    def __del__(self):
+        if self._file is not None:
+            self._file.close()
+
+    # Estimated size of the traces kept in memory
+    @property
+    def resident_bytes(self):
+        return self._resident_bytes
+
+    @property
+    def num_spilled(self):
+        return len(self._offsets) - 1
+
+    def __len__(self):
+        return self.num_spilled + len(self._traces)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("trace index out of range")
+
+        num_spilled = self.num_spilled
+        if index >= num_spilled:
+            return self._traces[index - num_spilled]
+        return self._load(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, trace):
+        self._traces.append(trace)
+        self._resident_bytes += len(
+            pickle.dumps(trace, pickle.HIGHEST_PROTOCOL)
+        )
+
+        if self._resident_bytes > self._memory_limit:
+            self.spill()
+
+    # Move all traces kept in memory to disk.
+    def spill(self):
+        if not self._traces:
+            return
+
+        with self._lock:
+            if self._file is None:
+                self._file = tempfile.TemporaryFile(prefix="dumpanalyze-")
+            self._file.seek(self._offsets[-1])
+            for trace in self._traces:
+                self._file.write(
+                    pickle.dumps(trace, pickle.HIGHEST_PROTOCOL)
+                )
+                self._offsets.append(self._file.tell())
+            self._traces = []
+            self._resident_bytes = 0
+
+        if self._on_spill is not None:
+            self._on_spill()
+
+    # Views may be rendered by several threads at once, so reads of the
+    # shared file are serialized.
+    def _load(self, index):
+        start = self._offsets[index]
+        size = self._offsets[index + 1] - start
+        with self._lock:
+            self._file.seek(start)
+            data = self._file.read(size)
+        return pickle.loads(data)
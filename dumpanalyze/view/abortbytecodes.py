@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+#
+# Bytecodes recorded right before aborts.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import collections
+import csv
+
+from dumpanalyze import opcodes
+
+
+class ViewAbortBytecodes:
+
+    CSV_HEADER = ["REASON", "COUNT", "BYTECODE", "BYTECODE_COUNT"]
+
+    # Number of the most common bytecodes listed per reason
+    TOP_BYTECODES = 5
+
+    def __init__(self, fmt):
+        self._fmt = fmt
+
+    # Reasons (normalized categories) are ranked by the number of aborts,
+    # each followed by the most common last bytecodes recorded before them.
+    def render(self, fname, abort_reasons):
+        if self._fmt == "csv":
+            self._render_csv(fname, abort_reasons)
+        else:
+            raise Exception("Unknown format")
+
+    def _render_csv(self, fname, abort_reasons):
+        categories = collections.defaultdict(collections.Counter)
+
+        for ar in abort_reasons:
+            if ar.last_bc is not None:
+                categories[ar.category][ar.last_bc] += 1
+
+        totals = {
+            category: sum(bytecodes.values())
+            for category, bytecodes in categories.items()
+        }
+        categories_sorted = sorted(
+            categories.keys(), key=lambda x: (-totals[x], x)
+        )
+
+        with open(fname, "w", newline="") as out:
+            writer = csv.writer(out, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(self.CSV_HEADER)
+            for category in categories_sorted:
+                bytecodes = categories[category].most_common(
+                    self.TOP_BYTECODES
+                )
+                for code, count in bytecodes:
+                    writer.writerow([
+                        category,
+                        totals[category],
+                        opcodes.BC_OPCODES.name(code),
+                        count,
+                    ])
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+#
+# Hot abort loops view.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import csv
+
+
+class ViewAbortLoops:
+
+    CSV_HEADER = [
+        "FILE", "LINE", "ATTEMPTS", "TIGHT_ATTEMPTS", "MIN_GAP", "MEAN_GAP",
+        "FIRST_LINE", "LAST_LINE", "TOP_TRIGGER", "TOP_REASON",
+        "TOP_ABORT_SITE",
+    ]
+
+    def __init__(self, fmt):
+        self._fmt = fmt
+
+    # Locations are ranked by the number of wasted recording attempts.
+    def render(self, fname, detector):
+        if self._fmt == "csv":
+            self._render_csv(fname, detector)
+        else:
+            raise Exception("Unknown format")
+
+    def _render_csv(self, fname, detector):
+        locations = sorted(
+            detector.locations,
+            key=lambda x: (x.num_attempts, x.num_tight),
+            reverse=True
+        )
+
+        with open(fname, "w", newline="") as out:
+            writer = csv.writer(out, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(self.CSV_HEADER)
+            for location in locations:
+                mean_gap = location.mean_gap
+                writer.writerow([
+                    location.file,
+                    location.line,
+                    location.num_attempts,
+                    location.num_tight,
+                    "" if location.min_gap is None else location.min_gap,
+                    "" if mean_gap is None else "{:.1f}".format(mean_gap),
+                    location.first_pos,
+                    location.last_pos,
+                    location.triggers[0][0] or "root",
+                    location.reasons[0][0],
+                    location.sites[0][0],
+                ])
@@ -42,13 +42,13 @@ class ViewAbortReasonsDetails:
         files = collections.defaultdict(
             lambda: collections.defaultdict(
                 lambda: collections.defaultdict(
-                    lambda: 0
+                    collections.Counter
                 )
             )
         )
 
         for ar in abort_reasons:
-            files[ar.file][ar.line][ar.reason] += 1
+            files[ar.file][ar.line][ar.category][ar.reason] += 1
 
         with open(fname, 'w', newline='') as out:
             names = sorted(files.keys())
@@ -57,8 +57,17 @@ class ViewAbortReasonsDetails:
                 lines = sorted(files[name].keys())
                 for line in lines:
                     out.write("\tline {}:\n".format(line))
-                    reasons = sorted(files[name][line].keys())
-                    for reason in reasons:
+                    categories = sorted(files[name][line].keys())
+                    for category in categories:
+                        variants = files[name][line][category]
                         out.write("\t\t{}: {}\n".format(
-                            reason, files[name][line][reason]
+                            category, sum(variants.values())
                         ))
+                        # Drill down to raw reasons unless the category is
+                        # the only reason itself:
+                        if list(variants.keys()) == [category]:
+                            continue
+                        for reason in sorted(variants.keys()):
+                            out.write("\t\t\t{}: {}\n".format(
+                                reason, variants[reason]
+                            ))
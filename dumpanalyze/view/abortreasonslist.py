@@ -30,7 +30,9 @@ import csv
 
 class ViewAbortReasonsList:
 
-    CSV_HEADER = ["REASON", "COUNT"]
+    # Reasons are aggregated by normalized categories, each category row
+    # is repeated for all raw reasons (variants) it covers:
+    CSV_HEADER = ["REASON", "COUNT", "VARIANT", "VARIANT_COUNT"]
 
     def __init__(self, fmt):
         self._fmt = fmt
@@ -42,17 +44,27 @@ class ViewAbortReasonsList:
             raise Exception("Unknown format")
 
     def _render_csv(self, fname, abort_reasons):
-        reasons_map = collections.defaultdict(lambda: 0)
+        categories = collections.defaultdict(collections.Counter)
 
         for ar in abort_reasons:
-            reasons_map[ar.reason] += 1
+            categories[ar.category][ar.reason] += 1
 
-        reasons_sorted = sorted(
-            reasons_map.items(), key=lambda x: x[1], reverse=True
+        totals = {
+            category: sum(variants.values())
+            for category, variants in categories.items()
+        }
+        categories_sorted = sorted(
+            categories.keys(), key=lambda x: (-totals[x], x)
         )
 
         with open(fname, "w", newline="") as out:
             writer = csv.writer(out, delimiter=",", quoting=csv.QUOTE_MINIMAL)
             writer.writerow(self.CSV_HEADER)
-            for reason, count in reasons_sorted:
-                writer.writerow([reason, count])
+            for category in categories_sorted:
+                variants = sorted(
+                    categories[category].items(), key=lambda x: (-x[1], x[0])
+                )
+                for reason, count in variants:
+                    writer.writerow([
+                        category, totals[category], reason, count
+                    ])
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# Lua sources annotated with traces, aborts and exits.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import os
+
+
+class ViewAnnotatedSource:
+
+    # Annotation of lines without any events
+    EMPTY = " " * 25
+
+    # Sources are looked up by chunk names from the dump relative to
+    # the `source_dir` (absolute names are used as is).
+    def __init__(self, fmt, source_dir):
+        self._fmt = fmt
+        self._source_dir = source_dir
+
+    # Files which are not found locally are skipped.
+    def render(self, fname, rollup):
+        if self._fmt == "txt":
+            self._render_txt(fname, rollup)
+        else:
+            raise Exception("Unknown format")
+
+    def _render_txt(self, fname, rollup):
+        files = sorted(rollup.files, key=lambda x: (-x.weight, x.file))
+
+        with open(fname, "w") as out:
+            for source in files:
+                path = self._find(source.file)
+                if path is None:
+                    continue
+
+                out.write("{}: traces {}, aborts {}, exits {}\n".format(
+                    source.file,
+                    source.num_traces,
+                    source.num_aborts,
+                    source.num_exits,
+                ))
+                # Errors are ignored the same way as in the dump
+                with open(path, "r", errors="ignore") as lua:
+                    for num, text in enumerate(lua, 1):
+                        out.write("{} {:>5} | {}".format(
+                            self._annotate(rollup.location(source.file, num)),
+                            num,
+                            text if text.endswith("\n") else text + "\n",
+                        ))
+                out.write("\n")
+
+    def _find(self, file):
+        # Chunks loaded from strings are named like "=(command line)"
+        if file.startswith("="):
+            return None
+        path = os.path.join(self._source_dir, file)
+        if os.path.isfile(path):
+            return path
+        return None
+
+    def _annotate(self, stats):
+        if stats is None:
+            return self.EMPTY
+        return "T{:<6} A{:<6} X{:<8}".format(
+            stats.num_traces, stats.num_aborts, stats.num_exits
+        )
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+#
+# Bytecode statistics of compiled traces.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+from dumpanalyze import opcodes
+from dumpanalyze.view.ophistogram import ViewOpcodeHistogram
+
+
+class ViewBCStats(ViewOpcodeHistogram):
+
+    CSV_HEADER = ["ID", "NUM_BC", "IR_PER_BC", "MCODE_PER_BC"]
+    NUM_COUNTERS = 3
+    OPCODES = opcodes.BC_OPCODES
+
+    def _trace_codes(self, trace):
+        return trace.bc_ops
+
+    def _counters(self, trace):
+        return [trace.num_bc, trace.num_ir, trace.size_mcode]
+
+    # Counters are shown as IR instructions and mcode bytes per bytecode
+    def _columns(self, counters, trace):
+        num_bc, num_ir, size_mcode = counters
+        if not num_bc:
+            return [num_bc, "", ""]
+        return [
+            num_bc,
+            "{:.2f}".format(num_ir / num_bc),
+            "{:.2f}".format(size_mcode / num_bc),
+        ]
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# Recompilation churn view.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import csv
+
+
+class ViewChurn:
+
+    CSV_HEADER = [
+        "FILE", "LINE", "BC_HASH", "NUM_COMPILED", "NUM_GENERATIONS",
+        "FIRST_GENERATION", "LAST_GENERATION", "SIZE_MC",
+    ]
+
+    def __init__(self, fmt):
+        self._fmt = fmt
+
+    # Only traces compiled more than once are listed, the most frequently
+    # recompiled ones first.
+    def render(self, fname, churn_index):
+        if self._fmt == "csv":
+            self._render_csv(fname, churn_index)
+        else:
+            raise Exception("Unknown format")
+
+    def _render_csv(self, fname, churn_index):
+        entries = sorted(
+            (entry for entry in churn_index.entries
+             if entry.num_compiled > 1),
+            key=lambda x: (x.num_compiled, x.size_mcode),
+            reverse=True
+        )
+
+        with open(fname, "w", newline="") as out:
+            writer = csv.writer(out, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(self.CSV_HEADER)
+            for entry in entries:
+                writer.writerow([
+                    entry.file,
+                    entry.line,
+                    entry.digest,
+                    entry.num_compiled,
+                    entry.num_generations,
+                    entry.first_generation,
+                    entry.last_generation,
+                    entry.size_mcode,
+                ])
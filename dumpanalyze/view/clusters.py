@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# Clusters of structurally similar traces.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import csv
+
+
+class ViewTraceClusters:
+
+    CSV_HEADER = [
+        "FILE", "LINE", "LINK_KIND", "NUM_TRACES", "SIZE_MC", "TRACES",
+    ]
+
+    # Maximal number of traces listed per cluster
+    MAX_MEMBERS = 20
+
+    def __init__(self, fmt):
+        self._fmt = fmt
+
+    # Only clusters of more than one trace are listed, the biggest mcode
+    # consumers first. Traces are listed as "generation/ID".
+    def render(self, fname, clusters):
+        if self._fmt == "csv":
+            self._render_csv(fname, clusters)
+        else:
+            raise Exception("Unknown format")
+
+    def _render_csv(self, fname, clusters):
+        with open(fname, "w", newline="") as out:
+            writer = csv.writer(out, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(self.CSV_HEADER)
+            for cluster in clusters.clusters:
+                if cluster.num_traces < 2:
+                    continue
+                members = [
+                    "{}/{}".format(generation, trace_id)
+                    for generation, trace_id in
+                    cluster.members[:self.MAX_MEMBERS]
+                ]
+                if cluster.num_traces > self.MAX_MEMBERS:
+                    members.append("...")
+                writer.writerow([
+                    cluster.file,
+                    cluster.line,
+                    cluster.link_kind,
+                    cluster.num_traces,
+                    cluster.size_mcode,
+                    " ".join(members),
+                ])
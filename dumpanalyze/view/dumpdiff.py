@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Dump comparison view.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+
+class ViewDumpDiff:
+
+    # Maximal number of traces listed in the report
+    MAX_TRACES = 100
+
+    def __init__(self, fmt):
+        self._fmt = fmt
+
+    def render(self, fname, diff):
+        if self._fmt == "txt":
+            self._render_txt(fname, diff)
+        else:
+            raise Exception("Unknown format")
+
+    def _render_txt(self, fname, diff):
+        with open(fname, "w") as out:
+            out.write("A: {}\n".format(diff.a.fname))
+            out.write("B: {}\n\n".format(diff.b.fname))
+
+            out.write("Totals:\n")
+            for name, value_a, value_b in diff.totals:
+                self._write_row(out, name, value_a, value_b)
+
+            out.write("\nAbort reasons:\n")
+            for reason, count_a, count_b in diff.abort_reasons:
+                self._write_row(out, reason, count_a, count_b)
+
+            traces = diff.traces
+            out.write(
+                "\nTraces: {} distinct in A, {} distinct in B, {} matched\n"
+                .format(len(diff.a.traces), len(diff.b.traces),
+                        diff.num_matched)
+            )
+            out.write("Traces with the biggest changes of mcode bytes:\n")
+            for fingerprint, entry_a, entry_b in traces[:self.MAX_TRACES]:
+                if entry_a[1] == entry_b[1]:
+                    break
+                self._write_row(out, self._trace_name(
+                    fingerprint, entry_a, entry_b
+                ), entry_a[1], entry_b[1])
+
+            # Traces exiting more often (e.g. due to failing guards):
+            traces.sort(key=lambda x: (-abs(x[2][2] - x[1][2]), x[0]))
+            out.write("Traces with the biggest changes of exits:\n")
+            for fingerprint, entry_a, entry_b in traces[:self.MAX_TRACES]:
+                if entry_a[2] == entry_b[2]:
+                    break
+                self._write_row(out, self._trace_name(
+                    fingerprint, entry_a, entry_b
+                ), entry_a[2], entry_b[2])
+
+    @staticmethod
+    def _trace_name(fingerprint, entry_a, entry_b):
+        return "{}:{} [{}] compiled {} -> {} times".format(
+            fingerprint[0], fingerprint[1], fingerprint[2][:8],
+            entry_a[0], entry_b[0]
+        )
+
+    @staticmethod
+    def _write_row(out, name, value_a, value_b):
+        out.write("\t{}: {} -> {} ({:+d})\n".format(
+            name, value_a, value_b, value_b - value_a
+        ))
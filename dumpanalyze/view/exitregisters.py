@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# Register values of the most frequent trace exits.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import collections
+import csv
+
+from dumpanalyze import opcodes
+
+
+class ViewExitRegisters:
+
+    CSV_HEADER = [
+        "TRACE", "EXIT", "COUNT", "REGISTER", "DISTINCT", "MIN", "MAX",
+        "TOP_VALUE", "TOP_SHARE",
+    ]
+
+    # Number of the most frequent (trace, exit) pairs to summarize
+    TOP_EXITS = 10
+
+    def __init__(self, fmt):
+        self._fmt = fmt
+
+    # `exits` is a list of trace exits with decoded register dumps.
+    def render(self, fname, exits):
+        if self._fmt == "csv":
+            self._render_csv(fname, exits)
+        else:
+            raise Exception("Unknown format")
+
+    def _render_csv(self, fname, exits):
+        groups = collections.defaultdict(list)
+        for trace_exit in exits:
+            if trace_exit.gprs is not None:
+                groups[(trace_exit.trace_id, trace_exit.exit)].append(
+                    trace_exit
+                )
+
+        top = sorted(
+            groups.items(), key=lambda x: (-len(x[1]), x[0])
+        )[:self.TOP_EXITS]
+
+        with open(fname, "w", newline="") as out:
+            writer = csv.writer(out, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(self.CSV_HEADER)
+            for (trace_id, exit_no), group in top:
+                for num in range(len(group[0].gprs)):
+                    self._write_register(
+                        writer, trace_id, exit_no, opcodes.REGISTERS.name(num),
+                        [x.gprs[num] for x in group], "0x{:x}"
+                    )
+                offset = len(group[0].gprs)
+                for num in range(len(group[0].fprs)):
+                    self._write_register(
+                        writer, trace_id, exit_no,
+                        opcodes.REGISTERS.name(offset + num),
+                        [x.fprs[num] for x in group], "{:.14g}"
+                    )
+
+    @staticmethod
+    def _write_register(writer, trace_id, exit_no, name, values, fmt):
+        counts = collections.Counter(values)
+        top_value, top_count = counts.most_common(1)[0]
+        writer.writerow([
+            trace_id,
+            exit_no,
+            len(values),
+            name,
+            len(counts),
+            fmt.format(min(values)),
+            fmt.format(max(values)),
+            fmt.format(top_value),
+            "{:.2f}".format(top_count / len(values)),
+        ])
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+# Hottest traces by profiler samples view.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import collections
+import csv
+
+
+class ViewHotTraces:
+
+    CSV_HEADER = [
+        "GENERATION", "ID", "SAMPLES", "PERCENT", "HOTTEST_EXIT",
+        "HOTTEST_EXIT_SAMPLES",
+    ]
+
+    # Pseudo-ID of samples outside of any trace
+    OUTSIDE_ID = "NONE"
+
+    def __init__(self, fmt):
+        self._fmt = fmt
+
+    # `samples` is a mapping of (generation, trace ID, side exit) to
+    # the number of samples, as produced by McodeMap.attribute.
+    def render(self, fname, samples):
+        if self._fmt == "csv":
+            self._render_csv(fname, samples)
+        else:
+            raise Exception("Unknown format")
+
+    def _render_csv(self, fname, samples):
+        traces = collections.Counter()
+        exits = collections.defaultdict(collections.Counter)
+        total = 0
+
+        for key, count in samples.items():
+            total += count
+            if key is None:
+                continue
+            generation, trace_id, exit_num = key
+            traces[(generation, trace_id)] += count
+            exits[(generation, trace_id)][exit_num] += count
+
+        with open(fname, "w", newline="") as out:
+            writer = csv.writer(out, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(self.CSV_HEADER)
+
+            for key, count in traces.most_common():
+                exit_num, exit_count = exits[key].most_common(1)[0]
+                writer.writerow([
+                    key[0],
+                    key[1],
+                    count,
+                    "{:.2f}".format(100.0 * count / total),
+                    "" if exit_num is None else exit_num,
+                    exit_count,
+                ])
+
+            outside = samples.get(None, 0)
+            if outside:
+                writer.writerow([
+                    "", self.OUTSIDE_ID, outside,
+                    "{:.2f}".format(100.0 * outside / total), "", "",
+                ])
@@ -0,0 +1,409 @@
+# -*- coding: utf-8 -*-
+#
+# Interactive HTML report.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import json
+import os
+
+
+class ViewHtmlReport:
+
+    # Traces per file of lazily loaded trace text
+    CHUNK_TRACES = 64
+
+    # Data files are JSONP scripts (i.e. JSON wrapped into a call of this
+    # function) rather than plain JSON: browsers refuse to fetch JSON from
+    # file:// URLs, but happily load scripts from there.
+    CALLBACK = "dumpanalyzeLoad"
+
+    # The "js" format writes data of a single generation (passed as a tuple
+    # (generation, bushes)) to `fname` + "-bushes.js" and `fname` +
+    # "-text-N.js". The "html" format writes the page itself, `fname` being
+    # its path and data being the list of summaries of all generations.
+    def __init__(self, fmt, with_text=True):
+        self._fmt = fmt
+        self._with_text = with_text
+
+    def render(self, fname, data):
+        if self._fmt == "js":
+            self._render_js(fname, data)
+        elif self._fmt == "html":
+            self._render_html(fname, data)
+        else:
+            raise Exception("Unknown format")
+
+    # Return the list of files written by the "js" format for the `fname`.
+    @staticmethod
+    def data_files(fname):
+        dirname, prefix = os.path.split(fname)
+        return [
+            os.path.join(dirname, name) for name in sorted(os.listdir(dirname))
+            if name.startswith(prefix + "-") and name.endswith(".js")
+        ]
+
+    # Return the JSONP script passing `data` under the `name`.
+    @classmethod
+    def jsonp(cls, name, data):
+        return "{}({}, {});\n".format(
+            cls.CALLBACK, json.dumps(name),
+            json.dumps(data, separators=(",", ":"))
+        )
+
+    # Return the data of the `bush` (with its already loaded `traces`) as
+    # consumed by the page. The index of the text chunk of each trace (the
+    # last item of its row) is left unset.
+    @staticmethod
+    def bush_data(root_id, bush, traces):
+        traces = [
+            [
+                trace.id, trace.parent_id, trace.parent_side,
+                trace.link_type, sorted(trace.side_exits.keys()),
+                trace.file, trace.line, trace.num_ir, trace.size_mcode,
+                None,
+            ]
+            for trace in traces
+        ]
+        uncovered = [
+            [entry.trace_id, entry.exit, entry.num_exits, entry.status]
+            for _, entry in sorted(bush.uncovered_exits.items())
+        ]
+        return {"root": root_id, "traces": traces, "uncovered": uncovered}
+
+    # Return the rendered page as bytes instead of writing it to a file.
+    def dumps(self, generations):
+        if self._fmt == "html":
+            # Escape "</" not to close the inline script prematurely:
+            data = json.dumps(generations).replace("</", "<\\/")
+            return HTML_TEMPLATE.replace("@GENERATIONS@", data).encode("utf-8")
+        else:
+            raise Exception("Unknown format")
+
+    def _write_jsonp(self, fname, name, data):
+        with open(fname, "w") as out:
+            out.write(self.jsonp(name, data))
+
+    def _render_js(self, fname, data):
+        generation, bushes = data
+        prefix = os.path.basename(fname)
+
+        # Traces are numbered in the order of bushes, so that traces of
+        # a bush mostly get into the same chunk of text:
+        rows = []
+        chunk = {}
+        num_chunks = 0
+        for root_id in sorted(bushes):
+            bush = bushes[root_id]
+            traces = bush.load_traces()
+            row = self.bush_data(root_id, bush, traces)
+            if self._with_text:
+                for trace, trace_row in zip(traces, row["traces"]):
+                    trace_row[-1] = num_chunks
+                    chunk[trace.id] = [
+                        "".join(trace.bc), "".join(trace.ir),
+                        "".join(trace.mc),
+                    ]
+                    if len(chunk) == self.CHUNK_TRACES:
+                        self._write_text_chunk(fname, prefix, num_chunks,
+                                               chunk)
+                        chunk = {}
+                        num_chunks += 1
+            rows.append(row)
+
+        if chunk:
+            self._write_text_chunk(fname, prefix, num_chunks, chunk)
+
+        self._write_jsonp(
+            fname + "-bushes.js", prefix + "-bushes",
+            {"generation": generation, "bushes": rows}
+        )
+
+    def _write_text_chunk(self, fname, prefix, index, chunk):
+        suffix = "-text-{}".format(index)
+        self._write_jsonp(fname + suffix + ".js", prefix + suffix, chunk)
+
+    def _render_html(self, fname, generations):
+        with open(fname, "wb") as out:
+            out.write(self.dumps(generations))
+
+
+# The page lays out trace bushes client-side: every trace occupies a row of
+# its own (START, side exits, END), and a side trace row starts right under
+# the parent's exit it is attached to.
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>dumpanalyze report</title>
+<style>
+body { font-family: sans-serif; font-size: 13px; margin: 0; }
+#header { padding: 8px; background: #eee; }
+#main { display: flex; }
+#bushes { width: 420px; height: calc(100vh - 40px); overflow: auto; }
+#view { flex: 1; height: calc(100vh - 40px); overflow: auto; }
+table { border-collapse: collapse; width: 100%; }
+th, td { padding: 2px 6px; text-align: left; }
+th { cursor: pointer; background: #ddd; }
+tr.bush { cursor: pointer; }
+tr.bush:hover, tr.selected { background: #def; }
+#text { margin: 8px; white-space: pre; font-family: monospace; }
+svg text { font-size: 11px; text-anchor: middle; dominant-baseline: middle; }
+svg rect { fill: white; stroke: black; }
+svg rect.root { stroke: crimson; stroke-width: 2; }
+svg rect.uncovered { fill: gold; }
+svg g.node { cursor: pointer; }
+svg path { fill: none; stroke: black; marker-end: url(#arrow); }
+svg path.link { stroke-width: 2; }
+</style>
+</head>
+<body>
+<div id="header">
+Generation: <select id="generation"></select>
+<span id="summary"></span>
+</div>
+<div id="main">
+<div id="bushes"><table>
+<thead><tr>
+<th data-key="root">ROOT</th><th data-key="location">LOCATION</th>
+<th data-key="size">TRACES</th><th data-key="mcode">SIZE_MC</th>
+<th data-key="uncovered">UNCOVERED</th>
+</tr></thead>
+<tbody id="bush-list"></tbody>
+</table></div>
+<div id="view"><svg id="graph" width="0" height="0"></svg>
+<div id="text"></div></div>
+</div>
+<script>
+var GENERATIONS = @GENERATIONS@;
+var NODE_WIDTH = 100, NODE_HEIGHT = 24, STEP_X = 120, STEP_Y = 50;
+var SVG_NS = "http://www.w3.org/2000/svg";
+
+var loaded = {}, pending = {};
+var current = null, sortKey = "size";
+
+function dumpanalyzeLoad(name, data) {
+  var callbacks = pending[name] || [];
+  loaded[name] = data;
+  delete pending[name];
+  callbacks.forEach(function (callback) { callback(data); });
+}
+
+// Load a data file on demand, each one at most once.
+function load(name, callback) {
+  if (name in loaded) {
+    callback(loaded[name]);
+    return;
+  }
+  if (name in pending) {
+    pending[name].push(callback);
+    return;
+  }
+  pending[name] = [callback];
+  var script = document.createElement("script");
+  script.src = name + ".js";
+  document.head.appendChild(script);
+}
+
+function summarize(bush) {
+  var root = bush.traces[0];
+  return {
+    bush: bush,
+    root: bush.root,
+    location: root[5] + ":" + root[6],
+    size: bush.traces.length,
+    mcode: bush.traces.reduce(function (s, t) { return s + t[8]; }, 0),
+    uncovered: bush.uncovered.length
+  };
+}
+
+function showGeneration(generation) {
+  var name = "gen-" + generation + "-bushes";
+  load(name, function (data) {
+    current = data.bushes.map(summarize);
+    document.getElementById("summary").textContent =
+      data.bushes.length + " bushes";
+    listBushes();
+  });
+}
+
+function listBushes() {
+  var list = document.getElementById("bush-list");
+  list.innerHTML = "";
+  current.sort(function (a, b) {
+    if (a[sortKey] === b[sortKey]) return a.root - b.root;
+    if (sortKey === "root" || sortKey === "location")
+      return a[sortKey] < b[sortKey] ? -1 : 1;
+    return b[sortKey] - a[sortKey];
+  });
+  current.forEach(function (entry) {
+    var row = document.createElement("tr");
+    row.className = "bush";
+    ["root", "location", "size", "mcode", "uncovered"].forEach(function (k) {
+      var cell = document.createElement("td");
+      cell.textContent = entry[k];
+      row.appendChild(cell);
+    });
+    row.onclick = function () {
+      Array.prototype.forEach.call(list.children, function (r) {
+        r.classList.remove("selected");
+      });
+      row.classList.add("selected");
+      drawBush(entry.bush);
+    };
+    list.appendChild(row);
+  });
+}
+
+function svg(tag, attrs, parent) {
+  var element = document.createElementNS(SVG_NS, tag);
+  for (var key in attrs)
+    element.setAttribute(key, attrs[key]);
+  parent.appendChild(element);
+  return element;
+}
+
+function endLabel(trace) {
+  var link = trace[3];
+  if (link === "interpreter") return "enforce VM";
+  if (link === "return") return "return to VM";
+  if (/^[0-9]+$/.test(link)) return "goto " + link;
+  return link;
+}
+
+function drawBush(bush) {
+  var pos = {}, nodes = [], edges = [];
+  var uncovered = {};
+  bush.uncovered.forEach(function (u) { uncovered[u[0] + "/" + u[1]] = u; });
+
+  bush.traces.forEach(function (trace, row) {
+    var id = trace[0], parent = trace[1] + "/" + trace[2];
+    var column = parent in pos ? pos[parent][0] : 0;
+    var names = ["START " + id];
+    trace[4].forEach(function (e) { names.push(id + "/" + e); });
+    names.push("END " + id + " " + endLabel(trace));
+
+    names.forEach(function (name, i) {
+      pos[name] = [column + i, row];
+      nodes.push({name: name, trace: trace, uncovered: uncovered[name]});
+      if (i > 0) edges.push([names[i - 1], name, ""]);
+    });
+    if (parent in pos) edges.push([parent, names[0], "link"]);
+
+    var end = names[names.length - 1];
+    if (trace[3] === "loop")
+      edges.push([end, names[0], "link"]);
+    else if (trace[3] === String(bush.root))
+      edges.push([end, "START " + bush.root, "link"]);
+  });
+
+  var graph = document.getElementById("graph");
+  var width = 0;
+  nodes.forEach(function (n) { width = Math.max(width, pos[n.name][0]); });
+  graph.innerHTML = "";
+  graph.setAttribute("width", (width + 1) * STEP_X + 20);
+  graph.setAttribute("height", bush.traces.length * STEP_Y + 40);
+
+  var marker = svg("marker", {id: "arrow", viewBox: "0 0 10 10", refX: 10,
+    refY: 5, markerWidth: 6, markerHeight: 6, orient: "auto"},
+    svg("defs", {}, graph));
+  svg("path", {d: "M 0 0 L 10 5 L 0 10 z", style: "fill: black"}, marker);
+
+  function center(name) {
+    return [pos[name][0] * STEP_X + 10 + NODE_WIDTH / 2,
+            pos[name][1] * STEP_Y + 30 + NODE_HEIGHT / 2];
+  }
+
+  edges.forEach(function (edge) {
+    var from = center(edge[0]), to = center(edge[1]), d;
+    if (from[1] === to[1] && from[0] < to[0]) {
+      d = "M " + (from[0] + NODE_WIDTH / 2) + " " + from[1] +
+          " L " + (to[0] - NODE_WIDTH / 2) + " " + to[1];
+    } else if (from[1] < to[1]) {
+      d = "M " + from[0] + " " + (from[1] + NODE_HEIGHT / 2) +
+          " L " + to[0] + " " + (to[1] - NODE_HEIGHT / 2);
+    } else {
+      // Backward edge: arc above the nodes
+      var top = to[1] - NODE_HEIGHT / 2;
+      d = "M " + from[0] + " " + (from[1] - NODE_HEIGHT / 2) +
+          " C " + from[0] + " " + (top - 25) + " " + to[0] + " " +
+          (top - 25) + " " + to[0] + " " + top;
+    }
+    svg("path", {d: d, "class": edge[2]}, graph);
+  });
+
+  nodes.forEach(function (node) {
+    var c = center(node.name);
+    var g = svg("g", {"class": "node"}, graph);
+    var cls = node.trace[1] === 0 ? "root" : "";
+    if (node.uncovered) cls += " uncovered";
+    svg("rect", {x: c[0] - NODE_WIDTH / 2, y: c[1] - NODE_HEIGHT / 2,
+      width: NODE_WIDTH, height: NODE_HEIGHT, "class": cls}, g);
+    svg("text", {x: c[0], y: c[1]}, g).textContent = node.name;
+    if (node.uncovered) {
+      svg("title", {}, g).textContent = node.uncovered[2] + " exits, " +
+        node.uncovered[3];
+    }
+    g.onclick = function () { showTrace(node.trace); };
+  });
+  document.getElementById("text").textContent = "";
+}
+
+function showTrace(trace) {
+  var id = trace[0], text = document.getElementById("text");
+  var header = "---- TRACE " + id + " ";
+  if (trace[9] === null) {
+    text.textContent = header + "(text is not available)";
+    return;
+  }
+  var generation = document.getElementById("generation").value;
+  load("gen-" + generation + "-text-" + trace[9], function (chunk) {
+    var body = chunk[id];
+    text.textContent = header + "start " + trace[5] + ":" + trace[6] +
+      "\\n" + body[0] + header + "IR\\n" + body[1] + header + "mcode " +
+      trace[8] + "\\n" + body[2] + header + "stop -> " + trace[3] + "\\n";
+  });
+}
+
+(function () {
+  var select = document.getElementById("generation");
+  GENERATIONS.forEach(function (g) {
+    var option = document.createElement("option");
+    option.value = g.generation;
+    option.textContent = g.generation + " (" + g.traces + " traces, " +
+      g.aborts + " aborts" + (g.flushed ? ", flushed" : "") + ")";
+    select.appendChild(option);
+  });
+  select.onchange = function () { showGeneration(select.value); };
+  Array.prototype.forEach.call(document.querySelectorAll("th"), function (th) {
+    th.onclick = function () {
+      sortKey = th.getAttribute("data-key");
+      if (current) listBushes();
+    };
+  });
+  if (GENERATIONS.length) showGeneration(GENERATIONS[0].generation);
+})();
+</script>
+</body>
+</html>
+"""
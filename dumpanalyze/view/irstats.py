@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+#
+# IR statistics view.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+from dumpanalyze import opcodes
+from dumpanalyze.view.ophistogram import ViewOpcodeHistogram
+
+
+class ViewIRStats(ViewOpcodeHistogram):
+
+    CSV_HEADER = [
+        "ID", "NUM_GUARDS", "NUM_PHIS", "NUM_SPILLS", "NUM_CALLS", "LOOP_REF",
+    ]
+    NUM_COUNTERS = 4
+    OPCODES = opcodes.IR_OPCODES
+
+    def _trace_codes(self, trace):
+        return trace.ir_ops
+
+    def _counters(self, trace):
+        return [
+            trace.num_guards,
+            trace.num_phis,
+            trace.num_spills,
+            trace.num_calls,
+        ]
+
+    # The LOOP_REF column is left empty in the total row
+    def _columns(self, counters, trace):
+        return counters + [trace.loop_ref if trace is not None else ""]
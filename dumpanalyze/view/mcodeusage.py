@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# Usage of the machine code area per generation.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import csv
+
+
+class ViewMcodeUsage:
+
+    CSV_HEADER = [
+        "GENERATION", "NUM_TRACES", "SIZE_MC", "SPAN_MC", "USAGE", "FLUSH",
+        "GROWTH_RATE", "TRACES_TO_FLUSH", "TOP_BUSHES",
+    ]
+
+    def __init__(self, fmt):
+        self._fmt = fmt
+
+    # GROWTH_RATE is the number of mcode bytes per `growth_interval` traces
+    # (empty for generations shorter than that),
+    # USAGE and TRACES_TO_FLUSH are filled only if `maxmcode` is known.
+    # TOP_BUSHES lists the biggest bushes as "root:bytes".
+    def render(self, fname, usage):
+        if self._fmt == "csv":
+            self._render_csv(fname, usage)
+        else:
+            raise Exception("Unknown format")
+
+    def _render_csv(self, fname, usage):
+        with open(fname, "w", newline="") as out:
+            writer = csv.writer(out, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(self.CSV_HEADER)
+            for entry in usage.generations:
+                share = usage.usage(entry)
+                traces_to_flush = usage.traces_to_flush(entry)
+                growth_rate = entry.growth_rate
+                flush = ""
+                if entry.flushed:
+                    flush = "mcode full" if entry.mcode_full else "other"
+                writer.writerow([
+                    entry.generation,
+                    entry.num_traces,
+                    entry.size_mcode,
+                    entry.span_mcode,
+                    "" if share is None else "{:.2f}".format(share),
+                    flush,
+                    "" if growth_rate is None else "{:.1f}".format(
+                        growth_rate
+                    ),
+                    "" if traces_to_flush is None else traces_to_flush,
+                    " ".join(
+                        "{}:{}".format(root_id, size)
+                        for root_id, size in entry.top_bushes
+                    ),
+                ])
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# Base view of per-trace opcode histograms.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import collections
+import csv
+
+
+class ViewOpcodeHistogram:
+
+    # Traces are listed one per row followed by the total row for the whole
+    # generation. Each row is also a histogram of opcodes: there is a column
+    # for each opcode met in the generation. Subclasses define the leading
+    # columns, the number of per-trace counters summed up in the total row
+    # and the table of opcodes (see the opcodes module).
+    CSV_HEADER = ["ID"]
+    NUM_COUNTERS = 0
+    OPCODES = None
+    TOTAL_ID = "ALL"
+
+    def __init__(self, fmt):
+        self._fmt = fmt
+
+    def render(self, fname, traces):
+        if self._fmt == "csv":
+            self._render_csv(fname, traces)
+        else:
+            raise Exception("Unknown format")
+
+    # Return the array of opcodes of the trace.
+    def _trace_codes(self, trace):
+        raise NotImplementedError
+
+    # Return the list of NUM_COUNTERS counters of the trace.
+    def _counters(self, trace):
+        raise NotImplementedError
+
+    # Return the leading columns (after the ID) of the row from `counters`
+    # of the `trace`, or of the total row if `trace` is None.
+    def _columns(self, counters, trace):
+        return counters
+
+    def _render_csv(self, fname, traces):
+        histograms = []
+        total = collections.Counter()
+        for trace in traces:
+            histogram = collections.Counter(self._trace_codes(trace))
+            histograms.append(histogram)
+            total.update(histogram)
+
+        # Most frequent opcodes come first:
+        op_codes = [code for code, __ in total.most_common()]
+
+        with open(fname, "w", newline="") as out:
+            writer = csv.writer(
+                out, delimiter=",", quoting=csv.QUOTE_MINIMAL
+            )
+            writer.writerow(self.CSV_HEADER + [
+                self.OPCODES.name(code) for code in op_codes
+            ])
+
+            totals = [0] * self.NUM_COUNTERS
+            for trace, histogram in zip(traces, histograms):
+                counters = self._counters(trace)
+                totals = [x + y for x, y in zip(totals, counters)]
+                writer.writerow(
+                    [trace.id] + self._columns(counters, trace) +
+                    [histogram[code] for code in op_codes]
+                )
+
+            writer.writerow(
+                [self.TOTAL_ID] + self._columns(totals, None) +
+                [total[code] for code in op_codes]
+            )
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+#
+# Snapshot weight view.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import csv
+
+
+class ViewSnapshots:
+
+    CSV_HEADER = [
+        "BUSH", "ID", "NUM_SN", "SNAP_SLOTS", "SNAP_ENTRIES",
+        "MAX_SNAP_ENTRIES", "NUM_EXIT_STUBS", "SIZE_MC",
+    ]
+
+    # Each bush is listed as its traces followed by the total row. Bushes
+    # with the heaviest snapshots come first.
+    TOTAL_ID = "ALL"
+
+    def __init__(self, fmt):
+        self._fmt = fmt
+
+    def render(self, fname, bushes):
+        if self._fmt == "csv":
+            self._render_csv(fname, bushes)
+        else:
+            raise Exception("Unknown format")
+
+    def _render_csv(self, fname, bushes):
+        rows = []
+        for root_id, bush in bushes.items():
+            trace_rows = [[
+                root_id,
+                trace.id,
+                trace.num_sn,
+                trace.snap_slots,
+                trace.snap_entries,
+                trace.max_snap_entries,
+                trace.num_exit_stubs,
+                trace.size_mcode,
+            ] for trace in bush.load_traces()]
+
+            total_row = [root_id, self.TOTAL_ID] + [
+                sum(row[col] for row in trace_rows) for col in range(2, 8)
+            ]
+            total_row[5] = max(row[5] for row in trace_rows)
+            rows.append((total_row, trace_rows))
+
+        rows.sort(key=lambda x: x[0][4], reverse=True)
+
+        with open(fname, "w", newline="") as out:
+            writer = csv.writer(out, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(self.CSV_HEADER)
+            for total_row, trace_rows in rows:
+                writer.writerows(trace_rows)
+                writer.writerow(total_row)
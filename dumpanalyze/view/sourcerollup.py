@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+#
+# Traces, aborts and exits rolled up by source locations.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import collections
+import csv
+
+
+class ViewSourceRollup:
+
+    # The fixed columns are followed by a column for each abort reason met
+    # in the rollup, with the number of aborts for this reason.
+    CSV_HEADER = [
+        "FILE", "LINE", "TRACES", "SIZE_MC", "ABORTS", "TOP_REASON", "EXITS",
+    ]
+
+    # If `by_file` is True, statistics are rolled up per file (LINE is left
+    # empty), otherwise per file:line.
+    def __init__(self, fmt, by_file=False):
+        self._fmt = fmt
+        self._by_file = by_file
+
+    # Locations are ranked by the number of aborts and exits.
+    def render(self, fname, rollup):
+        if self._fmt == "csv":
+            self._render_csv(fname, rollup)
+        else:
+            raise Exception("Unknown format")
+
+    def _render_csv(self, fname, rollup):
+        entries = rollup.files if self._by_file else rollup.locations
+        entries = sorted(entries, key=lambda x: (
+            -x.weight, -x.num_traces, x.file, x.line or 0
+        ))
+
+        total = collections.Counter()
+        for entry in entries:
+            total.update(entry.reasons)
+        # Most frequent reasons come first:
+        reasons = [reason for reason, __ in total.most_common()]
+
+        with open(fname, "w", newline="") as out:
+            writer = csv.writer(out, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(self.CSV_HEADER + reasons)
+            for entry in entries:
+                top_reason = entry.reasons.most_common(1)
+                writer.writerow([
+                    entry.file,
+                    "" if entry.line is None else entry.line,
+                    entry.num_traces,
+                    entry.size_mcode,
+                    entry.num_aborts,
+                    top_reason[0][0] if top_reason else "",
+                    entry.num_exits,
+                ] + [entry.reasons[reason] for reason in reasons])
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#
+# JIT activity timeline view.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import csv
+
+from dumpanalyze.timeline import Timeline
+
+
+class ViewTimeline:
+
+    CSV_HEADER = [
+        "FIRST_LINE", "COMPILES", "ABORTS", "EXITS", "FLUSHES", "SIZE_MC",
+    ]
+
+    # Charts drawn one below another in the SVG: (title, counter, color)
+    SVG_CHARTS = [
+        ("Compiled traces", Timeline.COMPILES, "steelblue"),
+        ("Aborts", Timeline.ABORTS, "crimson"),
+        ("Exits", Timeline.EXITS, "darkorange"),
+        ("Mcode bytes", Timeline.SIZE_MCODE, "seagreen"),
+    ]
+    SVG_WIDTH = 1000
+    SVG_CHART_HEIGHT = 120
+    SVG_MARGIN = 30
+    SVG_FLUSH_COLOR = "black"
+
+    def __init__(self, fmt):
+        self._fmt = fmt
+
+    def render(self, fname, timeline):
+        if self._fmt == "csv":
+            self._render_csv(fname, timeline)
+        elif self._fmt == "svg":
+            self._render_svg(fname, timeline)
+        else:
+            raise Exception("Unknown format")
+
+    def _render_csv(self, fname, timeline):
+        with open(fname, "w", newline="") as out:
+            writer = csv.writer(out, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(self.CSV_HEADER)
+            for index in range(timeline.num_buckets):
+                writer.writerow(
+                    [index * timeline.bucket_size + 1] + timeline.bucket(index)
+                )
+
+    def _render_svg(self, fname, timeline):
+        buckets = [
+            timeline.bucket(index) for index in range(timeline.num_buckets)
+        ]
+        step = float(self.SVG_WIDTH) / max(len(buckets), 1)
+        chart_height = self.SVG_CHART_HEIGHT + self.SVG_MARGIN
+        height = len(self.SVG_CHARTS) * chart_height + self.SVG_MARGIN
+        width = self.SVG_WIDTH + 2 * self.SVG_MARGIN
+
+        with open(fname, "w") as out:
+            out.write(
+                '<svg xmlns="http://www.w3.org/2000/svg" '
+                'width="{}" height="{}" font-family="sans-serif" '
+                'font-size="12">\n'.format(width, height)
+            )
+
+            for num, (title, counter, color) in enumerate(self.SVG_CHARTS):
+                top = num * chart_height + self.SVG_MARGIN
+                bottom = top + self.SVG_CHART_HEIGHT
+                peak = max([bucket[counter] for bucket in buckets] + [1])
+
+                out.write('<text x="{}" y="{}">{} (max {} per {} lines)'
+                          '</text>\n'.format(self.SVG_MARGIN, top - 5, title,
+                                             peak, timeline.bucket_size))
+                out.write(
+                    '<rect x="{}" y="{}" width="{}" height="{}" '
+                    'fill="none" stroke="lightgray"/>\n'.format(
+                        self.SVG_MARGIN, top, self.SVG_WIDTH,
+                        self.SVG_CHART_HEIGHT
+                    )
+                )
+
+                for index, bucket in enumerate(buckets):
+                    x = self.SVG_MARGIN + index * step
+                    if bucket[Timeline.FLUSHES]:
+                        out.write(
+                            '<line x1="{0:.2f}" y1="{1}" x2="{0:.2f}" '
+                            'y2="{2}" stroke="{3}" stroke-dasharray="2"/>\n'
+                            .format(x, top, bottom, self.SVG_FLUSH_COLOR)
+                        )
+                    if not bucket[counter]:
+                        continue
+                    bar = self.SVG_CHART_HEIGHT * bucket[counter] / peak
+                    out.write(
+                        '<rect x="{:.2f}" y="{:.2f}" width="{:.2f}" '
+                        'height="{:.2f}" fill="{}"/>\n'.format(
+                            x, bottom - bar, max(step, 1.0), bar, color
+                        )
+                    )
+
+            out.write("</svg>\n")
@@ -24,34 +24,120 @@
 # IN THE SOFTWARE.
 #
 
+import hashlib
+import io
+import os
+import shutil
+import threading
+
 import graphviz
 
 
 class ViewTraceBush:
 
     MARKED_TRACE_COLOR = "crimson"
+    UNCOVERED_EXIT_COLOR = "gold"
+    IMAGE_FORMATS = ["png", "svg"]
 
-    def __init__(self, fmt):
+    # If `cache_dir` is set, rendered images are stored there under the hash
+    # of their DOT source, and structurally identical bushes (within a run or
+    # across runs) are passed to Graphviz only once.
+    def __init__(self, fmt, cache_dir=None):
         self._fmt = fmt
+        self._cache_dir = cache_dir
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._cache_lock = threading.Lock()
+
+    @property
+    def cache_hits(self):
+        return self._cache_hits
+
+    @property
+    def cache_misses(self):
+        return self._cache_misses
 
     def render(self, fname, bush):
         if self._fmt == "txt":
             self._render_txt(fname, bush)
-        elif self._fmt == "png":
-            self._render_png(fname, bush)
+        elif self._fmt in self.IMAGE_FORMATS:
+            self._render_image(fname, bush)
+        else:
+            raise Exception("Unknown format")
+
+    # Return the rendered `bush` as bytes instead of writing it to a file.
+    def dumps(self, bush):
+        if self._fmt == "txt":
+            out = io.StringIO()
+            self._print_bush(out, bush)
+            return out.getvalue().encode("utf-8")
+        elif self._fmt in self.IMAGE_FORMATS:
+            graph = self._make_graph(bush)
+            if self._cache_dir is None:
+                return graph.pipe(format=self._fmt)
+            with open(self._cache_lookup(graph), "rb") as cached:
+                return cached.read()
         else:
             raise Exception("Unknown format")
 
     def _render_txt(self, fname, bush):
         with open(fname, "w") as out:
-            for trace in bush.traces:
-                self._print_trace(out, trace)
+            self._print_bush(out, bush)
+
+    def _render_image(self, fname, bush):
+        graph = self._make_graph(bush)
+
+        if self._cache_dir is None:
+            graph.render(filename=fname, cleanup=True)
+            return
+
+        cached = self._cache_lookup(graph)
+        self._link_or_copy(cached, fname + "." + self._fmt)
 
-    def _render_png(self, fname, bush):
-        graph = graphviz.Digraph(format="png")
-        for trace in bush.traces:
+    # Return the path to the cached image for the `graph`, invoking
+    # Graphviz only if there is no such image yet.
+    def _cache_lookup(self, graph):
+        key = hashlib.sha1(graph.source.encode("utf-8")).hexdigest()
+        cached = os.path.join(self._cache_dir, key + "." + self._fmt)
+
+        if os.path.isfile(cached):
+            with self._cache_lock:
+                self._cache_hits += 1
+            return cached
+
+        with self._cache_lock:
+            self._cache_misses += 1
+
+        # Write to a temporary file first to never expose partially
+        # written images to concurrent runs (or threads) sharing the cache:
+        tmp = "{}.{}.{}.tmp".format(
+            cached, os.getpid(), threading.get_ident()
+        )
+        with open(tmp, "wb") as out:
+            out.write(graph.pipe(format=self._fmt))
+        os.replace(tmp, cached)
+
+        return cached
+
+    @staticmethod
+    def _link_or_copy(src, dst):
+        if os.path.lexists(dst):
+            os.remove(dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            # E.g. the cache and the output reside on different devices
+            shutil.copyfile(src, dst)
+
+    def _make_graph(self, bush):
+        graph = graphviz.Digraph(format=self._fmt)
+        for trace in bush.load_traces():
             self._add_to_graph(graph, bush, trace)
-        graph.render(filename=fname, cleanup=True)
+        return graph
+
+    def _print_bush(self, out, bush):
+        for trace in bush.load_traces():
+            self._print_trace(out, trace)
 
     def _print_trace(self, out, trace):
         padding = " " if trace.parent else ""
@@ -91,7 +177,7 @@ class ViewTraceBush:
         if not trace.is_root:
             graph.edge(trace.parent, node_start, style="bold")
 
-        node_last = self._add_trace_body(graph, trace, node_start)
+        node_last = self._add_trace_body(graph, bush, trace, node_start)
 
         #
         # Add the "trace exit node" with link information
@@ -134,7 +220,7 @@ class ViewTraceBush:
             graph.edge(node_end, node_loop, style="bold")
 
     # Add the body of the trace (exit 0 --> exit 1 --> ... --> exit N).
-    def _add_trace_body(self, graph, trace, node_start):
+    def _add_trace_body(self, graph, bush, trace, node_start):
         side_exits = sorted(trace.side_exits.keys())
         node_prev = node_start
 
@@ -149,6 +235,16 @@ class ViewTraceBush:
                     style="bold",
                     color=self.MARKED_TRACE_COLOR
                 )
+            uncovered = bush.uncovered_exits.get((trace.id, side_exit))
+            if uncovered is not None:
+                # Hot exit without a side trace. Exit counts are kept out of
+                # the DOT source (they are in the uncovered exits CSV) so that
+                # bushes differing only in counts share a render cache entry.
+                graph.node(
+                    node_side,
+                    style="bold,filled",
+                    fillcolor=self.UNCOVERED_EXIT_COLOR,
+                )
             node_prev = node_side
 
         return node_prev
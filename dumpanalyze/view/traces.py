@@ -26,12 +26,16 @@
 
 import csv
 
+from dumpanalyze.trace import Trace
+
 
 class ViewTraces:
 
+    # Sizes are followed by the number of machine code instructions of each
+    # class (see Trace.MC_CLASSES):
     CSV_HEADER = [
         "ID", "PARENT", "LINK_TYPE", "NUM_BC", "NUM_IR", "NUM_SN", "SIZE_MC",
-    ]
+    ] + ["NUM_MC_" + name for name in Trace.MC_CLASSES]
 
     def __init__(self, fmt):
         self._fmt = fmt
@@ -57,4 +61,4 @@ class ViewTraces:
                     trace.num_ir,
                     trace.num_sn,
                     trace.size_mcode,
-                ])
+                ] + trace.mc_classes.tolist())
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+#
+# Hot side exits without compiled side traces.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import csv
+
+
+class ViewUncoveredExits:
+
+    CSV_HEADER = [
+        "TRACE", "EXIT", "EXITS", "ABORTS", "STATUS", "TOP_REASON",
+    ]
+
+    def __init__(self, fmt):
+        self._fmt = fmt
+
+    # Exits are ranked by the number of times they were taken.
+    def render(self, fname, coverage):
+        if self._fmt == "csv":
+            self._render_csv(fname, coverage)
+        else:
+            raise Exception("Unknown format")
+
+    def _render_csv(self, fname, coverage):
+        with open(fname, "w", newline="") as out:
+            writer = csv.writer(out, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(self.CSV_HEADER)
+            for uncovered in coverage.uncovered:
+                reasons = uncovered.reasons.most_common(1)
+                writer.writerow([
+                    uncovered.trace_id,
+                    uncovered.exit,
+                    uncovered.num_exits,
+                    uncovered.num_aborts,
+                    uncovered.status,
+                    reasons[0][0] if reasons else "",
+                ])
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# Background writer for rendering views concurrently with parsing.
+# This module is a part of the toolkit for processing LuaJIT plain text dumps.
+#
+# Copyright 2017-2019 IPONWEB Ltd.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import concurrent.futures
+import threading
+import time
+
+
+class AsyncWriter:
+
+    # Jobs are run by a pool of `num_threads` threads. At most `queue_size`
+    # jobs may be pending at a time: submitting more blocks the caller until
+    # some job is done, so the parser never runs too far ahead of the output.
+    # With `num_threads` equal to 0 jobs are run synchronously on submission.
+    def __init__(self, num_threads, queue_size=None):
+        self._pool = None
+        if num_threads > 0:
+            self._pool = concurrent.futures.ThreadPoolExecutor(num_threads)
+            self._slots = threading.BoundedSemaphore(
+                queue_size or 4 * num_threads
+            )
+
+        self._lock = threading.Lock()
+        self._error = None
+        self._num_jobs = 0
+        self._num_bytes = 0
+        self._time_start = None
+        self._time_stop = None
+
+    @property
+    def num_jobs(self):
+        return self._num_jobs
+
+    @property
+    def num_bytes(self):
+        return self._num_bytes
+
+    @property
+    def elapsed(self):
+        if self._time_start is None:
+            return 0.0
+        return (self._time_stop or time.monotonic()) - self._time_start
+
+    @property
+    def throughput(self):
+        elapsed = self.elapsed
+        return self._num_bytes / elapsed if elapsed > 0 else 0.0
+
+    # Schedule `fn(*args)`. The job is expected to return the number of bytes
+    # it has written (or None if unknown).
+    def submit(self, fn, *args):
+        if self._error is not None:
+            raise self._error
+
+        if self._time_start is None:
+            self._time_start = time.monotonic()
+
+        if self._pool is None:
+            self._run(fn, args)
+            return
+
+        self._slots.acquire()
+        try:
+            self._pool.submit(self._run_slot, fn, args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    # Wait for all pending jobs and re-raise the first error (if any).
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+        if self._time_start is not None and self._time_stop is None:
+            self._time_stop = time.monotonic()
+
+        if self._error is not None:
+            raise self._error
+
+    def _run_slot(self, fn, args):
+        try:
+            self._run(fn, args)
+        except BaseException as e:
+            with self._lock:
+                if self._error is None:
+                    self._error = e
+        finally:
+            self._slots.release()
+
+    def _run(self, fn, args):
+        num_bytes = fn(*args)
+        with self._lock:
+            self._num_jobs += 1
+            self._num_bytes += num_bytes or 0
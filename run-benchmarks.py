@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+#
+# Benchmark suite runner for dumpanalyze
+# Copyright 2017-2019 IPONWEB Ltd. See License Notice in LICENSE
+#
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from dumpanalyze.dumpgen import DumpGenerator
+from dumpanalyze.dumpparser import DumpParser
+from dumpanalyze.traceforest import TraceForest
+from dumpanalyze.view.traces import ViewTraces
+from dumpanalyze.view.tracebush import ViewTraceBush
+from dumpanalyze.view.abortreasonslist import ViewAbortReasonsList
+from dumpanalyze.view.abortreasonsdetails import ViewAbortReasonsDetails
+
+# Number of bushes rendered as images (each one spawns a Graphviz process)
+NUM_IMAGES = 20
+
+# Changes below this absolute value (in seconds) are considered noise
+MIN_CHANGE = 0.01
+
+
+def parse_command_line(argv):
+    argparser = argparse.ArgumentParser(
+        description="Run dumpanalyze benchmarks on a synthetic dump"
+    )
+    argparser.add_argument("--traces", type=int, default=20000,
+                           help="Number of compiled traces in the dump")
+    argparser.add_argument("--flush-every", type=int, default=5000,
+                           help="Flush traces every N compiled traces")
+    argparser.add_argument("--repeat", type=int, default=3,
+                           help="Number of runs of each benchmark")
+    argparser.add_argument("--save", type=str,
+                           help="Save results to the given JSON file")
+    argparser.add_argument("--compare", type=str,
+                           help="Compare results with the given JSON file")
+    argparser.add_argument("--threshold", type=float, default=0.1,
+                           help="Relative slowdown reported as a regression")
+    return argparser.parse_args(argv[1:])
+
+
+def parse_dump(fname):
+    parser = DumpParser(fname)
+    generations = []
+    while True:
+        status = parser.parse()
+        generations.append((parser.traces, parser.abort_reasons))
+        if status == parser.PARSED_DUMP:
+            return generations
+
+
+def timed(fn, repeat):
+    best = None
+    for __ in range(repeat):
+        time_start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - time_start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_benchmarks(dump, out_dir, repeat):
+    results = {}
+    generations = parse_dump(dump)
+    forests = [TraceForest(traces) for traces, __ in generations]
+
+    def bench(name, fn):
+        results[name] = timed(fn, repeat)
+        print("{:<32} {:10.3f} s".format(name, results[name]))
+
+    def render_list(view, suffix, index):
+        for num, generation in enumerate(generations):
+            view.render(os.path.join(
+                out_dir, "gen-{}-{}".format(num, suffix)
+            ), generation[index])
+
+    def render_bushes(view, suffix="", limit=None):
+        for num, forest in enumerate(forests):
+            for root_id, bush in list(forest.bushes.items())[:limit]:
+                view.render(os.path.join(
+                    out_dir, "gen-{}-bush-{}{}".format(num, root_id, suffix)
+                ), bush)
+
+    bench("parser", lambda: parse_dump(dump))
+    bench("forest", lambda: [
+        TraceForest(traces) for traces, __ in generations
+    ])
+    bench("view_traces_csv", lambda: render_list(
+        ViewTraces("csv"), "traces.csv", 0
+    ))
+    bench("view_abort_reasons_list_csv", lambda: render_list(
+        ViewAbortReasonsList("csv"), "abort-reasons.csv", 1
+    ))
+    bench("view_abort_reasons_details_txt", lambda: render_list(
+        ViewAbortReasonsDetails("txt"), "abort-reasons.txt", 1
+    ))
+    bench("view_tracebush_txt", lambda: render_bushes(
+        ViewTraceBush("txt"), ".txt"
+    ))
+
+    if shutil.which("dot") is not None:
+        bench("view_tracebush_png_{}".format(NUM_IMAGES), lambda: (
+            render_bushes(ViewTraceBush("png"), limit=NUM_IMAGES)
+        ))
+
+        command = [
+            sys.executable, "-m", "dumpanalyze",
+            "--dump", dump, "--out-dir", os.path.join(out_dir, "cli"),
+        ]
+        bench("cli", lambda: subprocess.check_call(
+            command, stdout=subprocess.DEVNULL
+        ))
+
+    return results
+
+
+# Print relative changes against the `baseline` and return the number of
+# regressions exceeding the `threshold`.
+def compare(results, baseline, threshold):
+    regressions = 0
+    print("\n{:<32} {:>10} {:>10} {:>8}".format(
+        "BENCHMARK", "BASELINE", "CURRENT", "CHANGE"
+    ))
+    for name, elapsed in sorted(results.items()):
+        if name not in baseline:
+            continue
+        change = elapsed / baseline[name] - 1.0
+        mark = ""
+        if change > threshold and elapsed - baseline[name] > MIN_CHANGE:
+            mark = "  REGRESSION"
+            regressions += 1
+        print("{:<32} {:10.3f} {:10.3f} {:+7.1%}{}".format(
+            name, baseline[name], elapsed, change, mark
+        ))
+    return regressions
+
+
+def main(argv=None):
+    argv = argv or sys.argv
+    args = parse_command_line(argv)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dump = os.path.join(tmpdir, "dump.txt")
+        print("Generating a dump with {} traces".format(args.traces))
+        with open(dump, "w") as out:
+            DumpGenerator(
+                num_traces=args.traces, flush_every=args.flush_every
+            ).write(out)
+
+        out_dir = os.path.join(tmpdir, "out")
+        os.makedirs(out_dir)
+        results = run_benchmarks(dump, out_dir, args.repeat)
+
+    if args.save:
+        with open(args.save, "w") as out:
+            json.dump({
+                "python": platform.python_version(),
+                "traces": args.traces,
+                "flush_every": args.flush_every,
+                "results": results,
+            }, out, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        if compare(results, baseline["results"], args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
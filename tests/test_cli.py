@@ -11,6 +11,8 @@ import subprocess
 import shutil
 import tempfile
 
+import pytest
+
 CLI_NAME = "dumpanalyze"
 DATA_DIR = os.path.join(
     os.path.abspath(os.path.dirname(__file__)), "dump-files"
@@ -53,15 +55,34 @@ def _assert_view_traces_csv_1(fname):
     assert os.path.isfile(fname)
     data = list(open(fname))
     assert len(data) == 1
-    assert "ID,PARENT,LINK_TYPE,NUM_BC,NUM_IR,NUM_SN,SIZE_MC\n" in data
+    assert (
+        "ID,PARENT,LINK_TYPE,NUM_BC,NUM_IR,NUM_SN,SIZE_MC,"
+        "NUM_MC_GUARD,NUM_MC_BRANCH,NUM_MC_CALL,NUM_MC_SPILL,NUM_MC_SSE,"
+        "NUM_MC_LOAD,NUM_MC_STORE,NUM_MC_OTHER\n"
+    ) in data
 
 
 def _assert_view_traces_csv_2(fname):
     assert os.path.isfile(fname)
     data = open(fname).read()
-    assert "1,0,loop,5,15,7,113" in data
-    assert "2,1,1,5,8,5,127" in data
-    assert "3,2,interpreter,0,2,2,79" in data
+    assert "1,0,loop,5,15,7,113,5,1,0,0,8,1,1,7\n" in data
+    assert "2,1,1,5,8,5,127,3,1,0,0,9,1,4,4\n" in data
+    assert "3,2,interpreter,0,2,2,79,0,1,0,0,4,0,3,4\n" in data
+
+
+def _assert_view_ir_stats_csv_2(fname):
+    assert os.path.isfile(fname)
+    data = open(fname).read()
+    assert "ID,NUM_GUARDS,NUM_PHIS,NUM_SPILLS,NUM_CALLS,LOOP_REF," in data
+    assert "1,5,4,0,0,8," in data
+    assert "ALL,8,4,0,0,," in data
+
+
+def _assert_view_snapshots_csv_2(fname):
+    assert os.path.isfile(fname)
+    data = open(fname).read()
+    assert "1,1,7,29,12,3,5,113\n" in data
+    assert "1,ALL,14,67,26,3,8,319\n" in data
 
 
 def _assert_view_abort_reasons_csv_1(fname):
@@ -73,7 +94,7 @@ def _assert_view_abort_reasons_csv_1(fname):
 def _assert_view_abort_reasons_csv_2(fname):
     assert os.path.isfile(fname)
     data = open(fname).read()
-    assert "NYI: FastFunc print,4" in data
+    assert "NYI: FastFunc %s,4,NYI: FastFunc print,4" in data
 
 
 def _assert_view_abort_reasons_txt_1(fname):
@@ -85,7 +106,7 @@ def _assert_view_abort_reasons_txt_1(fname):
 def _assert_view_abort_reasons_txt_2(fname):
     assert os.path.isfile(fname)
     data = open(fname).read()
-    assert "NYI: FastFunc print: 4" in data
+    assert "\t\tNYI: FastFunc %s: 4\n\t\t\tNYI: FastFunc print: 4\n" in data
 
 
 # A single trace bush is rendered in the same txt format as the original dump.
@@ -180,8 +201,110 @@ def test_normal_run():
         fname_tracebush = os.path.join(out_dir, "gen-2-bush-1.txt")
 
         _assert_view_traces_csv_2(fname_traces)
+        _assert_view_ir_stats_csv_2(
+            os.path.join(out_dir, "gen-2-ir-stats.csv")
+        )
+        _assert_view_snapshots_csv_2(
+            os.path.join(out_dir, "gen-2-snapshots.csv")
+        )
         _assert_view_abort_reasons_csv_2(fname_reasons_csv)
         _assert_view_abort_reasons_txt_2(fname_reasons_txt)
         _assert_view_tracebush_txt(fname_tracebush)
 
         assert os.path.isfile(os.path.join(out_dir, "gen-2-bush-1.png"))
+
+
+@pytest.mark.skipif(shutil.which("dot") is None, reason="requires Graphviz")
+def test_render_cache():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_dir = os.path.join(tmpdir, "cache")
+        for run in range(2):
+            out_dir = os.path.join(tmpdir, "out-{}".format(run))
+            process = _prepare_cli_run([
+                CLI_NAME, "--dump", DUMP_FPATH, "--out-dir", out_dir,
+                "--cache-dir", cache_dir,
+            ])
+            out, __ = process.communicate()
+            assert process.returncode == 0
+            assert os.path.isfile(os.path.join(out_dir, "gen-2-bush-1.png"))
+
+        assert "Render cache: 1 hits, 0 misses" in out
+        assert len(os.listdir(cache_dir)) == 1
+
+
+@pytest.mark.skipif(shutil.which("dot") is None, reason="requires Graphviz")
+def test_archive_output():
+    from dumpanalyze.archive import ArchiveReader
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        process = _prepare_cli_run([
+            CLI_NAME, "--dump", DUMP_FPATH, "--out-dir", tmpdir,
+            "--output", "archive",
+        ])
+        __, __ = process.communicate()
+        assert process.returncode == 0
+
+        assert not os.path.isfile(os.path.join(tmpdir, "gen-1-bushes.zip"))
+        assert not os.path.isfile(os.path.join(tmpdir, "gen-2-bush-1.txt"))
+
+        with ArchiveReader(os.path.join(tmpdir, "gen-2-bushes.zip")) as ar:
+            assert sorted(ar.names) == ["gen-2-bush-1.png", "gen-2-bush-1.txt"]
+            assert ar.read_text("gen-2-bush-1.txt").startswith(
+                "---- TRACE 1 start =(command line):1\n"
+            )
+
+
+def test_report_output():
+    import json
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        process = _prepare_cli_run([
+            CLI_NAME, "--dump", DUMP_FPATH, "--out-dir", tmpdir,
+            "--output", "report",
+        ])
+        __, __ = process.communicate()
+        assert process.returncode == 0
+
+        report_dir = os.path.join(tmpdir, "report")
+        assert sorted(os.listdir(report_dir)) == [
+            "gen-1-bushes.js", "gen-2-bushes.js", "gen-2-text-0.js",
+            "index.html",
+        ]
+        assert not os.path.isfile(os.path.join(tmpdir, "gen-2-bush-1.png"))
+
+        index = open(os.path.join(report_dir, "index.html")).read()
+        assert '"generation": 2, "traces": 3' in index
+
+        prefix = 'dumpanalyzeLoad("gen-2-bushes", '
+        data = open(os.path.join(report_dir, "gen-2-bushes.js")).read()
+        assert data.startswith(prefix) and data.endswith(");\n")
+        bushes = json.loads(data[len(prefix):-3])["bushes"]
+        assert len(bushes) == 1
+        assert bushes[0]["root"] == 1
+        assert [trace[:4] for trace in bushes[0]["traces"]] == [
+            [1, 0, 0, "loop"], [2, 1, 1, "1"], [3, 2, 1, "interpreter"],
+        ]
+
+        prefix = 'dumpanalyzeLoad("gen-2-text-0", '
+        data = open(os.path.join(report_dir, "gen-2-text-0.js")).read()
+        chunk = json.loads(data[len(prefix):-3])
+        assert sorted(chunk) == ["1", "2", "3"]
+        assert chunk["1"][0].startswith("0006    KSHORT   5  60\n")
+
+
+def test_diff():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "diff.txt")
+        process = _prepare_cli_run([
+            CLI_NAME, "diff", DUMP_FPATH,
+            os.path.join(DATA_DIR, "test_objects.txt"), "--out", fname,
+        ])
+        __, __ = process.communicate()
+        assert process.returncode == 0
+
+        data = open(fname).read()
+        assert "Compiled traces: 3 -> 3 (+0)" in data
+        assert "Flushes: 1 -> 0 (-1)" in data
+        assert "failed to allocate mcode memory: 1 -> 0 (-1)" in data
+        assert "NYI: FastFunc print: 4 -> 4 (+0)" in data
+        assert "3 distinct in A, 3 distinct in B, 3 matched" in data
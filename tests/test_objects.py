@@ -5,13 +5,45 @@
 # Copyright 2017-2019 IPONWEB Ltd.
 #
 
+import collections
+import io
 import os
+import pickle
+import tempfile
 
+import pytest
+
+from dumpanalyze import opcodes
+from dumpanalyze import similarity
+from dumpanalyze.__main__ import format_estimate
+from dumpanalyze.abortclass import AbortClassifier
+from dumpanalyze.abortloops import AbortLoopDetector
+from dumpanalyze.archive import ArchiveReader, ArchiveWriter
+from dumpanalyze.churn import ChurnIndex
+from dumpanalyze.dumpdiff import DumpDiff, DumpSummary
+from dumpanalyze.dumpgen import DumpGenerator
+from dumpanalyze.dumpindex import DumpIndex
 from dumpanalyze.dumpparser import DumpParser
+from dumpanalyze.exitcoverage import ExitCoverage, UncoveredExit
+from dumpanalyze.mcodemap import McodeMap
+from dumpanalyze.mcodeusage import McodeUsage
+from dumpanalyze.perfscript import PerfScriptReader
+from dumpanalyze.sampler import DumpSampler, Estimate
+from dumpanalyze.server import DumpServer, LRUCache
+from dumpanalyze.similarity import TraceClusters
+from dumpanalyze.sourcerollup import SourceRollup
+from dumpanalyze.timeline import Timeline
 from dumpanalyze.trace import Trace
+from dumpanalyze.traceexit import TraceExit, TraceExitLog
 from dumpanalyze.tracebush import TraceBush
 from dumpanalyze.traceforest import TraceForest
+from dumpanalyze.tracestore import TraceStore
 from dumpanalyze.abortreason import AbortReason
+from dumpanalyze.writer import AsyncWriter
+from dumpanalyze.view.exitregisters import ViewExitRegisters
+from dumpanalyze.view.sourcerollup import ViewSourceRollup
+from dumpanalyze.view.tracebush import ViewTraceBush
+from dumpanalyze.view.traces import ViewTraces
 
 DATA_DIR = os.path.join(
     os.path.abspath(os.path.dirname(__file__)), "dump-files"
@@ -96,7 +128,7 @@ def test_trace_grouping():
     assert isinstance(bush, TraceBush)
     assert bush.root_id == 1
     assert bush.size == 3
-    assert isinstance(bush.traces, list)
+    assert isinstance(bush.load_traces(), list)
 
 
 def test_abort_reason():
@@ -108,3 +140,799 @@ def test_abort_reason():
     assert abort_reason.file == "=(command line)"
     assert abort_reason.line == 1
     assert abort_reason.reason == "NYI: FastFunc print"
+    assert abort_reason.category == "NYI: FastFunc %s"
+    assert abort_reason.params == ("print",)
+
+
+def test_tolerant_parser():
+    lines = open(DUMP_FNAME).readlines()
+    # Wrong trace ID in the middle of trace 2 and a dump truncated inside
+    # the last compiled trace 3, starting with data of an unknown trace:
+    lines[472] = "---- TRACE 9 mcode 127\n"
+    lines = ["0006    KSHORT   5  60\n", "---- TRACE 7 IR\n"] + lines[:1085]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "dump.txt")
+        with open(fname, "w") as out:
+            out.writelines(lines)
+
+        with pytest.raises(SystemExit):
+            DumpParser(fname).parse()
+
+        parser = DumpParser(fname, tolerant=True)
+        assert parser.parse() == parser.PARSED_DUMP
+
+    assert [trace.id for trace in parser.traces] == [1]
+    assert len(parser.abort_reasons) == 4
+    # Lines up to the next trace start are skipped after an anomaly:
+    assert [line for line, __ in parser.anomalies] == [1, 475, 1087]
+    assert parser.anomalies[1][1] == "Expected trace ID 2, got 9"
+    assert "dropping trace 3" in parser.anomalies[2][1]
+
+
+def test_tolerant_parser_exits():
+    lines = open(DUMP_FNAME).readlines()
+    # A broken register value of the first exit and a broken start header
+    # of trace 2:
+    exit_lines = list(lines)
+    exit_lines[59] = "rcx = garbage\n"
+    start_lines = list(lines)
+    start_lines[452] = "---- TRACE 2 start 1/1\n"
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "dump.txt")
+        with open(fname, "w") as out:
+            out.writelines(exit_lines)
+
+        parser = DumpParser(fname, decode_exits=True, tolerant=True)
+        parser.parse()
+
+        # Only the broken exit is dropped:
+        assert [line for line, __ in parser.anomalies] == [60]
+        assert len(parser.exits) == 24
+        assert len(parser.exits.decoded) == 24
+        assert [trace.id for trace in parser.traces] == [1, 2, 3]
+
+        with open(fname, "w") as out:
+            out.writelines(start_lines)
+
+        with pytest.raises(SystemExit) as e:
+            DumpParser(fname).parse()
+        assert str(e.value).startswith("Line 453, in state=start: ")
+
+
+def test_tolerant_parser_mcode():
+    lines = open(DUMP_FNAME).readlines()
+    # A negative address of a machine code instruction of trace 1:
+    lines[32] = "-bccff94  cvtsd2si ebp, qword [r10+0x10]\n"
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "dump.txt")
+        with open(fname, "w") as out:
+            out.writelines(lines)
+
+        with pytest.raises(SystemExit) as e:
+            DumpParser(fname).parse()
+        assert str(e.value).startswith("Line 33, in state=mcode: ")
+
+        parser = DumpParser(fname, tolerant=True)
+        assert parser.parse() == parser.PARSED_DUMP
+
+    assert [line for line, __ in parser.anomalies] == [33]
+    assert [trace.id for trace in parser.traces] == [2, 3]
+
+
+def test_abort_classifier():
+    classifier = AbortClassifier()
+
+    assert classifier.classify("NYI: bytecode 51") == (
+        "NYI: bytecode %d", ("51",)
+    )
+    assert classifier.classify("NYI: C function 0x41e5b0") == (
+        "NYI: C function %p", ("0x41e5b0",)
+    )
+    assert classifier.classify("hit mcode limit (retrying)") == (
+        "hit mcode limit (retrying)", ()
+    )
+    # Unknown reasons are normalized by their numeric values:
+    assert classifier.classify("custom error 42 at 0xff") == (
+        "custom error %d at %p", ("42", "0xff")
+    )
+    # Repeated reasons are served from the cache:
+    result = classifier.classify("NYI: bytecode 51")
+    assert classifier.classify("NYI: bytecode 51") is result
+
+
+def test_archive():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "test.zip")
+        with ArchiveWriter(fname) as archive:
+            archive.add("a.txt", "text")
+            archive.add("b.png", b"\x89PNG", compress=False)
+
+        with ArchiveReader(fname) as archive:
+            assert archive.names == ["a.txt", "b.png"]
+            assert archive.read_text("a.txt") == "text"
+            assert archive.read("b.png") == b"\x89PNG"
+
+
+def test_view_tracebush_dumps():
+    parser = DumpParser(DUMP_FNAME)
+    parser.parse()
+
+    bush = TraceForest(parser.traces).bushes[1]
+    data = ViewTraceBush("txt").dumps(bush).decode("utf-8")
+    assert data.startswith("---- TRACE 1 start =(command line):1\n")
+    assert "---- TRACE 3 stop -> interpreter\n" in data
+
+
+def test_trace_store():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "dump.txt")
+        with open(fname, "w") as out:
+            DumpGenerator(num_traces=200).write(out)
+
+        parser = DumpParser(fname)
+        parser.parse()
+        # The limit is always exceeded, so traces are spilled regularly:
+        spilling_parser = DumpParser(fname, memory_limit=0)
+        spilling_parser.parse()
+
+        store = spilling_parser.traces
+        assert isinstance(store, TraceStore)
+        assert store.num_spilled > 0
+        assert len(store) == len(parser.traces)
+        assert store[-1].id == parser.traces[-1].id
+
+        rendered = []
+        for traces in [parser.traces, store]:
+            fname = os.path.join(tmpdir, "traces.csv")
+            ViewTraces("csv").render(fname, traces)
+            bushes = TraceForest(traces).bushes
+            rendered.append((
+                open(fname).read(),
+                [(root_id, [t.mc for t in bush.load_traces()])
+                 for root_id, bush in bushes.items()],
+            ))
+
+    assert rendered[0] == rendered[1]
+
+    # Traces are spilled once their own size exceeds the limit, and the
+    # spilled ones no longer count towards it:
+    limit = len(pickle.dumps(parser.traces[0], pickle.HIGHEST_PROTOCOL)) * 5
+    spills = []
+    store = TraceStore(limit, on_spill=lambda: spills.append(len(store)))
+    for trace in parser.traces[:20]:
+        store.append(trace)
+        assert store.resident_bytes <= limit
+    assert 2 <= len(spills) < 10
+    assert len(store) == 20
+    assert [t.id for t in store] == [t.id for t in parser.traces[:20]]
+
+
+def test_exit_coverage():
+    # Cut the dump before the side trace 3 is finally compiled from 2/1:
+    lines = open(DUMP_FNAME).readlines()[:1073]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "dump.txt")
+        with open(fname, "w") as out:
+            out.writelines(lines)
+
+        parser = DumpParser(fname)
+        parser.parse()
+
+    forest = TraceForest(parser.traces)
+    assert forest.side_traces == {(1, 1): 2}
+
+    coverage = ExitCoverage(forest, parser.exits, parser.abort_reasons)
+    assert len(coverage.uncovered) == 1
+    uncovered = coverage.uncovered[0]
+    assert (uncovered.trace_id, uncovered.exit) == (2, 1)
+    assert uncovered.num_exits == 14
+    assert uncovered.num_aborts == 4
+    assert uncovered.status == UncoveredExit.STATUS_ABORTED
+    assert uncovered.reasons == {"NYI: FastFunc %s": 4}
+    assert forest.bushes[1].uncovered_exits == {(2, 1): uncovered}
+
+    # The exit is highlighted, but its count stays out of the DOT source to
+    # keep it usable as a render cache key:
+    source = ViewTraceBush("svg")._make_graph(forest.bushes[1]).source
+    assert "fillcolor=gold" in source
+    assert "exits" not in source
+
+
+def test_source_rollup():
+    parser = DumpParser(DUMP_FNAME)
+    parser.parse()
+
+    rollup = SourceRollup()
+    rollup.add_generation(parser.traces, parser.abort_reasons, parser.exits)
+
+    location = rollup.location("=(command line)", 1)
+    assert location.num_traces == 3
+    assert location.size_mcode == 113 + 127 + 79
+    assert location.num_aborts == 4
+    assert location.reasons == {"NYI: FastFunc %s": 4}
+    assert location.num_exits == 25
+    assert location.weight == 29
+
+    assert len(rollup.files) == 1
+    source = list(rollup.files)[0]
+    assert source.line is None
+    assert source.num_traces == 3
+    assert source.num_exits == 25
+
+    # Each abort reason gets its own column with per-location counts
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "source-locations.csv")
+        ViewSourceRollup("csv").render(fname, rollup)
+        rows = open(fname).read().splitlines()
+    assert rows[0].endswith(",EXITS,NYI: FastFunc %s")
+    assert rows[1] == "=(command line),1,3,319,4,NYI: FastFunc %s,25,4"
+
+
+def test_mcode_usage():
+    parser = DumpParser(DUMP_FNAME)
+    status = parser.parse()
+    forest = TraceForest(parser.traces)
+
+    usage = McodeUsage(maxmcode=1000, growth_interval=2)
+    usage.add_generation(
+        1, parser.traces, forest, parser.abort_reasons,
+        status == parser.PARSED_GENERATION
+    )
+
+    entry = usage.generations[0]
+    assert entry.num_traces == 3
+    assert entry.size_mcode == 113 + 127 + 79
+    assert entry.span_mcode == 0x0bccff83 + 113 - 0x0bccfea7
+    assert entry.top_bushes == [(1, 319)]
+    assert list(entry.growth) == [240]
+    assert entry.growth_rate == 240.0
+    assert not entry.flushed
+    assert not entry.mcode_full
+    assert usage.usage(entry) == 0.319
+    # With a single growth sample, the mean trace size (106 bytes) is used:
+    assert usage.traces_to_flush(entry) == 6
+
+    # No growth rate is extrapolated from generations shorter than the
+    # growth interval:
+    usage = McodeUsage(growth_interval=100)
+    usage.add_generation(
+        1, parser.traces, forest, parser.abort_reasons,
+        status == parser.PARSED_GENERATION
+    )
+    assert usage.generations[0].growth_rate is None
+
+
+def test_trace_clusters():
+    parser = DumpParser(DUMP_FNAME)
+    parser.parse()
+    traces = parser.traces
+
+    signature = traces[0].ir_signature
+    assert len(signature) == similarity.NUM_BINS
+    assert similarity.similarity(signature, signature) == 1.0
+    assert similarity.similarity(signature, traces[1].ir_signature) < 0.5
+
+    # The same traces compiled again in the next generation:
+    clusters = TraceClusters()
+    clusters.add_traces(1, traces)
+    clusters.add_traces(2, traces)
+
+    assert clusters.num_traces == 6
+    assert [
+        (cluster.link_kind, cluster.members, cluster.size_mcode)
+        for cluster in clusters.clusters
+    ] == [
+        ("trace", [(1, 2), (2, 2)], 254),
+        ("loop", [(1, 1), (2, 1)], 226),
+        ("interpreter", [(1, 3), (2, 3)], 158),
+    ]
+
+
+def test_dump_sampler():
+    summary = DumpSampler(DUMP_FNAME).summarize()
+    assert summary.exact
+    assert summary.estimate("traces").value == 3
+    assert summary.estimate("traces").error == 0
+    assert summary.estimate("exits").value == 25
+    assert summary.reasons[0][0] == "NYI: FastFunc %s"
+    assert summary.reasons[0][1].value == 4
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "dump.txt")
+        with open(fname, "w") as out:
+            DumpGenerator(num_traces=1000).write(out)
+
+        sampler = DumpSampler(fname, num_samples=16, sample_size=32 * 1024)
+        summary = sampler.summarize()
+
+        # Samples as big as strata cover the dump without overlaps:
+        size = os.path.getsize(fname)
+        sampler = DumpSampler(fname, num_samples=16,
+                              sample_size=size // 16 - 1)
+        assert sampler.summarize().estimate("traces").value == 1000
+
+    assert not summary.exact
+    assert summary.num_samples == 16
+    # Exact values are known from the full parse of the same dump:
+    for name, value in [("traces", 1000), ("aborts", 234)]:
+        estimate = summary.estimate(name)
+        assert 0 < estimate.error < value / 3
+        assert abs(estimate.value - value) <= 2 * estimate.error
+
+    # Sampled values are never shown as exact ones:
+    assert format_estimate(Estimate(0, 0), True) == "0"
+    assert format_estimate(Estimate(0, 0), False) == \
+        "~0 (no occurrences in sample)"
+    assert format_estimate(Estimate(7, 0), False) == "~7"
+    assert format_estimate(Estimate(7, 2.4), False) == "7 +/- 2"
+
+
+def test_dump_generator_mcode_area():
+    out = io.StringIO()
+    DumpGenerator(num_traces=100, mcode_area=8 * 1024).write(out)
+    out.seek(0)
+
+    parser = DumpParser(out, keep_text=False)
+    num_traces = 0
+    num_generations = 0
+    while True:
+        status = parser.parse()
+        num_generations += 1
+        num_traces += len(parser.traces)
+        assert all(
+            DumpGenerator.MCODE_TOP - 8 * 1024 <= trace.mcode_addr
+            < DumpGenerator.MCODE_TOP for trace in parser.traces
+        )
+        if status == parser.PARSED_DUMP:
+            break
+        # Each flush follows a failed allocation of machine code:
+        assert parser.abort_reasons[-1].reason == \
+            "failed to allocate mcode memory"
+
+    assert num_generations > 1
+    assert num_traces == 100
+
+
+def test_async_writer():
+    for num_threads in [0, 2]:
+        writer = AsyncWriter(num_threads, queue_size=1)
+        for size in range(10):
+            writer.submit(lambda x: x, size)
+        writer.close()
+        assert writer.num_jobs == 10
+        assert writer.num_bytes == 45
+
+    def fail():
+        raise ValueError("write failed")
+
+    writer = AsyncWriter(2)
+    writer.submit(fail)
+    with pytest.raises(ValueError):
+        writer.close()
+
+
+def test_dump_generator():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "dump.txt")
+        with open(fname, "w") as out:
+            DumpGenerator(num_traces=300, flush_every=100).write(out)
+
+        parser = DumpParser(fname)
+        generations = 0
+        num_traces = 0
+        while True:
+            status = parser.parse()
+            generations += 1
+            num_traces += len(parser.traces)
+            TraceForest(parser.traces)
+            if status == DumpParser.PARSED_DUMP:
+                break
+
+        assert generations == 3
+        assert num_traces == 300
+
+
+def test_ir_decoding():
+    for keep_text in [True, False]:
+        parser = DumpParser(DUMP_FNAME, keep_text=keep_text)
+        parser.parse()
+
+        root_trace = parser.traces[0]
+        assert root_trace.num_bc == 5
+        assert root_trace.num_ir == 15
+        assert len(root_trace.ir) == (22 if keep_text else 0)
+        assert root_trace.num_guards == 5
+        assert root_trace.num_phis == 4
+        assert root_trace.num_spills == 0
+        assert root_trace.num_calls == 0
+        assert root_trace.loop_ref == 8
+
+        assert len(root_trace.ir_ops) == 14
+        assert root_trace.ir_refs[0] == 1
+        assert opcodes.IR_OPCODES.name(root_trace.ir_ops[0]) == "SLOAD"
+        assert opcodes.IR_TYPES.name(root_trace.ir_types[0]) == "int"
+        assert opcodes.REGISTERS.name(root_trace.ir_regs[0]) == "rbp"
+        assert root_trace.ir_flags[1] == Trace.IR_GUARD
+        assert root_trace.ir_flags[4] == Trace.IR_PHI
+
+    stub_trace = parser.traces[2]
+    assert stub_trace.loop_ref == 0
+    assert [opcodes.IR_OPCODES.name(op) for op in stub_trace.ir_ops] == [
+        "SLOAD", "CONV"
+    ]
+
+
+def test_bc_decoding():
+    parser = DumpParser(DUMP_FNAME, keep_text=False)
+    parser.parse()
+
+    root_trace = parser.traces[0]
+    assert len(root_trace.bc_ops) == root_trace.num_bc == 5
+    assert [opcodes.BC_OPCODES.name(code) for code in root_trace.bc_ops] == [
+        "KSHORT", "ISGE", "ADD", "JMP", "FORL",
+    ]
+
+    abort_reason = parser.abort_reasons[0]
+    assert opcodes.BC_OPCODES.name(abort_reason.last_bc) == "FUNCC"
+
+
+def test_mcode_map():
+    parser = DumpParser(DUMP_FNAME)
+    parser.parse()
+
+    root_trace = parser.traces[0]
+    assert root_trace.mcode_addr == 0x0bccff83
+    assert list(root_trace.exit_nums) == [1, 2, 3, 5, 6]
+    assert root_trace.exit_addrs[0] == 0x0bccff9d
+    assert root_trace.mc_classes[Trace.MC_GUARD] == 5
+    assert root_trace.mc_classes[Trace.MC_SSE] == 8
+    assert sum(root_trace.mc_classes) == sum(
+        1 for line in root_trace.mc if not line.startswith("->")
+    )
+
+    mcode_map = McodeMap()
+    mcode_map.add_traces(1, parser.traces)
+    assert mcode_map.size == 3
+    assert mcode_map.lookup(0x0bccff83) == (1, 1, None)
+    assert mcode_map.lookup(0x0bccffa3) == (1, 1, 1)
+    assert mcode_map.lookup(0x0bccff0e) == (1, 2, None)
+    assert mcode_map.lookup(0x0bccfea6) is None
+    assert mcode_map.lookup(0x0bccff83 + 113) is None
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "perf.txt")
+        with open(fname, "w") as out:
+            out.write(
+                "luajit 1 [002] 5.678901: 250000 cycles: "
+                " bccffa3 [unknown] (/tmp/perf-1.map)\n"
+                "luajit 1 [002] 5.678902: 250000 cycles: "
+                " bccffa3 [unknown] (/tmp/perf-1.map)\n"
+                "luajit 1 [002] 5.678903: 250000 cycles:\n"
+                "\t bccff0e [unknown] (/tmp/perf-1.map)\n"
+                "\t  439dcc lj_vm_exit_handler (/usr/bin/luajit)\n"
+                "\n"
+            )
+        addrs = list(PerfScriptReader(fname))
+        assert addrs == [0x0bccffa3, 0x0bccffa3, 0x0bccff0e]
+
+    samples = mcode_map.attribute(addrs)
+    assert samples == {(1, 1, 1): 2, (1, 2, None): 1}
+
+
+def test_snapshots():
+    parser = DumpParser(DUMP_FNAME, keep_text=False)
+    parser.parse()
+
+    root_trace = parser.traces[0]
+    assert list(root_trace.snap_sizes) == [0, 2, 2, 1, 3, 3, 1]
+    assert len(root_trace.snap_sizes) == root_trace.num_sn
+    assert root_trace.snap_slots == 29
+    assert root_trace.snap_entries == 12
+    assert root_trace.max_snap_entries == 3
+    assert root_trace.num_exit_stubs == 5
+
+    stub_trace = parser.traces[2]
+    assert stub_trace.snap_entries == 4
+    assert stub_trace.num_exit_stubs == 0
+
+
+def test_churn_index():
+    churn_index = ChurnIndex()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "dump.txt")
+        data = open(DUMP_FNAME).read()
+        with open(fname, "w") as out:
+            out.write(data + "---- TRACE flush\n\n" + data)
+
+        parser = DumpParser(fname, keep_text=False)
+        generation = 1
+        while True:
+            status = parser.parse()
+            churn_index.add_traces(generation, parser.traces)
+            if status == DumpParser.PARSED_DUMP:
+                break
+            generation += 1
+
+    root_trace = parser.traces[0]
+    assert root_trace.fingerprint[:2] == ("=(command line)", 1)
+    assert len({trace.fingerprint for trace in parser.traces}) == 3
+
+    entries = list(churn_index.entries)
+    assert len(entries) == 3
+    for entry in entries:
+        assert entry.num_compiled == 2
+        assert entry.num_generations == 2
+        assert entry.first_generation == 1
+        assert entry.last_generation == 2
+    assert sum(entry.size_mcode for entry in entries) == 2 * (113 + 127 + 79)
+
+
+def test_body_store():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "dump.txt")
+        data = open(DUMP_FNAME).read()
+        with open(fname, "w") as out:
+            out.write(data + data)
+
+        parser = DumpParser(fname)
+        parser.parse()
+
+    assert len(parser.traces) == 6
+    for trace, copy in zip(parser.traces[:3], parser.traces[3:]):
+        assert trace.bc is copy.bc
+        assert trace.ir is copy.ir
+        assert trace.mc is copy.mc
+
+    store = parser.body_store
+    assert store.num_hits > 0
+    assert store.size < store.num_lookups
+    assert store.hit_rate == store.num_hits / store.num_lookups
+    assert "".join(parser.traces[0].bc).startswith("0006    KSHORT")
+
+
+def test_trace_exits():
+    parser = DumpParser(DUMP_FNAME)
+    parser.parse()
+
+    exits = parser.exits
+    assert isinstance(exits, TraceExitLog)
+    assert len(exits) == 25
+    assert exits.trace_ids[0] == 1
+    assert exits.exits[0] == 5
+    assert exits.positions[0] == 57
+    assert exits.counts()[(1, 5)] == 1
+    assert sum(exits.counts().values()) == 25
+
+    assert parser.traces[0].pos == 1
+    assert parser.abort_reasons[0].pos == 874
+    # Register dumps are not kept unless they are decoded:
+    assert exits.decoded == []
+
+
+def test_exit_registers():
+    parser = DumpParser(DUMP_FNAME, decode_exits=True)
+    parser.parse()
+
+    assert len(parser.exits.decoded) == 25
+    trace_exit = parser.exits.decoded[0]
+    assert isinstance(trace_exit, TraceExit)
+    assert (trace_exit.trace_id, trace_exit.exit, trace_exit.pos) == \
+        (1, 5, 57)
+    assert len(trace_exit.gprs) == 16
+    assert len(trace_exit.fprs) == 16
+    assert trace_exit.gprs[0] == 0x0bccff83
+    assert trace_exit.gprs[2] == 0
+    assert trace_exit.gprs[15] == 0x00007f5c3bfec150
+    assert trace_exit.fprs[0] == 1653.0
+    assert trace_exit.fprs[4] == -5.4874582225771e+303
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "exit-registers.csv")
+        ViewExitRegisters("csv").render(fname, parser.exits.decoded)
+        data = open(fname).read()
+
+    assert data.startswith("TRACE,EXIT,COUNT,REGISTER,")
+    assert "\n1,5," in data
+
+
+def test_timeline():
+    parser = DumpParser(os.path.join(DATA_DIR, "test_cli.txt"))
+    timeline = Timeline(500)
+
+    while True:
+        status = parser.parse()
+        timeline.add_generation(
+            parser.traces, parser.abort_reasons, parser.exits
+        )
+        if status == DumpParser.PARSED_DUMP:
+            break
+        timeline.add_flush(parser.line)
+
+    assert timeline.num_buckets == 3
+    assert timeline.bucket(0) == [2, 1, 11, 1, 113 + 127]
+    assert timeline.bucket(1) == [0, 3, 13, 0, 0]
+    assert timeline.bucket(2) == [1, 1, 1, 0, 79]
+
+
+def test_abort_loops():
+    parser = DumpParser(DUMP_FNAME)
+    parser.parse()
+
+    assert parser.abort_reasons[0].trace_id == 3
+    assert parser.abort_reasons[0].parent == "2/1"
+    assert parser.abort_reasons[0].start_line == 1
+
+    detector = AbortLoopDetector(tight_gap=54)
+    detector.add_aborts(parser.abort_reasons)
+
+    locations = list(detector.locations)
+    assert len(locations) == 1
+    location = locations[0]
+    assert location.num_attempts == 4
+    assert location.num_tight == 3
+    assert location.min_gap == 54
+    assert location.mean_gap == 54.0
+    assert location.triggers == [("2/1", 4)]
+    assert location.reasons == [("NYI: FastFunc print", 4)]
+    assert location.sites == [("=(command line):1", 4)]
+
+    # Aborts are grouped by the start of the trace, not the abort site
+    detector = AbortLoopDetector()
+    for pos, site in ((2000, 5), (2100, 7)):
+        detector.add(AbortReason(
+            "---- TRACE 4 abort test.lua:{} -- NYI: bytecode 51".format(site),
+            pos=pos, start_file="test.lua", start_line=2
+        ))
+    locations = list(detector.locations)
+    assert len(locations) == 1
+    assert (locations[0].file, locations[0].line) == ("test.lua", 2)
+    assert locations[0].num_attempts == 2
+    assert locations[0].sites == [("test.lua:5", 1), ("test.lua:7", 1)]
+
+    # Only the most recently aborted location is retained
+    detector = AbortLoopDetector(capacity=1)
+    detector.add_aborts(parser.abort_reasons)
+    detector.add(AbortReason(
+        "---- TRACE 1 abort test.lua:2 -- NYI: bytecode 51", pos=2000
+    ))
+    assert [x.file for x in detector.locations] == ["test.lua"]
+    assert detector.num_evicted == 1
+
+
+def test_dump_index():
+    index = DumpIndex(DUMP_FNAME)
+    index.build()
+
+    assert index.num_generations == 1
+    assert [row[:3] for row in index.traces(1)] == [
+        (1, "", "loop"), (2, "1/1", "1"), (3, "2/1", "interpreter"),
+    ]
+    assert index.bushes(1) == [(1, "=(command line)", 1, 3, 319, 0)]
+    assert index.aborts(1) == [("NYI: FastFunc %s", 4, 1, 1)]
+    with pytest.raises(KeyError):
+        index.traces(2)
+
+    # Text of traces is read back from the dump
+    parser = DumpParser(DUMP_FNAME)
+    parser.parse()
+    for trace in parser.traces:
+        assert index.trace_sections(1, trace.id) == [
+            "".join(trace.bc), "".join(trace.ir), "".join(trace.mc),
+        ]
+    assert index.trace_sections(1, 4) is None
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "index")
+        assert DumpIndex.load(fname, DUMP_FNAME) is None
+        index.save(fname)
+        loaded = DumpIndex.load(fname, DUMP_FNAME)
+        assert loaded.generations == index.generations
+        assert loaded.trace_sections(1, 3) == index.trace_sections(1, 3)
+
+
+def test_dump_server():
+    import json
+    import threading
+    import urllib.request
+
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses, len(cache)) == (1, 1, 2)
+
+    index = DumpIndex(DUMP_FNAME)
+    index.build()
+    server = DumpServer(index)
+
+    status, _, body = server.handle(
+        "/api/traces?generation=1&sort=size_mcode&order=desc&per_page=2"
+    )
+    assert status == 200
+    page = json.loads(body.decode("utf-8"))
+    assert page["total"] == 3
+    assert [row[0] for row in page["rows"]] == [2, 1]
+
+    status, _, body = server.handle("/api/traces?page=2&per_page=2")
+    assert [row[0] for row in json.loads(body.decode("utf-8"))["rows"]] == [3]
+
+    status, _, body = server.handle("/api/trace?generation=1&id=3")
+    assert status == 200
+    assert body.decode("utf-8").startswith(
+        "---- TRACE 3 start 2/1 =(command line):1\n---- TRACE 3 IR\n"
+    )
+
+    assert server.handle("/api/bushes?sort=nonexistent")[0] == 400
+    assert server.handle("/api/aborts?generation=2")[0] == 404
+    assert server.handle("/api/trace?id=4")[0] == 404
+    assert server.handle("/gen-1-bushes.js")[2].startswith(
+        b'dumpanalyzeLoad("gen-1-bushes", '
+    )
+
+    # Repeated requests are served from the cache
+    hits = server.cache.hits
+    server.handle("/api/trace?generation=1&id=3")
+    assert server.cache.hits == hits + 1
+
+    # Real HTTP round trip, the server thread dies along with the tests
+    started = threading.Event()
+    address = []
+
+    def on_start(addr):
+        address.extend(addr)
+        started.set()
+
+    thread = threading.Thread(
+        target=server.serve, args=("127.0.0.1", 0, on_start), daemon=True
+    )
+    thread.start()
+    assert started.wait(10)
+    url = "http://{}:{}/api/generations".format(*address)
+    with urllib.request.urlopen(url, timeout=10) as response:
+        data = json.loads(response.read().decode("utf-8"))
+    assert data["generations"][0]["traces"] == 3
+    url = "http://{}:{}/api/trace?id=2".format(*address)
+    with urllib.request.urlopen(url, timeout=10) as response:
+        assert response.read().startswith(b"---- TRACE 2 start 1/1 ")
+
+    # The dump is gone after indexing:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "dump.txt")
+        with open(fname, "w") as out:
+            out.write(open(DUMP_FNAME).read())
+        index = DumpIndex(fname)
+        index.build()
+    status, _, body = DumpServer(index).handle("/api/trace?id=1")
+    assert status == 500
+    assert b"Failed to read the dump" in body
+
+
+def test_dump_diff_exits():
+    parser = DumpParser(DUMP_FNAME, keep_text=False)
+    parser.parse()
+
+    summary_a = DumpSummary("a")
+    summary_a.add_generation(
+        parser.traces, parser.abort_reasons, parser.exits
+    )
+    summary_b = DumpSummary("b")
+    summary_b.add_generation(
+        parser.traces, parser.abort_reasons, TraceExitLog()
+    )
+    diff = DumpDiff(summary_a, summary_b)
+
+    assert ("Exits", 25, 0) in diff.totals
+    exits = collections.Counter(parser.exits.trace_ids)
+    by_trace = {
+        trace.fingerprint: exits[trace.id] for trace in parser.traces
+    }
+    for fingerprint, entry_a, entry_b in diff.traces:
+        assert entry_a[2] == by_trace[fingerprint]
+        assert entry_b[2] == 0